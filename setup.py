@@ -98,4 +98,5 @@ setup(
     zip_safe=True,
     classifiers=classifiers,
     install_requires=requirements,
+    extras_require={'aio': ['aiohttp']},
 )
@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""AsyncDataset class containing async versions of Dataset methods (Python 3.7+)."""
+import logging
+from typing import Optional, List, Union, Tuple, AsyncIterator, Callable
+
+import hdx.data.dataset
+from hdx.aio.hdxobject import AsyncHDXObject
+from hdx.aio.resource import AsyncResource
+from hdx.data.dataset import Dataset, DatasetSummary
+from hdx.data.hdxobject import HDXError, max_attempts, max_int
+from hdx.data.resource import Resource
+from hdx.hdx_configuration import Configuration
+from hdx.utilities.dictandlist import merge_two_dictionaries
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDataset(AsyncHDXObject):
+    """AsyncDataset class containing async versions of Dataset methods eg.
+
+        dataset = await AsyncDataset.read_from_hdx('NAME_OR_ID')
+        await AsyncDataset.update_in_hdx(dataset)
+    """
+    hdxobjectclass = Dataset
+    object_type = 'dataset'
+
+    @classmethod
+    async def _load_existing(cls, dataset):
+        # type: (Dataset) -> Optional[str]
+        """Loads the dataset from HDX by id or if that fails by name (see Dataset._dataset_load_existing)
+
+        Args:
+            dataset (Dataset): Dataset to load into
+
+        Returns:
+            Optional[str]: Id or name with which dataset was loaded or None if it was not found
+        """
+        if 'id' in dataset.data:
+            if await cls._load_from_hdx(dataset, dataset.data['id'], use_readcache=False):
+                dataset._set_cached_id(dataset.data['name'], dataset.data['id'])
+                return dataset.old_data['id']
+            logger.warning('Failed to load dataset with id %s' % dataset.data['id'])
+        name = dataset.data.get('name')
+        if not name:
+            return None
+        if dataset.configuration.has_idcache():
+            known, cached_id = dataset.configuration.idcache().get('dataset', name)
+            if known:
+                if cached_id is None:
+                    return None
+                if cached_id != dataset.data.get('id') and \
+                        await cls._load_from_hdx(dataset, cached_id, use_readcache=False):
+                    return cached_id
+        if await cls._load_from_hdx(dataset, name, use_readcache=False):
+            dataset._set_cached_id(name, dataset.data['id'])
+            return name
+        dataset._set_cached_id(name, None)
+        return None
+
+    @staticmethod
+    async def _upload_resources(dataset, resources):
+        # type: (Dataset, List[Resource]) -> None
+        """Upload files of resources after the dataset has been written to HDX
+
+        Args:
+            dataset (Dataset): Dataset written to HDX
+            resources (List[Resource]): Resources with files to upload
+
+        Returns:
+            None
+        """
+        for resource, created_resource in dataset._dataset_match_resources(resources):
+            await AsyncResource.update_in_hdx(resource)
+            merge_two_dictionaries(created_resource, resource.data)
+
+    @classmethod
+    async def _dataset_merge_hdx_update(cls, dataset, update_resources, patch=False):
+        # type: (Dataset, bool, bool) -> bool
+        """Helper method to merge the dataset and its resources into the metadata just loaded from HDX and update
+        them in HDX if anything changed (see Dataset._dataset_merge_hdx_update)
+
+        Args:
+            dataset (Dataset): Dataset to update
+            update_resources (bool): Whether to update resources
+            patch (bool): Whether to send only changes using patch actions. Defaults to False.
+
+        Returns:
+            bool: True if dataset was updated in HDX, False if it was unchanged
+        """
+        changes = dataset._dataset_prepare_hdx_update(update_resources)
+        if changes is None:
+            return False
+        changed_fields, changed_resources, new_resources, filestore_resources = changes
+        if patch:
+            await cls._dataset_patch_to_hdx(dataset, changed_fields, changed_resources, new_resources)
+            return True
+        if dataset.resources:
+            dataset.data['resources'] = dataset._convert_hdxobjects(dataset.resources)
+        await cls._save_to_hdx(dataset, 'update', 'id')
+        await cls._upload_resources(dataset, filestore_resources)
+        return True
+
+    @classmethod
+    async def _dataset_patch_to_hdx(cls, dataset, changed_fields, changed_resources, new_resources):
+        # type: (Dataset, List[str], List[Tuple[Resource, List[str]]], List[Resource]) -> None
+        """Helper method to send only the changes to a dataset and its resources to HDX (see
+        Dataset._dataset_patch_to_hdx)
+
+        Args:
+            dataset (Dataset): Dataset to patch
+            changed_fields (List[str]): Changed dataset fields
+            changed_resources (List[Tuple[Resource, List[str]]]): Changed resources with their changed fields
+            new_resources (List[Resource]): Resources to create
+
+        Returns:
+            None
+        """
+        for resource, fields in changed_resources:
+            if resource.get_file_to_upload():
+                resource._add_file_hash()
+                fields = set(fields) | {'hash'}
+            await AsyncResource._patch_to_hdx(resource, 'id', fields, resource.get_file_to_upload())
+        for resource in new_resources:
+            resource['package_id'] = dataset.data['id']
+            resource._add_file_hash()
+            await AsyncResource._save_to_hdx(resource, 'create', 'name', resource.get_file_to_upload())
+        if changed_fields:
+            await cls._patch_to_hdx(dataset, 'id', changed_fields)
+            dataset.init_resources()
+            dataset.separate_resources()
+
+    @classmethod
+    async def update_in_hdx(cls, dataset, update_resources=True, patch=False):
+        # type: (Dataset, bool, bool) -> bool
+        """Check if dataset exists in HDX and if so, update it. The dataset should not be used by other code until
+        this has finished.
+
+        Args:
+            dataset (Dataset): Dataset to update
+            update_resources (bool): Whether to update resources. Defaults to True.
+            patch (bool): Whether to send only changes using patch actions. Defaults to False.
+
+        Returns:
+            bool: True if dataset was updated in HDX, False if it was unchanged
+        """
+        if 'id' not in dataset.data:
+            dataset._check_existing_object('dataset', 'name')
+        if not await cls._load_existing(dataset):
+            raise HDXError('No existing dataset to update!')
+        return await cls._dataset_merge_hdx_update(dataset, update_resources, patch)
+
+    @classmethod
+    async def create_in_hdx(cls, dataset, allow_no_resources=False):
+        # type: (Dataset, bool) -> str
+        """Check if dataset exists in HDX and if so, update it, otherwise create it. The dataset should not be used
+        by other code until this has finished.
+
+        Args:
+            dataset (Dataset): Dataset to create
+            allow_no_resources (bool): Whether to allow no resources. Defaults to False.
+
+        Returns:
+            str: Outcome - one of created, updated or unchanged
+        """
+        dataset.check_required_fields(allow_no_resources=allow_no_resources)
+        loadedid = await cls._load_existing(dataset)
+        if loadedid:
+            logger.warning('Dataset exists. Updating %s' % loadedid)
+            if await cls._dataset_merge_hdx_update(dataset, True):
+                return 'updated'
+            return 'unchanged'
+        filestore_resources = dataset._dataset_prepare_create()
+        await cls._save_to_hdx(dataset, 'create', 'name')
+        if 'id' in dataset.data:
+            dataset._set_cached_id(dataset.data['name'], dataset.data['id'])
+        await cls._upload_resources(dataset, filestore_resources)
+        dataset.init_resources()
+        dataset.separate_resources()
+        return 'created'
+
+    @classmethod
+    async def delete_from_hdx(cls, dataset):
+        # type: (Dataset) -> None
+        """Deletes dataset from HDX
+
+        Args:
+            dataset (Dataset): Dataset to delete
+
+        Returns:
+            None
+        """
+        await super(AsyncDataset, cls).delete_from_hdx(dataset)
+        if 'name' in dataset.old_data:
+            dataset._set_cached_id(dataset.old_data['name'], None)
+
+    @classmethod
+    async def search_in_hdx(cls, query='*:*', configuration=None, **kwargs):
+        # type: (Optional[str], Optional[Configuration], ...) -> List[Union[Dataset, DatasetSummary]]
+        """Searches for datasets in HDX, redoing the search if the results are inconsistent
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See Dataset.search_in_hdx
+
+        Returns:
+            List[Union[Dataset, DatasetSummary]]: List of datasets resulting from query
+        """
+        return await cls._search_consistently(lambda: cls.iter_search_in_hdx(query, configuration=configuration,
+                                                                             **kwargs))
+
+    @classmethod
+    async def iter_search_in_hdx(cls, query='*:*', configuration=None, **kwargs):
+        # type: (Optional[str], Optional[Configuration], ...) -> AsyncIterator[Union[Dataset, DatasetSummary]]
+        """Searches for datasets in HDX yielding them page by page (see Dataset.iter_search_in_hdx)
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See Dataset.iter_search_in_hdx
+
+        Returns:
+            AsyncIterator[Union[Dataset, DatasetSummary]]: Iterator over datasets resulting from query
+        """
+        kwargs = dict(kwargs)
+        create = Dataset._get_search_result_creator(configuration, kwargs)
+        if kwargs.pop('keyset', False):
+            async for dataset in cls._keyset_search_in_hdx(query, configuration, create, **kwargs):
+                yield dataset
+            return
+        dataset = Dataset(configuration=configuration)
+        total_rows = kwargs.get('rows', max_int)
+        start = kwargs.get('start', 0)
+
+        async def read_page(page):
+            page_start, rows = page
+            pagekwargs = dict(kwargs)
+            pagekwargs['start'] = page_start
+            pagekwargs['rows'] = rows
+            _, result = await cls._read_from_hdx(dataset, query, 'q', Dataset.actions()['search'], **pagekwargs)
+            return result
+
+        async for datasetdict in cls._iter_search_pages(dataset, read_page, start, total_rows,
+                                                        hdx.data.dataset.page_size):
+            yield create(datasetdict)
+
+    @classmethod
+    async def _keyset_search_in_hdx(cls, query, configuration, create, **kwargs):
+        # type: (str, Optional[Configuration], Callable[[dict], Union[Dataset, DatasetSummary]], ...) -> AsyncIterator[Union[Dataset, DatasetSummary]]
+        """Searches for datasets in HDX paging by dataset id (see Dataset._keyset_search_in_hdx)
+
+        Args:
+            query (str): Query (in Solr format)
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            create (Callable[[dict], Union[Dataset, DatasetSummary]]): Function that creates object from search result dict
+            **kwargs: See Dataset.iter_search_in_hdx
+
+        Returns:
+            AsyncIterator[Union[Dataset, DatasetSummary]]: Iterator over datasets resulting from query
+        """
+        if 'sort' in kwargs:
+            raise HDXError('Cannot sort when paging by dataset id!')
+        dataset = Dataset(configuration=configuration)
+        total_rows = kwargs.get('rows', max_int)
+        fq = kwargs.get('fq', None)
+        kwargs['sort'] = 'id asc'
+        kwargs['start'] = kwargs.get('start', 0)  # only applies to the first page
+        sizer = dataset._get_page_sizer(hdx.data.dataset.page_size)
+
+        async def read_page(rows):
+            kwargs['rows'] = rows
+            _, result = await cls._read_from_hdx(dataset, query, 'q', Dataset.actions()['search'], **kwargs)
+            return result
+
+        read_page = cls._timed(sizer, read_page, dataset._count_search_results)
+        rows_read = 0
+        while rows_read < total_rows:
+            rows = min(total_rows - rows_read, sizer.size)
+            result = await read_page(rows)
+            if not result:
+                logger.debug(result)
+                break
+            results = result.get('results', list())
+            for datasetdict in results:
+                yield create(datasetdict)
+            rows_read += len(results)
+            if len(results) < rows:
+                break
+            idfilter = 'id:{"%s" TO *]' % results[-1]['id']
+            if fq:
+                kwargs['fq'] = '%s AND (%s)' % (idfilter, fq)
+            else:
+                kwargs['fq'] = idfilter
+            kwargs['start'] = 0
+
+    @classmethod
+    async def get_all_datasets(cls, configuration=None, **kwargs):
+        # type: (Optional[Configuration], ...) -> List[Union[Dataset, DatasetSummary]]
+        """Get all datasets in HDX, rereading only the pages involved if datasets are returned more than once (see
+        Dataset.get_all_datasets)
+
+        Args:
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See Dataset.get_all_datasets
+
+        Returns:
+            List[Union[Dataset, DatasetSummary]]: List of all datasets in HDX
+        """
+        keyset = kwargs.pop('keyset', False)
+        fields = kwargs.pop('fields', None)
+        compact = kwargs.pop('compact', False)
+        if keyset or fields:
+            return await cls.search_in_hdx(configuration=configuration, rows=kwargs.get('limit', max_int),
+                                           start=kwargs.get('offset', 0), keyset=keyset, fields=fields,
+                                           compact=compact)
+
+        dataset = Dataset(configuration=configuration)
+        dataset['id'] = 'all datasets'  # only for error message if produced
+        total_rows = kwargs.get('limit', max_int)
+        start = kwargs.get('offset', 0)
+
+        async def read_page(page):
+            offset, rows = page
+            pagekwargs = dict(kwargs)
+            pagekwargs['offset'] = offset
+            pagekwargs['limit'] = rows
+            return await cls._write_to_hdx(dataset, 'all', pagekwargs, 'id')
+
+        if compact:
+            create = Dataset._get_compact_creator()
+        else:
+            create = lambda datasetdict: Dataset._dataset_from_dict(datasetdict, configuration)
+
+        def create_datasets(result):
+            return [create(datasetdict) for datasetdict in result or list()]
+
+        sizer = dataset._get_page_sizer(hdx.data.dataset.page_size)
+        read_page = cls._timed(sizer, read_page)
+        pages = list()
+        async for page, result in cls._read_pages(dataset, read_page, sizer.pages(start, total_rows)):
+            if not result:
+                logger.debug(result)
+                break
+            pages.append((page, create_datasets(result)))
+            if len(result) < page[1]:
+                break
+        reread = Dataset._get_pages_with_duplicates(pages)
+        attempts = 0
+        while reread:
+            if attempts == max_attempts:
+                raise HDXError('Maximum attempts reached for getting all datasets!')
+            attempts += 1
+            logger.info('Rereading pages of all datasets at offsets: %s' %
+                        ', '.join([str(pages[index][0][0]) for index in reread]))
+            shifted = set()
+            results = [x async for x in cls._read_pages(dataset, read_page, [pages[index][0] for index in reread])]
+            for index, (page, result) in zip(reread, results):
+                datasets = create_datasets(result)
+                if Dataset._get_page_boundary(datasets) != Dataset._get_page_boundary(pages[index][1]):
+                    shifted.update([x for x in (index - 1, index + 1) if 0 <= x < len(pages)])
+                pages[index] = (page, datasets)
+            shifted -= set(reread)
+            reread = sorted(set(Dataset._get_pages_with_duplicates(pages)) | shifted)
+        return [x for _, datasets in pages for x in datasets]
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""Executor for blocking HDX calls eg. calls made through a transport: runs blocking functions on a shared thread pool
+so that they can be awaited (Python 3.7+). The number of such calls in flight at once is limited to the number of
+workers of the executor.
+"""
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Optional, Callable, Any
+
+max_workers = 10
+_executor = None  # type: Optional[Executor]
+
+
+def setup_executor(executor=None, workers=max_workers):
+    # type: (Optional[Executor], int) -> None
+    """Set up executor used to run blocking HDX calls. Calls awaited beyond the executor's number of workers wait in
+    its queue without blocking the event loop.
+
+    Args:
+        executor (Optional[Executor]): Executor to use. Defaults to a thread pool with workers threads.
+        workers (int): Number of threads if no executor is given. Defaults to 10.
+
+    Returns:
+        None
+    """
+    global _executor
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=workers)
+    _executor = executor
+
+
+def get_executor():
+    # type: () -> Executor
+    """Get executor used to run blocking HDX calls, setting up the default one if none has been set up
+
+    Returns:
+        Executor: Executor used to run blocking HDX calls
+    """
+    if _executor is None:
+        setup_executor()
+    return _executor
+
+
+async def run_in_executor(function, *args, **kwargs):
+    # type: (Callable[..., Any], ...) -> Any
+    """Run blocking function in executor and wait for its result without blocking the event loop
+
+    Args:
+        function (Callable[..., Any]): Function to run
+        *args: Arguments to pass to function
+        **kwargs: Keyword arguments to pass to function
+
+    Returns:
+        Any: Result of function
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(function, *args, **kwargs))
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""AsyncHDXObject abstract class containing the async versions of methods common to HDX objects (Python 3.7+).
+They call the remote CKAN asynchronously and use the helper methods of the HDX object classes in hdx.data to merge
+and check metadata, so they behave as the blocking methods do.
+"""
+import asyncio
+import copy
+import logging
+import time
+from itertools import islice
+from typing import Optional, Any, Tuple, Union, Iterable, Callable, Awaitable, AsyncIterator, List
+
+from ckanapi.errors import NotFound
+
+from hdx.aio.remoteckan import call_remoteckan
+from hdx.data.hdxobject import HDXObject, HDXError, HDXInconsistentResultsError, read_only_actions, max_attempts
+from hdx.hdx_configuration import Configuration
+from hdx.utilities import raisefrom
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncHDXObject(object):
+    """AsyncHDXObject abstract class containing async versions of methods common to HDX objects. Subclasses set
+    hdxobjectclass to the HDX object class whose methods they provide and object_type to its description.
+    """
+    hdxobjectclass = HDXObject
+    object_type = 'hdxobject'
+
+    @staticmethod
+    async def _read_from_hdx(hdxobject, value, fieldname='id', action=None, use_readcache=True, **kwargs):
+        # type: (HDXObject, str, str, Optional[str], bool, ...) -> Tuple[bool, Union[dict, str]]
+        """Helper method to read from HDX (see HDXObject._read_from_hdx). If a read cache has been set up, results
+        of the show action are taken from and stored in it.
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object whose actions and configuration are used
+            value (str): Value of HDX field
+            fieldname (str): HDX field name. Defaults to id.
+            action (Optional[str]): Replacement CKAN action url to use. Defaults to None.
+            use_readcache (bool): Whether to use read cache if one has been set up. Defaults to True.
+            **kwargs: Other fields to pass to CKAN.
+
+        Returns:
+            Tuple[bool, Union[dict, str]]: (True/False, HDX object metadata/Error)
+        """
+        if action is None:
+            action = hdxobject.actions()['show']
+        else:
+            use_readcache = False
+        if use_readcache:
+            found, result = hdxobject._get_from_readcache(action, value, kwargs)
+            if found:
+                return True, result
+        data = {fieldname: value}
+        data.update(kwargs)
+        try:
+            result = await call_remoteckan(action, data, configuration=hdxobject.configuration)
+            if use_readcache:
+                hdxobject._set_in_readcache(action, value, kwargs, result)
+            return True, result
+        except NotFound:
+            return False, '%s=%s: not found!' % (fieldname, value)
+        except Exception as e:
+            raisefrom(HDXError, 'Failed when trying to read: %s=%s! (POST)' % (fieldname, value), e)
+
+    @classmethod
+    async def _load_from_hdx(cls, hdxobject, value, use_readcache=True):
+        # type: (HDXObject, str, bool) -> bool
+        """Helper method to load the HDX object given by identifier from HDX into the HDX object
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object to load into
+            value (str): Identifier of HDX object
+            use_readcache (bool): Whether to use read cache if one has been set up. Defaults to True.
+
+        Returns:
+            bool: True if loaded, False if not
+        """
+        success, result = await cls._read_from_hdx(hdxobject, value, use_readcache=use_readcache)
+        if success:
+            hdxobject._set_loaded_data(result)
+            return True
+        logger.debug(result)
+        return False
+
+    @staticmethod
+    async def _write_to_hdx(hdxobject, action, data, id_field_name, file_to_upload=None):
+        # type: (HDXObject, str, dict, str, Optional[str]) -> Any
+        """Helper method to write to HDX (see HDXObject._write_to_hdx). If a journal has been set up, the write is
+        appended to it instead and the data is returned.
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object whose actions and configuration are used
+            action (str): Action to perform eg. 'create', 'update'
+            data (dict): Data to write to HDX
+            id_field_name (str): Name of field containing HDX object identifier
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            Any: HDX object metadata or other result of action
+        """
+        if action not in read_only_actions and hdxobject.configuration.has_journal():
+            hdxobject.configuration.journal().append(hdxobject.actions()[action], data, id_field_name, file_to_upload)
+            return copy.deepcopy(data)
+        file = None
+        try:
+            if file_to_upload:
+                file = open(file_to_upload, 'rb')
+                files = [('upload', file)]
+            else:
+                files = None
+            result = await call_remoteckan(hdxobject.actions()[action], data, configuration=hdxobject.configuration,
+                                           files=files, upload_callback=hdxobject._get_upload_callback())
+        except Exception as e:
+            raisefrom(HDXError, 'Failed when trying to %s %s! (POST)' % (action, data[id_field_name]), e)
+        finally:
+            if file:
+                file.close()
+            hdxobject._invalidate_cached(data)
+        hdxobject._invalidate_cached(result)
+        return result
+
+    @classmethod
+    async def _save_to_hdx(cls, hdxobject, action, id_field_name, file_to_upload=None):
+        # type: (HDXObject, str, str, Optional[str]) -> None
+        """Helper method to write HDX object to HDX, saving current data and replacing with returned HDX object data
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object to write
+            action (str): Action to perform eg. 'update', 'delete'
+            id_field_name (str): Name of field containing HDX object identifier
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            None
+        """
+        result = await cls._write_to_hdx(hdxobject, action, hdxobject.data, id_field_name, file_to_upload)
+        hdxobject.old_data = hdxobject.data
+        hdxobject.data = result
+
+    @classmethod
+    async def _patch_to_hdx(cls, hdxobject, id_field_name, fields, file_to_upload=None):
+        # type: (HDXObject, str, Iterable[str], Optional[str]) -> None
+        """Helper method to update only the given fields of HDX object in HDX using the patch action, saving current
+        data and replacing with returned HDX object data
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object to patch
+            id_field_name (str): Name of field containing HDX object identifier
+            fields (Iterable[str]): Fields of HDX object to send
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            None
+        """
+        if 'patch' not in hdxobject.actions():
+            raise HDXError('Patch is not supported for %s!' % hdxobject.data[id_field_name])
+        data = {id_field_name: hdxobject.data[id_field_name]}
+        for field in fields:
+            data[field] = hdxobject.data[field]
+        result = await cls._write_to_hdx(hdxobject, 'patch', data, id_field_name, file_to_upload)
+        hdxobject.old_data = hdxobject.data
+        hdxobject.data = result
+
+    @classmethod
+    async def _merge_hdx_update(cls, hdxobject, id_field_name, file_to_upload=None, patch=False):
+        # type: (HDXObject, str, Optional[str], bool) -> bool
+        """Helper method to merge the metadata into the metadata just loaded from HDX and update HDX object in HDX if
+        anything changed (see HDXObject._merge_hdx_update)
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object to update
+            id_field_name (str): Name of field containing HDX object identifier
+            file_to_upload (Optional[str]): File to upload to HDX
+            patch (bool): Whether to send only changed fields using patch action. Defaults to False.
+
+        Returns:
+            bool: True if HDX object was updated in HDX, False if it was unchanged
+        """
+        changed_fields, file_to_upload = hdxobject._prepare_hdx_update(cls.object_type, id_field_name, file_to_upload)
+        if not changed_fields and file_to_upload is None:
+            return False
+        if patch:
+            await cls._patch_to_hdx(hdxobject, id_field_name, changed_fields, file_to_upload)
+        else:
+            await cls._save_to_hdx(hdxobject, 'update', id_field_name, file_to_upload)
+        return True
+
+    @staticmethod
+    async def _read_pages(hdxobject, read_page, pages):
+        # type: (HDXObject, Callable[[Any], Awaitable[Any]], Iterable[Any]) -> AsyncIterator[Tuple[Any, Any]]
+        """Helper method to read pages from HDX yielding tuples of page and result in page order (see
+        HDXObject._read_pages). If more than one worker is configured, that many pages at a time are read
+        concurrently.
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object whose configuration is used
+            read_page (Callable[[Any], Awaitable[Any]]): Coroutine function that reads a page from HDX
+            pages (Iterable[Any]): Pages to read (passed to read_page)
+
+        Returns:
+            AsyncIterator[Tuple[Any, Any]]: Iterator over (page, result)
+        """
+        workers = hdxobject._get_paging_workers()
+        pages = iter(pages)
+        if workers <= 1:
+            for page in pages:
+                yield page, await read_page(page)
+            return
+        batch = list(islice(pages, workers))
+        while batch:
+            for page, result in zip(batch, await asyncio.gather(*[read_page(page) for page in batch])):
+                yield page, result
+            batch = list(islice(pages, workers))
+
+    @staticmethod
+    def _timed(sizer, read_page, count_results=len):
+        # type: (Any, Callable[[Any], Awaitable[Any]], Callable[[Any], int]) -> Callable[[Any], Awaitable[Any]]
+        """Wrap coroutine function that reads a page so that the page size is updated after each page read (see
+        PageSizer.timed)
+
+        Args:
+            sizer (PageSizer): Object that chooses page sizes
+            read_page (Callable[[Any], Awaitable[Any]]): Coroutine function that reads a page from HDX
+            count_results (Callable[[Any], int]): Function that counts results in page result. Defaults to len.
+
+        Returns:
+            Callable[[Any], Awaitable[Any]]: Coroutine function that reads a page from HDX
+        """
+        if not sizer.adaptive:
+            return read_page
+
+        async def timed_read_page(page):
+            begin = time.time()
+            result = await read_page(page)
+            if result:
+                sizer.update(count_results(result), time.time() - begin, result)
+            return result
+
+        return timed_read_page
+
+    @classmethod
+    async def _iter_search_pages(cls, hdxobject, read_page, start, total_rows, default_page_size):
+        # type: (HDXObject, Callable[[Tuple[int, int]], Awaitable[Any]], int, int, int) -> AsyncIterator[dict]
+        """Helper method to read the pages of a search of HDX objects yielding the HDX object metadata dicts in order
+        (see HDXObject._iter_search_pages)
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object whose configuration is used
+            read_page (Callable[[Tuple[int, int]], Awaitable[Any]]): Coroutine function that reads page given (offset, rows)
+            start (int): Offset of first HDX object to read
+            total_rows (int): Maximum number of HDX objects to read
+            default_page_size (int): Default number of rows in page
+
+        Returns:
+            AsyncIterator[dict]: Iterator over HDX object metadata dicts
+        """
+        if hdxobject._get_paging_workers() > 1:
+            first_count = hdxobject._get_search_count(await read_page((start, 0)))
+            if not first_count:
+                return
+            pages = hdxobject._get_search_pages(start, total_rows, first_count, default_page_size)
+        else:
+            first_count = None
+            sizer = hdxobject._get_page_sizer(default_page_size)
+            read_page = cls._timed(sizer, read_page, hdxobject._count_search_results)
+            pages = sizer.pages(start, total_rows)
+        ids = set()
+        async for (_, rows), result in cls._read_pages(hdxobject, read_page, pages):
+            results, first_count = hdxobject._check_search_page(cls.object_type, result, first_count, ids)
+            if results is None:
+                break
+            for hdxobjectdict in results:
+                yield hdxobjectdict
+            if len(results) < rows:
+                break
+
+    @classmethod
+    async def _search_consistently(cls, search):
+        # type: (Callable[[], AsyncIterator[Any]]) -> List[Any]
+        """Helper method to read all results of a search of HDX objects, redoing the search if the results are
+        inconsistent up to max_attempts times (see HDXObject._search_consistently)
+
+        Args:
+            search (Callable[[], AsyncIterator[Any]]): Function that returns async iterator over search results
+
+        Returns:
+            List[Any]: Results of search
+        """
+        attempts = 0
+        while attempts < max_attempts:  # if the count values vary for multiple calls, then must redo query
+            try:
+                return [x async for x in search()]
+            except HDXInconsistentResultsError as e:
+                logger.debug(e)
+                attempts += 1
+        raise HDXError('Maximum attempts reached for searching for %ss!' % cls.object_type)
+
+    @staticmethod
+    def _get_file_to_upload(hdxobject):
+        # type: (HDXObject) -> Optional[str]
+        """Get file to upload to HDX if the HDX object uploads files (see Resource.set_file_to_upload)
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object
+
+        Returns:
+            Optional[str]: File to upload to HDX or None
+        """
+        return getattr(hdxobject, 'file_to_upload', None)
+
+    @classmethod
+    async def read_from_hdx(cls, identifier, configuration=None):
+        # type: (str, Optional[Configuration]) -> Optional[HDXObject]
+        """Reads the HDX object given by identifier from HDX and returns it
+
+        Args:
+            identifier (str): Identifier of HDX object
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+
+        Returns:
+            Optional[T <= HDXObject]: HDX object if successful read, None if not
+        """
+        hdxobject = cls.hdxobjectclass(configuration=configuration)
+        if await cls._load_from_hdx(hdxobject, identifier):
+            return hdxobject
+        return None
+
+    @classmethod
+    async def create_in_hdx(cls, hdxobject):
+        # type: (HDXObject) -> None
+        """Check if HDX object exists in HDX and if so, update it, otherwise create it. The HDX object should not be
+        used by other code until this has finished.
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object to create
+
+        Returns:
+            None
+        """
+        file_to_upload = cls._get_file_to_upload(hdxobject)
+        hdxobject.check_required_fields()
+        if 'id' in hdxobject.data and await cls._load_from_hdx(hdxobject, hdxobject.data['id'], use_readcache=False):
+            logger.warning('%s exists. Updating %s' % (cls.object_type, hdxobject.data['id']))
+            await cls._merge_hdx_update(hdxobject, 'id', file_to_upload)
+        else:
+            await cls._save_to_hdx(hdxobject, 'create', 'name', file_to_upload)
+
+    @classmethod
+    async def update_in_hdx(cls, hdxobject, patch=False):
+        # type: (HDXObject, bool) -> bool
+        """Check if HDX object exists in HDX and if so, update it. The HDX object should not be used by other code
+        until this has finished.
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object to update
+            patch (bool): Whether to send only changed fields using patch action. Defaults to False.
+
+        Returns:
+            bool: True if HDX object was updated in HDX, False if it was unchanged
+        """
+        hdxobject._check_existing_object(cls.object_type, 'id')
+        if not await cls._load_from_hdx(hdxobject, hdxobject.data['id'], use_readcache=False):
+            raise HDXError('No existing %s to update!' % cls.object_type)
+        return await cls._merge_hdx_update(hdxobject, 'id', cls._get_file_to_upload(hdxobject), patch)
+
+    @classmethod
+    async def delete_from_hdx(cls, hdxobject):
+        # type: (HDXObject) -> None
+        """Deletes HDX object from HDX
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object to delete
+
+        Returns:
+            None
+        """
+        hdxobject._check_existing_object(cls.object_type, 'id')
+        await cls._save_to_hdx(hdxobject, 'delete', 'id')
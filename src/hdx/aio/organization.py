@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""AsyncOrganization class containing async versions of Organization methods (Python 3.7+)."""
+from typing import List, Optional, Union
+
+from hdx.aio.dataset import AsyncDataset
+from hdx.aio.hdxobject import AsyncHDXObject
+from hdx.data.dataset import Dataset, DatasetSummary
+from hdx.data.organization import Organization
+
+
+class AsyncOrganization(AsyncHDXObject):
+    """AsyncOrganization class containing async versions of Organization methods eg.
+
+        organization = await AsyncOrganization.read_from_hdx('NAME_OR_ID')
+        datasets = await AsyncOrganization.get_datasets(organization)
+    """
+    hdxobjectclass = Organization
+    object_type = 'organization'
+
+    @staticmethod
+    async def get_datasets(organization, include_gallery=True, query='*:*', **kwargs):
+        # type: (Organization, Optional[bool], Optional[str], ...) -> List[Union[Dataset, DatasetSummary]]
+        """Get list of datasets in organization
+
+        Args:
+            organization (Organization): Organization
+            include_gallery (Optional[bool]): Whether to include gallery items in datasets. Defaults to True.
+            query (Optional[str]): Restrict datasets returned to this query (in Solr format). Defaults to '*:*'.
+            **kwargs: See Organization.get_datasets
+
+        Returns:
+            List[Union[Dataset, DatasetSummary]]: List of datasets in organization
+        """
+        return await AsyncDataset.search_in_hdx(query=query, include_gallery=include_gallery,
+                                                configuration=organization.configuration,
+                                                fq='organization:%s' % organization.data['name'], **kwargs)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Async call layer: calls the remote CKAN and downloads files with aiohttp so that any number of calls can be in
+flight on one event loop (Python 3.7+). It needs aiohttp which is installed with pip install hdx-python-api[aio].
+"""
+import asyncio
+import weakref
+from base64 import b64encode
+from typing import Optional, List, Tuple, Any, Callable, AsyncIterator
+
+import aiohttp
+from ckanapi.common import prepare_action, reverse_apicontroller_action
+
+from hdx.aio.executor import run_in_executor
+from hdx.hdx_configuration import Configuration
+from hdx.utilities import raisefrom
+from hdx.utilities.downloader import Download, DownloadError
+from hdx.utilities.multipart import MultipartEncoder
+
+connection_limit = 100
+download_chunk_size = 10240
+_sessions = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+
+def setup_session(session=None, limit=connection_limit):
+    # type: (Optional[aiohttp.ClientSession], int) -> aiohttp.ClientSession
+    """Set up aiohttp session used to call the remote CKAN from the running event loop. Calls beyond the session's
+    connection limit wait for a free connection without blocking the event loop. Must be called from a coroutine.
+
+    Args:
+        session (Optional[aiohttp.ClientSession]): Session to use. Defaults to a new session.
+        limit (int): Maximum number of simultaneous connections if no session is given. Defaults to 100.
+
+    Returns:
+        aiohttp.ClientSession: Session used to call the remote CKAN
+    """
+    if session is None:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit))
+    _sessions[asyncio.get_running_loop()] = session
+    return session
+
+
+def get_session():
+    # type: () -> aiohttp.ClientSession
+    """Get aiohttp session used to call the remote CKAN from the running event loop, setting up the default one if
+    none has been set up. Must be called from a coroutine.
+
+    Returns:
+        aiohttp.ClientSession: Session used to call the remote CKAN
+    """
+    session = _sessions.get(asyncio.get_running_loop())
+    if session is None or session.closed:
+        session = setup_session()
+    return session
+
+
+async def close_session():
+    # type: () -> None
+    """Close aiohttp session used to call the remote CKAN from the running event loop if there is one
+
+    Returns:
+        None
+    """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+
+async def _read_body(body):
+    # type: (MultipartEncoder) -> AsyncIterator[bytes]
+    """Read multipart body a chunk at a time in the default executor so that reading files does not block the event
+    loop
+
+    Args:
+        body (MultipartEncoder): Multipart body
+
+    Returns:
+        AsyncIterator[bytes]: Chunks of body
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, body.read, body.chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def call_remoteckan(action, data_dict=None, configuration=None, files=None, upload_callback=None):
+    # type: (str, Optional[dict], Optional[Configuration], Optional[List[Tuple[str, Any]]], Optional[Callable[[int, int, float], None]]) -> Any
+    """Calls the remote CKAN (see Configuration.call_remoteckan). Files are uploaded with a streaming multipart body.
+    Calls are subject to the configuration's rate limiter if one has been set up. If a transport has been set up (see
+    Configuration.setup_transport), the call is made through it in the executor.
+
+    Args:
+        action (str): CKAN action eg. package_show
+        data_dict (Optional[dict]): Data to pass to CKAN action. Defaults to None.
+        configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+        files (Optional[List[Tuple[str, Any]]]): List of (form field name, file opened in binary mode) to upload. Defaults to None.
+        upload_callback (Optional[Callable[[int, int, float], None]]): Function to call with bytes uploaded, total bytes and bytes per second. Defaults to None.
+
+    Returns:
+        Any: The response from the remote CKAN action
+    """
+    if configuration is None:
+        configuration = Configuration.read()
+    if configuration.has_transport():
+        if files:
+            return await run_in_executor(configuration.call_remoteckan, action, data_dict, files=files,
+                                         upload_callback=upload_callback)
+        return await run_in_executor(configuration.call_remoteckan, action, data_dict)
+    if configuration.has_ratelimiter():
+        delay = configuration.ratelimiter().reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+    remoteckan = configuration.remoteckan()
+    url, data, headers = prepare_action(action, data_dict, remoteckan.apikey, files)
+    if files:
+        body = MultipartEncoder(data, files, callback=upload_callback)
+        headers['Content-Type'] = body.content_type
+        headers['Content-Length'] = str(len(body))
+        data = _read_body(body)
+    headers['User-Agent'] = remoteckan.user_agent
+    url = '%s/%s' % (remoteckan.address.rstrip('/'), url)
+    username, password = configuration._get_credentials()
+    if username:  # replaces api key in Authorization header as requests does
+        credentials = b64encode(('%s:%s' % (username, password)).encode('utf-8')).decode('ascii')
+        headers['Authorization'] = 'Basic %s' % credentials
+    async with get_session().post(url, data=data, headers=headers) as response:
+        status = response.status
+        content = await response.text()
+    return reverse_apicontroller_action(url, status, content)
+
+
+async def download_file(url, folder=None):
+    # type: (str, Optional[str]) -> str
+    """Stream file from url to provided folder or temporary folder if no folder supplied using the aiohttp session
+    of the running event loop
+
+    Args:
+        url (str): URL to download
+        folder (Optional[str]): Folder to download it to. Defaults to None (temporary folder).
+
+    Returns:
+        str: Path of downloaded file
+    """
+    path = Download.get_path_for_url(url, folder)
+    try:
+        async with get_session().get(url) as response:
+            response.raise_for_status()
+            with open(path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(download_chunk_size):
+                    f.write(chunk)
+        return path
+    except Exception as e:
+        raisefrom(DownloadError, 'Download of %s failed!' % url, e)
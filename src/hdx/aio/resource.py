@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""AsyncResource class containing async versions of Resource methods (Python 3.7+)."""
+from typing import Optional, List, Tuple, AsyncIterator
+
+import hdx.data.hdxobject
+from hdx.aio.hdxobject import AsyncHDXObject
+from hdx.aio.remoteckan import download_file
+from hdx.data.hdxobject import HDXError, max_int
+from hdx.data.resource import Resource
+from hdx.hdx_configuration import Configuration
+
+
+class AsyncResource(AsyncHDXObject):
+    """AsyncResource class containing async versions of Resource methods eg.
+
+        resource = await AsyncResource.read_from_hdx('ID')
+        url, path = await AsyncResource.download(resource)
+    """
+    hdxobjectclass = Resource
+    object_type = 'resource'
+
+    @classmethod
+    async def create_in_hdx(cls, resource):
+        # type: (Resource) -> None
+        """Check if resource exists in HDX and if so, update it, otherwise create it
+
+        Args:
+            resource (Resource): Resource to create
+
+        Returns:
+            None
+        """
+        resource._add_file_hash()
+        await super(AsyncResource, cls).create_in_hdx(resource)
+
+    @classmethod
+    async def search_in_hdx(cls, query, configuration=None, **kwargs):
+        # type: (str, Optional[Configuration], ...) -> List[Resource]
+        """Searches for resources in HDX, redoing the search if the results are inconsistent
+
+        Args:
+            query (str): Query
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See Resource.search_in_hdx
+
+        Returns:
+            List[Resource]: List of resources resulting from query
+        """
+        return await cls._search_consistently(lambda: cls.iter_search_in_hdx(query, configuration=configuration,
+                                                                             **kwargs))
+
+    @classmethod
+    async def iter_search_in_hdx(cls, query, configuration=None, **kwargs):
+        # type: (str, Optional[Configuration], ...) -> AsyncIterator[Resource]
+        """Searches for resources in HDX yielding them page by page (see Resource.iter_search_in_hdx)
+
+        Args:
+            query (str): Query
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See Resource.search_in_hdx
+
+        Returns:
+            AsyncIterator[Resource]: Iterator over resources resulting from query
+        """
+        resource = Resource(configuration=configuration)
+        total_rows = kwargs.get('limit', max_int)
+        start = kwargs.get('offset', 0)
+        kwargs['order_by'] = kwargs.get('order_by', 'id')  # pages need a consistent order
+
+        async def read_page(page):
+            offset, rows = page
+            pagekwargs = dict(kwargs)
+            pagekwargs['offset'] = offset
+            pagekwargs['limit'] = rows
+            _, result = await cls._read_from_hdx(resource, query, 'query', Resource.actions()['search'],
+                                                 **pagekwargs)
+            return result
+
+        async for resourcedict in cls._iter_search_pages(resource, read_page, start, total_rows,
+                                                         hdx.data.hdxobject.page_size):
+            yield Resource(resourcedict, configuration=configuration)
+
+    @staticmethod
+    async def download(resource, folder=None):
+        # type: (Resource, Optional[str]) -> Tuple[str, str]
+        """Download resource store to provided folder or temporary folder if no folder supplied, streaming it with
+        the aiohttp session of the running event loop
+
+        Args:
+            resource (Resource): Resource to download
+            folder (Optional[str]): Folder to download resource to. Defaults to None.
+
+        Returns:
+            Tuple[str, str]: (URL downloaded, Path to downloaded file)
+        """
+        url = resource.data.get('url', None)
+        if not url:
+            raise HDXError('No URL to download!')
+        return url, await download_file(url, folder)
@@ -0,0 +1,350 @@
+# -*- coding: utf-8 -*-
+"""Catalog class keeping a local SQLite mirror of HDX datasets, resources, organizations and groups."""
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Optional, List, Union, Iterable
+
+from hdx.data.dataset import Dataset
+from hdx.hdx_configuration import Configuration
+
+logger = logging.getLogger(__name__)
+
+schema = '''
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    organization_id TEXT,
+    organization_name TEXT,
+    dataset_date TEXT,
+    dataset_end_date TEXT,
+    metadata_modified TEXT,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS datasets_name ON datasets (name);
+CREATE INDEX IF NOT EXISTS datasets_organization_id ON datasets (organization_id);
+CREATE INDEX IF NOT EXISTS datasets_organization_name ON datasets (organization_name);
+CREATE INDEX IF NOT EXISTS datasets_dataset_date ON datasets (dataset_date);
+CREATE INDEX IF NOT EXISTS datasets_metadata_modified ON datasets (metadata_modified);
+CREATE TABLE IF NOT EXISTS resources (
+    id TEXT PRIMARY KEY,
+    dataset_id TEXT NOT NULL,
+    name TEXT,
+    format TEXT,
+    url TEXT
+);
+CREATE INDEX IF NOT EXISTS resources_dataset_id ON resources (dataset_id);
+CREATE TABLE IF NOT EXISTS organizations (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    title TEXT
+);
+CREATE TABLE IF NOT EXISTS groups (
+    name TEXT PRIMARY KEY,
+    title TEXT
+);
+CREATE TABLE IF NOT EXISTS dataset_groups (
+    dataset_id TEXT NOT NULL,
+    group_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dataset_groups_group_name ON dataset_groups (group_name);
+CREATE INDEX IF NOT EXISTS dataset_groups_dataset_id ON dataset_groups (dataset_id);
+CREATE TABLE IF NOT EXISTS dataset_tags (
+    dataset_id TEXT NOT NULL,
+    tag TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dataset_tags_tag ON dataset_tags (tag);
+CREATE INDEX IF NOT EXISTS dataset_tags_dataset_id ON dataset_tags (dataset_id);
+CREATE TABLE IF NOT EXISTS catalog_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+class Catalog(object):
+    """Local SQLite mirror of the HDX catalog. It is filled with refresh (or add_datasets) after which datasets can
+    be looked up by organization, tag, location (group) and date without any calls to HDX.
+
+    Args:
+        path (str): Path to SQLite database file. Defaults to ':memory:' (not persisted).
+        configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+    """
+
+    def __init__(self, path=':memory:', configuration=None):
+        # type: (str, Optional[Configuration]) -> None
+        self.path = path
+        if configuration is None:
+            self.configuration = Configuration.read()
+        else:
+            self.configuration = configuration
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(schema)
+
+    def close(self):
+        # type: () -> None
+        """Close database connection
+
+        Returns:
+            None
+        """
+        self.connection.close()
+
+    def get_state(self, key):
+        # type: (str) -> Optional[str]
+        """Get catalog state value eg. metadata_modified (latest modification time of datasets in catalog)
+
+        Args:
+            key (str): Name of value
+
+        Returns:
+            Optional[str]: Value or None if it is not set
+        """
+        row = self.connection.execute('SELECT value FROM catalog_state WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0]
+
+    def _set_state(self, key, value):
+        # type: (str, str) -> None
+        """Set catalog state value
+
+        Args:
+            key (str): Name of value
+            value (str): Value
+
+        Returns:
+            None
+        """
+        self.connection.execute('INSERT OR REPLACE INTO catalog_state (key, value) VALUES (?, ?)', (key, value))
+
+    def _clear(self):
+        # type: () -> None
+        """Delete everything in catalog
+
+        Returns:
+            None
+        """
+        for table in ('datasets', 'resources', 'organizations', 'groups', 'dataset_groups', 'dataset_tags',
+                      'catalog_state'):
+            self.connection.execute('DELETE FROM %s' % table)
+
+    def _add_dataset(self, dataset):
+        # type: (Dataset) -> None
+        """Add or replace dataset in catalog. If the dataset date is invalid, ValueError is raised before the catalog
+        is changed.
+
+        Args:
+            dataset (Dataset): Dataset to add
+
+        Returns:
+            None
+        """
+        dataset_date = dataset.get_dataset_date()
+        dataset_end_date = dataset.get_dataset_end_date()
+        dataset_id = dataset['id']
+        for table in ('resources', 'dataset_groups', 'dataset_tags'):
+            self.connection.execute('DELETE FROM %s WHERE dataset_id = ?' % table, (dataset_id,))
+        datasetdict = dict(dataset.data)
+        resources = dataset._get_resources_data()
+        datasetdict['resources'] = resources
+        organization = datasetdict.get('organization') or dict()
+        organization_id = organization.get('id', datasetdict.get('owner_org'))
+        if organization_id:
+            self.connection.execute('INSERT OR REPLACE INTO organizations (id, name, title) VALUES (?, ?, ?)',
+                                    (organization_id, organization.get('name'), organization.get('title')))
+        self.connection.execute('DELETE FROM datasets WHERE name = ? AND id != ?', (dataset['name'], dataset_id))
+        self.connection.execute('INSERT OR REPLACE INTO datasets (id, name, organization_id, organization_name, '
+                                'dataset_date, dataset_end_date, metadata_modified, data) '
+                                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                (dataset_id, dataset['name'], organization_id, organization.get('name'),
+                                 dataset_date, dataset_end_date,
+                                 datasetdict.get('metadata_modified'), json.dumps(datasetdict)))
+        self.connection.executemany('INSERT OR REPLACE INTO resources (id, dataset_id, name, format, url) '
+                                    'VALUES (?, ?, ?, ?, ?)',
+                                    [(resource['id'], dataset_id, resource.get('name'), resource.get('format'),
+                                      resource.get('url')) for resource in resources])
+        groups = datasetdict.get('groups', list())
+        self.connection.executemany('INSERT OR REPLACE INTO groups (name, title) VALUES (?, ?)',
+                                    [(group['name'], group.get('title')) for group in groups])
+        self.connection.executemany('INSERT INTO dataset_groups (dataset_id, group_name) VALUES (?, ?)',
+                                    [(dataset_id, group['name']) for group in groups])
+        self.connection.executemany('INSERT INTO dataset_tags (dataset_id, tag) VALUES (?, ?)',
+                                    [(dataset_id, tag) for tag in dataset.get_tags()])
+
+    def _add_datasets(self, datasets):
+        # type: (Iterable[Dataset]) -> int
+        """Add or replace datasets in catalog without committing. Datasets with invalid dates are logged and skipped.
+
+        Args:
+            datasets (Iterable[Dataset]): Datasets to add
+
+        Returns:
+            int: Number of datasets added
+        """
+        no_datasets = 0
+        metadata_modified = self.get_state('metadata_modified')
+        for dataset in datasets:
+            try:
+                self._add_dataset(dataset)
+            except ValueError as e:
+                logger.error('Dataset %s has an invalid date and was not added to catalog: %s' %
+                             (dataset.data.get('name'), e))
+                continue
+            no_datasets += 1
+            modified = dataset.data.get('metadata_modified')
+            if modified and (metadata_modified is None or modified > metadata_modified):
+                metadata_modified = modified
+        if metadata_modified:
+            self._set_state('metadata_modified', metadata_modified)
+        return no_datasets
+
+    def add_datasets(self, datasets):
+        # type: (Iterable[Dataset]) -> int
+        """Add or replace datasets in catalog eg. from Dataset.search_in_hdx. Datasets with invalid dates are logged
+        and skipped.
+
+        Args:
+            datasets (Iterable[Dataset]): Datasets to add
+
+        Returns:
+            int: Number of datasets added
+        """
+        with self.connection:
+            return self._add_datasets(datasets)
+
+    def refresh(self, full=False):
+        # type: (bool) -> int
+        """Refresh catalog from HDX. If the catalog is empty or full is True, all datasets are read from HDX and
+        replace the contents of the catalog in a single transaction so that the catalog is unchanged if this fails.
+        Otherwise, only datasets modified since the latest modification time in the catalog are read and added. An
+        incremental refresh does not remove datasets that have been deleted from HDX so a full refresh should be run
+        from time to time. Datasets with invalid dates are logged and skipped.
+
+        Args:
+            full (bool): Whether to replace whole catalog. Defaults to False.
+
+        Returns:
+            int: Number of datasets added to catalog
+        """
+        metadata_modified = self.get_state('metadata_modified')
+        if full or metadata_modified is None:
+            datasets = Dataset.get_all_datasets(configuration=self.configuration)
+            logger.info('Full refresh of catalog read %d datasets' % len(datasets))
+            with self.connection:
+                self._clear()
+                return self._add_datasets(datasets)
+        datasets = Dataset.get_modified_since(metadata_modified, configuration=self.configuration)
+        logger.info('Incremental refresh of catalog read %d datasets modified since %s' %
+                    (len(datasets), metadata_modified))
+        return self.add_datasets(datasets)
+
+    @staticmethod
+    def _get_iso_date(date, date_only=False):
+        # type: (Union[datetime, str], bool) -> str
+        """Get date as ISO 8601 string for comparison with dates in catalog. Unless only the date is wanted, dates
+        with a timezone are converted to UTC like metadata_modified in the catalog.
+
+        Args:
+            date (Union[datetime.datetime, str]): Date as datetime.datetime object or string
+            date_only (bool): Whether to drop the time as for dataset dates. Defaults to False.
+
+        Returns:
+            str: Date as ISO 8601 string
+        """
+        if date_only:
+            if not isinstance(date, datetime):
+                date = Dataset._parse_date(date, None)
+            return date.date().isoformat()
+        return Dataset._get_utc_timestamp(date).isoformat()
+
+    def _datasets_from_rows(self, rows):
+        # type: (List[tuple]) -> List[Dataset]
+        """Create datasets from database rows containing dataset JSON
+
+        Args:
+            rows (List[tuple]): Database rows
+
+        Returns:
+            List[Dataset]: List of datasets
+        """
+        return [Dataset._dataset_from_dict(json.loads(row[0]), configuration=self.configuration) for row in rows]
+
+    def get_dataset(self, identifier):
+        # type: (str) -> Optional[Dataset]
+        """Get dataset from catalog given its id or name
+
+        Args:
+            identifier (str): Identifier of dataset
+
+        Returns:
+            Optional[Dataset]: Dataset or None if it is not in catalog
+        """
+        rows = self.connection.execute('SELECT data FROM datasets WHERE id = ? OR name = ?',
+                                       (identifier, identifier)).fetchall()
+        if not rows:
+            return None
+        return self._datasets_from_rows(rows)[0]
+
+    def get_datasets(self, organization=None, tag=None, location=None, date_from=None, date_to=None,
+                     modified_since=None):
+        # type: (Optional[str], Optional[str], Optional[str], Optional[Union[datetime, str]], Optional[Union[datetime, str]], Optional[Union[datetime, str]]) -> List[Dataset]
+        """Get datasets from catalog matching all the criteria given, ordered by name
+
+        Args:
+            organization (Optional[str]): Organization id or name. Defaults to None.
+            tag (Optional[str]): Tag. Defaults to None.
+            location (Optional[str]): Location ie. HDX group name eg. iso3 code like lby. Defaults to None.
+            date_from (Optional[Union[datetime.datetime, str]]): Dataset date (range) must end on or after this. Defaults to None.
+            date_to (Optional[Union[datetime.datetime, str]]): Dataset date (range) must start on or before this. Defaults to None.
+            modified_since (Optional[Union[datetime.datetime, str]]): Dataset metadata_modified must be on or after this. Defaults to None.
+
+        Returns:
+            List[Dataset]: List of datasets
+        """
+        conditions = list()
+        parameters = list()
+        if organization is not None:
+            conditions.append('(organization_id = ? OR organization_name = ?)')
+            parameters.extend([organization, organization])
+        if tag is not None:
+            conditions.append('id IN (SELECT dataset_id FROM dataset_tags WHERE tag = ?)')
+            parameters.append(tag)
+        if location is not None:
+            conditions.append('id IN (SELECT dataset_id FROM dataset_groups WHERE group_name = ?)')
+            parameters.append(location.lower())
+        if date_from is not None:
+            conditions.append('COALESCE(dataset_end_date, dataset_date) >= ?')
+            parameters.append(self._get_iso_date(date_from, date_only=True))
+        if date_to is not None:
+            conditions.append('dataset_date <= ?')
+            parameters.append(self._get_iso_date(date_to, date_only=True))
+        if modified_since is not None:
+            conditions.append('metadata_modified >= ?')
+            parameters.append(self._get_iso_date(modified_since))
+        query = 'SELECT data FROM datasets'
+        if conditions:
+            query = '%s WHERE %s' % (query, ' AND '.join(conditions))
+        query = '%s ORDER BY name' % query
+        return self._datasets_from_rows(self.connection.execute(query, parameters).fetchall())
+
+    def get_organization_names(self):
+        # type: () -> List[str]
+        """Get names of organizations of datasets in catalog
+
+        Returns:
+            List[str]: List of organization names
+        """
+        rows = self.connection.execute('SELECT name FROM organizations ORDER BY name').fetchall()
+        return [row[0] for row in rows]
+
+    def get_location_names(self):
+        # type: () -> List[str]
+        """Get names of locations (HDX groups) of datasets in catalog
+
+        Returns:
+            List[str]: List of location names
+        """
+        rows = self.connection.execute('SELECT name FROM groups ORDER BY name').fetchall()
+        return [row[0] for row in rows]
@@ -1,30 +1,124 @@
 # -*- coding: utf-8 -*-
 """Dataset class containing all logic for creating, checking, and updating datasets and associated resources.
 """
+import copy
 import logging
-import sys
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 from os.path import join
-from typing import List, Union
+from typing import List, Union, Iterator, Iterable, Tuple, Any, Callable, Optional, Dict
 
+import six
 from dateutil import parser
-from six.moves import range
 
 import hdx.data.organization
 import hdx.data.showcase
-from hdx.data.hdxobject import HDXObject, HDXError
+from hdx.data.hdxobject import HDXObject, HDXError, max_attempts, page_size, max_int
 from hdx.data.resource import Resource
 from hdx.data.user import User
 from hdx.hdx_locations import Locations
 from hdx.utilities import raisefrom
-from hdx.utilities.dictandlist import merge_two_dictionaries
+from hdx.utilities.checkpoint import Checkpoint
+from hdx.utilities.dictandlist import merge_two_dictionaries, merge_changed_keys, copy_branch, intern_values
 from hdx.utilities.location import Location
 
 logger = logging.getLogger(__name__)
 
-max_attempts = 5
-page_size = 1000
-max_int = sys.maxsize
+bulk_workers = 4
+modified_sort = 'metadata_modified asc'
+
+
+class DatasetSummary(object):
+    """Lightweight read-only record of the dataset fields requested in a search (or of all fields in compact mode).
+    Fields are read as with a dictionary eg. summary['name'], but there are no resource objects and no HDX
+    configuration so summaries cannot be updated in HDX. Use to_dataset or Dataset.read_from_hdx to get a full
+    dataset. Field values that are lists or dictionaries are read-only FrozenList and FrozenDict objects since in
+    compact mode repeated strings and flat dictionaries are shared between summaries. Use copy.deepcopy to get values
+    that can be modified.
+
+    Args:
+        data (dict): Dataset fields returned by HDX frozen with intern_values
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data):
+        # type: (dict) -> None
+        self._data = data
+
+    def __getitem__(self, key):
+        # type: (str) -> Any
+        return self._data[key]
+
+    def __contains__(self, key):
+        # type: (str) -> bool
+        return key in self._data
+
+    def __iter__(self):
+        # type: () -> Iterator[str]
+        return iter(self._data)
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._data)
+
+    def __eq__(self, other):
+        # type: (Any) -> bool
+        if isinstance(other, DatasetSummary):
+            return self._data == other._data
+        return self._data == other
+
+    def __ne__(self, other):
+        # type: (Any) -> bool
+        return not self == other
+
+    def __repr__(self):
+        # type: () -> str
+        return 'DatasetSummary(%r)' % self._data
+
+    def get(self, key, default=None):
+        # type: (str, Any) -> Any
+        """Get value of field or default if field is not present
+
+        Args:
+            key (str): Field name
+            default (Any): Value to return if field is not present. Defaults to None.
+
+        Returns:
+            Any: Value of field (read-only if it is a list or dictionary)
+        """
+        return self._data.get(key, default)
+
+    def keys(self):
+        # type: () -> List[str]
+        """Get field names
+
+        Returns:
+            List[str]: Field names
+        """
+        return list(self._data.keys())
+
+    def items(self):
+        # type: () -> List[Tuple[str, Any]]
+        """Get field names and values
+
+        Returns:
+            List[Tuple[str, Any]]: Field names and values (read-only if they are lists or dictionaries)
+        """
+        return list(self._data.items())
+
+    def to_dataset(self, configuration=None):
+        # type: (Optional[Configuration]) -> 'Dataset'
+        """Create a full Dataset object from the summary's fields. This is only useful for summaries containing all
+        fields ie. those returned in compact mode.
+
+        Args:
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+
+        Returns:
+            Dataset: Dataset object
+        """
+        return Dataset._dataset_from_dict(copy.deepcopy(self._data), configuration)
+
 
 class Dataset(HDXObject):
     """Dataset class enabling operations on datasets and associated resources.
@@ -85,6 +179,7 @@ class Dataset(HDXObject):
         return {
             'show': 'package_show',
             'update': 'package_update',
+            'patch': 'package_patch',
             'create': 'package_create',
             'delete': 'package_delete',
             'search': 'package_search',
@@ -127,6 +222,46 @@ class Dataset(HDXObject):
         self.resources = list()
         """:type : List[Resource]"""
 
+    @property
+    def resources(self):
+        # type: () -> List[Resource]
+        """Dataset's list of Resource objects. For datasets created in bulk eg. from search results, the Resource
+        objects are only created from the resource metadata dictionaries the first time this is accessed.
+
+        Returns:
+            List[Resource]: List of Resource objects
+        """
+        if self._resources_data is not None:
+            resources_data = self._resources_data
+            self._resources_data = None
+            self._resources = [Resource(x, configuration=self.configuration) for x in resources_data]
+        return self._resources
+
+    @resources.setter
+    def resources(self, resources):
+        # type: (List[Resource]) -> None
+        """Set dataset's list of Resource objects
+
+        Args:
+            resources (List[Resource]): List of Resource objects
+
+        Returns:
+            None
+        """
+        self._resources_data = None
+        self._resources = resources
+
+    def _get_resources_data(self):
+        # type: () -> List[dict]
+        """Get dataset's resource metadata dictionaries without creating Resource objects if they do not exist yet
+
+        Returns:
+            List[dict]: List of resource metadata dictionaries
+        """
+        if self._resources_data is not None:
+            return self._resources_data
+        return self._convert_hdxobjects(self._resources)
+
     def add_update_resource(self, resource, ignore_datasetid=False):
         # type: (Union[Resource,dict,str], Optional[bool]) -> None
         """Add new or update existing resource in dataset with new metadata
@@ -148,6 +283,7 @@ class Dataset(HDXObject):
                     raise HDXError('Resource %s being added already has a dataset id!' % (resource['name']))
             resource_updated = self._addupdate_hdxobject(self.resources, 'name', resource)
             resource_updated.set_file_to_upload(resource.get_file_to_upload())
+            resource_updated.set_upload_callback(resource.get_upload_callback())
             return
         raise HDXError('Type %s cannot be added as a resource!' % type(resource).__name__)
 
@@ -239,25 +375,116 @@ class Dataset(HDXObject):
         """
 
         if 'resources' in self.data:
-            self.old_data['resources'] = self._copy_hdxobjects(self.resources, Resource, 'file_to_upload')
+            self.old_data['resources'] = self._snapshot_hdxobjects(self.resources, Resource,
+                                                                   ('file_to_upload', 'upload_callback'))
             self.init_resources()
             self.separate_resources()
 
-    def _dataset_load_from_hdx(self, id_or_name):
-        # type: (str) -> bool
+    @staticmethod
+    def _dataset_from_dict(datasetdict, configuration=None):
+        # type: (dict, Optional[Configuration]) -> 'Dataset'
+        """Creates a Dataset object from a dataset metadata dictionary returned by HDX eg. in search results
+
+        Args:
+            datasetdict (dict): Dataset metadata dictionary returned by HDX
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+
+        Returns:
+            Dataset: Dataset object
+        """
+        dataset = Dataset(configuration=configuration)
+        dataset.old_data = dict()
+        dataset.data = datasetdict
+        if 'resources' in datasetdict:  # Resource objects are created when first needed
+            dataset._resources_data = datasetdict.pop('resources')
+        return dataset
+
+    def _dataset_load_from_hdx(self, id_or_name, use_readcache=True):
+        # type: (str, bool) -> bool
         """Loads the dataset given by either id or name from HDX
 
         Args:
             id_or_name (str): Either id or name of dataset
+            use_readcache (bool): Whether to use read cache if one has been set up. Defaults to True.
 
         Returns:
             bool: True if loaded, False if not
         """
 
-        if not self._load_from_hdx('dataset', id_or_name):
-            return False
+        return self._load_from_hdx('dataset', id_or_name, use_readcache=use_readcache)
+
+    def _set_loaded_data(self, result):
+        # type: (dict) -> None
+        """Replace metadata with dataset metadata loaded from HDX, saving current metadata, and create its resources
+
+        Args:
+            result (dict): Dataset metadata loaded from HDX
+
+        Returns:
+            None
+        """
+        super(Dataset, self)._set_loaded_data(result)
         self._dataset_create_resources()
-        return True
+
+    def _apply_journal(self, data):
+        # type: (dict) -> dict
+        """Apply journaled updates and patches of the dataset given by metadata and of its resources to it in one
+        pass if a journal has been set up
+
+        Args:
+            data (dict): Dataset metadata read from HDX
+
+        Returns:
+            dict: Dataset metadata with journaled writes applied
+        """
+        if not self.configuration.has_journal() or not isinstance(data, dict):
+            return data
+        return self.configuration.journal().apply_pending(data, self._get_journal_actions(self.actions()), 'resources',
+                                                          self._get_journal_actions(Resource.actions()))
+
+    def _set_cached_id(self, name, identifier):
+        # type: (str, Optional[str]) -> None
+        """Store the id of dataset with given name in the configuration's id cache if one has been set up
+
+        Args:
+            name (str): Name of dataset
+            identifier (Optional[str]): Id of dataset or None if it does not exist in HDX
+
+        Returns:
+            None
+        """
+        if self.configuration.has_idcache():
+            self.configuration.idcache().set('dataset', name, identifier)
+
+    def _dataset_load_existing(self):
+        # type: () -> Optional[str]
+        """Loads the dataset from HDX by id or if that fails by name. If an id cache has been set up (see
+        Configuration.setup_idcache), a dataset whose name is in the cache is loaded by its cached id and one whose
+        name is known not to exist is not looked up in HDX.
+
+        Returns:
+            Optional[str]: Id or name with which dataset was loaded or None if it was not found
+        """
+        if 'id' in self.data:
+            if self._dataset_load_from_hdx(self.data['id'], use_readcache=False):
+                self._set_cached_id(self.data['name'], self.data['id'])
+                return self.old_data['id']
+            logger.warning('Failed to load dataset with id %s' % self.data['id'])
+        name = self.data.get('name')
+        if not name:
+            return None
+        if self.configuration.has_idcache():
+            known, cached_id = self.configuration.idcache().get('dataset', name)
+            if known:
+                if cached_id is None:
+                    return None
+                if cached_id != self.data.get('id') and self._dataset_load_from_hdx(cached_id, use_readcache=False):
+                    return cached_id
+        if self._dataset_load_from_hdx(name, use_readcache=False):
+            self._set_cached_id(name, self.data['id'])
+            return name
+        self._set_cached_id(name, None)
+        return None
 
     def check_required_fields(self, ignore_fields=list(), allow_no_resources=False):
         # type: (List[str], Optional[bool]) -> None
@@ -281,21 +508,56 @@ class Dataset(HDXObject):
                 ignore_fields = ['package_id']
                 resource.check_required_fields(ignore_fields=ignore_fields)
 
-    def _dataset_merge_hdx_update(self, update_resources):
-        # type: (bool) -> None
-        """Helper method to check if dataset or its resources exist and update them
+    def _dataset_merge_hdx_update(self, update_resources, patch=False):
+        # type: (bool, bool) -> bool
+        """Helper method to check if dataset or its resources exist and update them. If merging the metadata of the
+        dataset and its resources into the metadata just loaded from HDX changes nothing and there are no files to
+        upload, HDX is not updated. In patch mode, only changed dataset fields are sent using package_patch, changed
+        resources using resource_patch and new resources using resource_create.
 
         Args:
             update_resources (bool): Whether to update resources
+            patch (bool): Whether to send only changes using patch actions. Defaults to False.
 
         Returns:
-            None
+            bool: True if dataset was updated in HDX, False if it was unchanged
+        """
+        changes = self._dataset_prepare_hdx_update(update_resources)
+        if changes is None:
+            return False
+        changed_fields, changed_resources, new_resources, filestore_resources = changes
+        if patch:
+            self._dataset_patch_to_hdx(changed_fields, changed_resources, new_resources)
+            return True
+        if self.resources:
+            self.data['resources'] = self._convert_hdxobjects(self.resources)
+        self._save_to_hdx('update', 'id')
+        for resource, created_resource in self._dataset_match_resources(filestore_resources):
+            resource.update_in_hdx()
+            merge_two_dictionaries(created_resource, resource.data)
+        return True
+
+    def _dataset_prepare_hdx_update(self, update_resources):
+        # type: (bool) -> Optional[Tuple[List[str], List[Tuple[Resource, List[str]]], List[Resource], List[Resource]]]
+        """Helper method to merge the metadata of the dataset and its resources into the metadata just loaded from HDX
+        and check the result without writing to HDX
+
+        Args:
+            update_resources (bool): Whether to update resources
+
+        Returns:
+            Optional[Tuple[List[str], List[Tuple[Resource, List[str]]], List[Resource], List[Resource]]]: (Changed dataset fields, changed resources with their changed fields, new resources, resources with files to upload) or None if nothing changed
         """
+        old_datasetdata = dict(self.old_data)
+        old_datasetdata.pop('resources', None)
+        changed_fields = merge_changed_keys(self.data, old_datasetdata)
         merge_two_dictionaries(self.data, self.old_data)
         if 'resources' in self.data:
             del self.data['resources']
         old_resources = self.old_data.get('resources', None)
         filestore_resources = list()
+        changed_resources = list()
+        new_resources = list()
         if update_resources and old_resources:
             ignore_fields = ['package_id']
             resource_names = set()
@@ -305,78 +567,132 @@ class Dataset(HDXObject):
                 for old_resource in old_resources:
                     if resource_name == old_resource['name']:
                         logger.warning('Resource exists. Updating %s' % resource_name)
-                        merge_two_dictionaries(resource, old_resource)
-                        if old_resource.get_file_to_upload():
-                            resource.set_file_to_upload(old_resource.get_file_to_upload())
+                        file_to_upload = old_resource.get_file_to_upload()
+                        if old_resource.is_file_unchanged(resource.data):
+                            logger.info('File %s is unchanged in HDX. Not uploading.' % file_to_upload)
+                            old_resource.data.pop('url', None)  # keep url of file in HDX
+                            file_to_upload = None
+                        changed_resource_fields = merge_changed_keys(resource.data, old_resource.data)
+                        merge_two_dictionaries(resource, old_resource, copy_branches=True)
+                        if file_to_upload:
+                            resource.set_file_to_upload(file_to_upload)
+                            resource.set_upload_callback(old_resource.get_upload_callback())
                             filestore_resources.append(resource)
+                        if changed_resource_fields or file_to_upload:
+                            changed_resources.append((resource, changed_resource_fields))
                         resource.check_required_fields(ignore_fields=ignore_fields)
                         break
             for old_resource in old_resources:
                 if not old_resource['name'] in resource_names:
+                    old_resource.data = copy_branch(old_resource.data)
                     old_resource.check_required_fields(ignore_fields=ignore_fields)
                     self.resources.append(old_resource)
+                    new_resources.append(old_resource)
                     if old_resource.get_file_to_upload():
                         filestore_resources.append(old_resource)
-        if self.resources:
-            self.data['resources'] = self._convert_hdxobjects(self.resources)
-        self._save_to_hdx('update', 'id')
+        if not changed_fields and not changed_resources and not new_resources:
+            logger.info('Dataset %s is unchanged. Not updating.' % self.data['id'])
+            return None
+        return changed_fields, changed_resources, new_resources, filestore_resources
+
+    def _dataset_match_resources(self, resources):
+        # type: (List[Resource]) -> Iterator[Tuple[Resource, dict]]
+        """Helper method to match resources to the resource metadata returned by HDX after the dataset was written
+        by name, merging the metadata from HDX into each resource so that its file can then be uploaded
+
+        Args:
+            resources (List[Resource]): Resources with files to upload
 
-        for resource in filestore_resources:
+        Returns:
+            Iterator[Tuple[Resource, dict]]: Iterator over (resource, resource metadata returned by HDX)
+        """
+        for resource in resources:
             for created_resource in self.data['resources']:
                 if resource['name'] == created_resource['name']:
                     merge_two_dictionaries(resource.data, created_resource)
-                    resource.update_in_hdx()
-                    merge_two_dictionaries(created_resource, resource.data)
+                    yield resource, created_resource
                     break
 
-    def update_in_hdx(self, update_resources=True):
-        # type: (Optional[bool]) -> None
+    def _dataset_patch_to_hdx(self, changed_fields, changed_resources, new_resources):
+        # type: (List[str], List[Tuple[Resource, List[str]]], List[Resource]) -> None
+        """Helper method to send only the changes to a dataset and its resources to HDX. Resources are sent first so
+        that the dataset metadata returned by package_patch includes them.
+
+        Args:
+            changed_fields (List[str]): Changed dataset fields
+            changed_resources (List[Tuple[Resource, List[str]]]): Changed resources with their changed fields
+            new_resources (List[Resource]): Resources to create
+
+        Returns:
+            None
+        """
+        for resource, fields in changed_resources:
+            if resource.get_file_to_upload():
+                resource._add_file_hash()
+                fields = set(fields) | {'hash'}
+            resource._patch_to_hdx('id', fields, resource.get_file_to_upload())
+        for resource in new_resources:
+            resource['package_id'] = self.data['id']
+            resource._add_file_hash()
+            resource._save_to_hdx('create', 'name', resource.get_file_to_upload())
+        if changed_fields:
+            self._patch_to_hdx('id', changed_fields)
+            self.init_resources()
+            self.separate_resources()
+
+    def update_in_hdx(self, update_resources=True, patch=False):
+        # type: (Optional[bool], Optional[bool]) -> bool
         """Check if dataset exists in HDX and if so, update it
 
         Args:
             update_resources (Optional[bool]): Whether to update resources. Defaults to True.
+            patch (Optional[bool]): Whether to send only changes using patch actions. Defaults to False.
 
         Returns:
-            None
+            bool: True if dataset was updated in HDX, False if it was unchanged
         """
-        loaded = False
-        if 'id' in self.data:
-            self._check_existing_object('dataset', 'id')
-            if self._dataset_load_from_hdx(self.data['id']):
-                loaded = True
-            else:
-                logger.warning('Failed to load dataset with id %s' % self.data['id'])
-        if not loaded:
+        if 'id' not in self.data:
             self._check_existing_object('dataset', 'name')
-            if not self._dataset_load_from_hdx(self.data['name']):
-                raise HDXError('No existing dataset to update!')
-        self._dataset_merge_hdx_update(update_resources)
+        if not self._dataset_load_existing():
+            raise HDXError('No existing dataset to update!')
+        return self._dataset_merge_hdx_update(update_resources, patch)
 
-    def create_in_hdx(self, allow_no_resources=False):
-        # type: (Optional[bool]) -> None
-        """Check if dataset exists in HDX and if so, update it, otherwise create it
+    def _dataset_create_in_hdx(self, allow_no_resources):
+        # type: (bool) -> str
+        """Helper method to check if dataset exists in HDX and if so, update it, otherwise create it
 
         Args:
-            allow_no_resources (Optional[bool]): Whether to allow no resources. Defaults to False.
+            allow_no_resources (bool): Whether to allow no resources
 
         Returns:
-            None
+            str: Outcome - one of created, updated or unchanged
         """
         self.check_required_fields(allow_no_resources=allow_no_resources)
-        loadedid = None
-        if 'id' in self.data:
-            if self._dataset_load_from_hdx(self.data['id']):
-                loadedid = self.data['id']
-            else:
-                logger.warning('Failed to load dataset with id %s' % self.data['id'])
-        if not loadedid:
-            if self._dataset_load_from_hdx(self.data['name']):
-                loadedid = self.data['name']
+        loadedid = self._dataset_load_existing()
         if loadedid:
             logger.warning('Dataset exists. Updating %s' % loadedid)
-            self._dataset_merge_hdx_update(True)
-            return
+            if self._dataset_merge_hdx_update(True):
+                return 'updated'
+            return 'unchanged'
+        filestore_resources = self._dataset_prepare_create()
+        self._save_to_hdx('create', 'name')
+        if 'id' in self.data:
+            self._set_cached_id(self.data['name'], self.data['id'])
+        for resource, created_resource in self._dataset_match_resources(filestore_resources):
+            resource.update_in_hdx()
+            merge_two_dictionaries(created_resource, resource.data)
+        self.init_resources()
+        self.separate_resources()
+        return 'created'
 
+    def _dataset_prepare_create(self):
+        # type: () -> List[Resource]
+        """Helper method to check the resources of a dataset to be created and add them to its metadata without
+        writing to HDX
+
+        Returns:
+            List[Resource]: Resources with files to upload once the dataset has been created
+        """
         filestore_resources = list()
         if self.resources:
             ignore_fields = ['package_id']
@@ -385,16 +701,55 @@ class Dataset(HDXObject):
                 if resource.get_file_to_upload():
                     filestore_resources.append(resource)
             self.data['resources'] = self._convert_hdxobjects(self.resources)
-        self._save_to_hdx('create', 'name')
-        for resource in filestore_resources:
-            for created_resource in self.data['resources']:
-                if resource['name'] == created_resource['name']:
-                    merge_two_dictionaries(resource.data, created_resource)
-                    resource.update_in_hdx()
-                    merge_two_dictionaries(created_resource, resource.data)
-                    break
-        self.init_resources()
-        self.separate_resources()
+        if filestore_resources and self.configuration.has_journal():
+            raise HDXError('Cannot upload files for new dataset %s to journal!' % self.data['name'])
+        return filestore_resources
+
+    def create_in_hdx(self, allow_no_resources=False):
+        # type: (Optional[bool]) -> str
+        """Check if dataset exists in HDX and if so, update it, otherwise create it. An existing dataset whose
+        metadata is unchanged is not written to HDX.
+
+        Args:
+            allow_no_resources (Optional[bool]): Whether to allow no resources. Defaults to False.
+
+        Returns:
+            str: Outcome - one of created, updated or unchanged
+        """
+        return self._dataset_create_in_hdx(allow_no_resources)
+
+    @staticmethod
+    def bulk_create_in_hdx(datasets, workers=bulk_workers, allow_no_resources=False):
+        # type: (Iterable[Dataset], int, Optional[bool]) -> List[Tuple[Dataset, str, Optional[Exception]]]
+        """Create or update many datasets in HDX (see create_in_hdx) using a pool of worker threads. A failure of
+        one dataset does not stop the others. Calls to HDX are subject to the configuration's rate limiter if one
+        has been set up (see Configuration.setup_ratelimiter).
+
+        Args:
+            datasets (Iterable[Dataset]): Datasets to create or update
+            workers (int): Number of worker threads. Defaults to 4.
+            allow_no_resources (Optional[bool]): Whether to allow no resources. Defaults to False.
+
+        Returns:
+            List[Tuple[Dataset, str, Optional[Exception]]]: Dataset, outcome (created, updated, unchanged or failed) and exception if failed in the order given
+        """
+
+        def create_dataset(dataset):
+            try:
+                return dataset, dataset._dataset_create_in_hdx(allow_no_resources), None
+            except Exception as e:
+                logger.error('Failed to create or update dataset %s: %s' % (dataset.data.get('name'), e))
+                return dataset, 'failed', e
+
+        datasets = list(datasets)
+        if not datasets:
+            return list()
+        pool = ThreadPool(min(workers, len(datasets)))
+        try:
+            return pool.map(create_dataset, datasets)
+        finally:
+            pool.close()
+            pool.join()
 
     def delete_from_hdx(self):
         # type: () -> None
@@ -404,11 +759,14 @@ class Dataset(HDXObject):
             None
         """
         self._delete_from_hdx('dataset', 'id')
+        if 'name' in self.old_data:
+            self._set_cached_id(self.old_data['name'], None)
 
     @staticmethod
     def search_in_hdx(query='*:*', configuration=None, **kwargs):
-        # type: (Optional[str], Optional[Configuration], ...) -> List['Dataset']
-        """Searches for datasets in HDX
+        # type: (Optional[str], Optional[Configuration], ...) -> List[Union['Dataset', DatasetSummary]]
+        """Searches for datasets in HDX. If paging workers in the configuration is more than 1, pages of results are
+        read from HDX concurrently.
 
         Args:
             query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
@@ -423,56 +781,230 @@ class Dataset(HDXObject):
             facet.limit (int): Maximum number of values the facet fields return (- = unlimited). Defaults to 50.
             facet.field (List[str]): Fields to facet upon. Default is empty.
             use_default_schema (bool): Use default package schema instead of custom schema. Defaults to False.
+            keyset (bool): Page by dataset id (see iter_search_in_hdx) rather than by offset. Defaults to False.
+            fields (List[str]): Only return these fields (plus id) as DatasetSummary objects. Defaults to all fields.
+            compact (bool): Return compact DatasetSummary objects (see iter_search_in_hdx). Defaults to False.
 
         Returns:
-            List[Dataset]: List of datasets resulting from query
+            List[Union[Dataset, DatasetSummary]]: List of datasets resulting from query
         """
 
+        return Dataset._search_consistently('dataset', lambda: Dataset.iter_search_in_hdx(
+            query, configuration=configuration, **kwargs))
+
+    @staticmethod
+    def _search_summary_in_hdx(query, configuration, **kwargs):
+        # type: (str, Optional[Configuration], ...) -> dict
+        """Searches for datasets in HDX returning no datasets, only the count and facets of the search result
+
+        Args:
+            query (str): Query (in Solr format)
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See search_in_hdx
+
+        Returns:
+            dict: Search result without datasets
+        """
+        dataset = Dataset(configuration=configuration)
+        kwargs['rows'] = 0
+        success, result = dataset._read_from_hdx('dataset', query, 'q', Dataset.actions()['search'], **kwargs)
+        if not success:
+            raise HDXError('Failed when searching for datasets: %s' % result)
+        return result
+
+    @staticmethod
+    def count_in_hdx(query='*:*', fq=None, configuration=None):
+        # type: (Optional[str], Optional[str], Optional[Configuration]) -> int
+        """Count datasets in HDX matching query and filter query without reading the datasets
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            fq (Optional[str]): Filter query to apply eg. organization:acled. Defaults to None.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+
+        Returns:
+            int: Number of datasets matching query
+        """
+        kwargs = dict()
+        if fq:
+            kwargs['fq'] = fq
+        return Dataset._search_summary_in_hdx(query, configuration, **kwargs)['count']
+
+    @staticmethod
+    def facets_in_hdx(query='*:*', facet_fields=('organization', 'groups', 'tags'), fq=None, configuration=None,
+                      **kwargs):
+        # type: (Optional[str], Iterable[str], Optional[str], Optional[Configuration], ...) -> Dict[str, Dict[str, int]]
+        """Get counts of datasets in HDX matching query and filter query for each value of the facet fields without
+        reading the datasets eg. {'organization': {'acled': 10, ...}, ...}
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            facet_fields (Iterable[str]): Fields to facet upon. Defaults to organization, groups (locations) and tags.
+            fq (Optional[str]): Filter query to apply. Defaults to None.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See below
+            facet.mincount (int): Minimum counts for facet fields should be included in the results
+            facet.limit (int): Maximum number of values the facet fields return (- = unlimited). Defaults to 50.
+
+        Returns:
+            Dict[str, Dict[str, int]]: Dictionary of facet field to dictionary of value to count
+        """
+        kwargs['facet'] = 'true'
+        kwargs['facet.field'] = list(facet_fields)
+        if fq:
+            kwargs['fq'] = fq
+        return Dataset._search_summary_in_hdx(query, configuration, **kwargs).get('facets', dict())
+
+    @staticmethod
+    def iter_search_in_hdx(query='*:*', configuration=None, **kwargs):
+        # type: (Optional[str], Optional[Configuration], ...) -> Iterator[Union['Dataset', DatasetSummary]]
+        """Searches for datasets in HDX yielding them page by page so that the whole result set is never held in
+        memory. If the count changes between pages or a dataset is returned more than once, the query is not redone
+        (unlike search_in_hdx). Instead HDXInconsistentResultsError is raised and it is left to the caller to decide
+        what to do with the datasets already received. If paging workers in the configuration is more than 1, the
+        count is first obtained from HDX and then that many pages at a time are read concurrently.
+
+        If keyset is True, results are sorted by id and each page is requested with a filter query on ids greater
+        than the last one seen instead of an offset. This avoids deep paging in Solr and gives consistent results even
+        when datasets are being added or removed during the search, so HDXInconsistentResultsError is never raised
+        (but sort cannot be supplied and pages are always read one after another).
+
+        If fields is supplied, only those fields are requested from HDX (using the fl parameter) and lightweight
+        read-only DatasetSummary objects are returned instead of Dataset objects. This greatly reduces the amount of
+        data transferred and the memory used when only a few fields of each dataset are needed.
+
+        If compact is True, DatasetSummary objects are returned (with all fields unless fields is supplied) in which
+        repeated strings and flat dictionaries (eg. organization) are shared between all the datasets returned. This
+        uses much less memory than Dataset objects when holding many datasets that are only to be read.
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See below
+            fq (string): Any filter queries to apply
+            sort (string): Sorting of the search results. Defaults to 'relevance asc, metadata_modified desc'.
+            rows (int): Number of matching rows to return. Defaults to all datasets (sys.maxsize).
+            start (int): Offset in the complete result for where the set of returned datasets should begin
+            facet (string): Whether to enable faceted results. Default to True.
+            facet.mincount (int): Minimum counts for facet fields should be included in the results
+            facet.limit (int): Maximum number of values the facet fields return (- = unlimited). Defaults to 50.
+            facet.field (List[str]): Fields to facet upon. Default is empty.
+            use_default_schema (bool): Use default package schema instead of custom schema. Defaults to False.
+            keyset (bool): Page by dataset id rather than by offset. Defaults to False.
+            fields (List[str]): Only return these fields (plus id) as DatasetSummary objects. Defaults to all fields.
+            compact (bool): Return compact DatasetSummary objects with shared strings. Defaults to False.
+
+        Returns:
+            Iterator[Union[Dataset, DatasetSummary]]: Iterator over datasets resulting from query
+        """
+
+        create = Dataset._get_search_result_creator(configuration, kwargs)
+        if kwargs.pop('keyset', False):
+            for dataset in Dataset._keyset_search_in_hdx(query, configuration, create, **kwargs):
+                yield dataset
+            return
         dataset = Dataset(configuration=configuration)
         total_rows = kwargs.get('rows', max_int)
         start = kwargs.get('start', 0)
-        all_datasets = None
-        attempts = 0
-        while attempts < max_attempts and all_datasets is None:  # if the count values vary for multiple calls, then must redo query
-            all_datasets = list()
-            counts = set()
-            for page in range(total_rows // page_size + 1):
-                pagetimespagesize = page * page_size
-                kwargs['start'] = start + pagetimespagesize
-                rows_left = total_rows - pagetimespagesize
-                rows = min(rows_left, page_size)
-                kwargs['rows'] = rows
-                _, result = dataset._read_from_hdx('dataset', query, 'q', Dataset.actions()['search'], **kwargs)
-                datasets = list()
-                if result:
-                    count = result.get('count', None)
-                    if count:
-                        counts.add(count)
-                        no_results = len(result['results'])
-                        for datasetdict in result['results']:
-                            dataset = Dataset(configuration=configuration)
-                            dataset.old_data = dict()
-                            dataset.data = datasetdict
-                            dataset._dataset_create_resources()
-                            datasets.append(dataset)
-                        all_datasets += datasets
-                        if no_results < rows:
-                            break
-                    else:
-                        break
-                else:
-                    logger.debug(result)
-            if all_datasets and len(counts) != 1:  # Make sure counts are all same for multiple calls to HDX
-                all_datasets = None
-                attempts += 1
+
+        def read_page(page):
+            page_start, rows = page
+            pagekwargs = dict(kwargs)
+            pagekwargs['start'] = page_start
+            pagekwargs['rows'] = rows
+            _, result = dataset._read_from_hdx('dataset', query, 'q', Dataset.actions()['search'], **pagekwargs)
+            return result
+
+        for datasetdict in dataset._iter_search_pages('dataset', read_page, start, total_rows, page_size):
+            yield create(datasetdict)
+
+    @staticmethod
+    def _get_search_result_creator(configuration, kwargs):
+        # type: (Optional[Configuration], dict) -> Callable[[dict], Union['Dataset', DatasetSummary]]
+        """Get function that creates the objects returned by a dataset search. If fields is in kwargs, it is replaced
+        by the fl parameter to pass to HDX. If compact is in kwargs, it is removed.
+
+        Args:
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            kwargs (dict): Dataset search arguments
+
+        Returns:
+            Callable[[dict], Union[Dataset, DatasetSummary]]: Function that creates object from search result dict
+        """
+        fields = kwargs.pop('fields', None)
+        compact = kwargs.pop('compact', False)
+        if fields:
+            fields = list(fields)
+            if 'id' not in fields:  # needed to check for duplicates and for keyset paging
+                fields.insert(0, 'id')
+            kwargs['fl'] = fields
+        if compact:
+            return Dataset._get_compact_creator()
+        if fields:
+            return lambda datasetdict: DatasetSummary(intern_values(datasetdict, frozen=True))
+        return lambda datasetdict: Dataset._dataset_from_dict(datasetdict, configuration)
+
+    @staticmethod
+    def _get_compact_creator():
+        # type: () -> Callable[[dict], DatasetSummary]
+        """Get function that creates compact DatasetSummary objects sharing repeated strings and flat dictionaries
+        with all other objects created by the same function
+
+        Returns:
+            Callable[[dict], DatasetSummary]: Function that creates object from search result dict
+        """
+        table = dict()
+        return lambda datasetdict: DatasetSummary(intern_values(datasetdict, table, frozen=True))
+
+    @staticmethod
+    def _keyset_search_in_hdx(query, configuration, create, **kwargs):
+        # type: (str, Optional[Configuration], Callable[[dict], Union['Dataset', DatasetSummary]], ...) -> Iterator[Union['Dataset', DatasetSummary]]
+        """Searches for datasets in HDX paging by dataset id: results are sorted by id and each page after the first
+        is filtered to ids greater than the last id of the previous page.
+
+        Args:
+            query (str): Query (in Solr format)
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            create (Callable[[dict], Union[Dataset, DatasetSummary]]): Function that creates object from search result dict
+            **kwargs: See iter_search_in_hdx
+
+        Returns:
+            Iterator[Union[Dataset, DatasetSummary]]: Iterator over datasets resulting from query
+        """
+        if 'sort' in kwargs:
+            raise HDXError('Cannot sort when paging by dataset id!')
+        dataset = Dataset(configuration=configuration)
+        total_rows = kwargs.get('rows', max_int)
+        fq = kwargs.get('fq', None)
+        kwargs['sort'] = 'id asc'
+        kwargs['start'] = kwargs.get('start', 0)  # only applies to the first page
+        sizer = dataset._get_page_sizer(page_size)
+
+        def read_page(rows):
+            kwargs['rows'] = rows
+            _, result = dataset._read_from_hdx('dataset', query, 'q', Dataset.actions()['search'], **kwargs)
+            return result
+
+        read_page = sizer.timed(read_page, lambda result: len(result.get('results', list())))
+        rows_read = 0
+        while rows_read < total_rows:
+            rows = min(total_rows - rows_read, sizer.size)
+            result = read_page(rows)
+            if not result:
+                logger.debug(result)
+                break
+            results = result.get('results', list())
+            for datasetdict in results:
+                yield create(datasetdict)
+            rows_read += len(results)
+            if len(results) < rows:
+                break
+            idfilter = 'id:{"%s" TO *]' % results[-1]['id']
+            if fq:
+                kwargs['fq'] = '%s AND (%s)' % (idfilter, fq)
             else:
-                ids = [dataset['id'] for dataset in all_datasets]  # check for duplicates (shouldn't happen)
-                if len(ids) != len(set(ids)):
-                    all_datasets = None
-                    attempts += 1
-        if attempts == max_attempts and all_datasets is None:
-            raise HDXError('Maximum attempts reached for searching for datasets!')
-        return all_datasets
+                kwargs['fq'] = idfilter
+            kwargs['start'] = 0
 
     @staticmethod
     def get_all_dataset_names(configuration=None, **kwargs):
@@ -494,61 +1026,200 @@ class Dataset(HDXObject):
 
     @staticmethod
     def get_all_datasets(configuration=None, **kwargs):
-        # type: (Optional[Configuration], ...) -> List['Dataset']
-        """Get all datasets in HDX
+        # type: (Optional[Configuration], ...) -> List[Union['Dataset', DatasetSummary]]
+        """Get all datasets in HDX. If paging workers in the configuration is more than 1, that many pages at a time
+        are read from HDX concurrently. If datasets are returned more than once because datasets changed in HDX while
+        pages were being read, only the pages containing them (and any neighbouring pages that have also moved) are
+        read again.
 
         Args:
             configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
             **kwargs: See below
             limit (int): Number of rows to return. Defaults to all datasets (sys.maxsize).
             offset (int): Offset in the complete result for where the set of returned datasets should begin
+            keyset (bool): Use a dataset search paging by dataset id (see iter_search_in_hdx). Defaults to False.
+            fields (List[str]): Use a dataset search returning only these fields (plus id) as DatasetSummary objects
+            (see iter_search_in_hdx). Defaults to all fields.
+            compact (bool): Return compact DatasetSummary objects (see iter_search_in_hdx). Defaults to False.
 
         Returns:
-            List[Dataset]: List of all datasets in HDX
+            List[Union[Dataset, DatasetSummary]]: List of all datasets in HDX
         """
 
+        keyset = kwargs.pop('keyset', False)
+        fields = kwargs.pop('fields', None)
+        compact = kwargs.pop('compact', False)
+        if keyset or fields:
+            return Dataset.search_in_hdx(configuration=configuration, rows=kwargs.get('limit', max_int),
+                                         start=kwargs.get('offset', 0), keyset=keyset, fields=fields,
+                                         compact=compact)
+
         dataset = Dataset(configuration=configuration)
         dataset['id'] = 'all datasets'  # only for error message if produced
         total_rows = kwargs.get('limit', max_int)
         start = kwargs.get('offset', 0)
-        all_datasets = None
+
+        def read_page(page):
+            offset, rows = page
+            pagekwargs = dict(kwargs)
+            pagekwargs['offset'] = offset
+            pagekwargs['limit'] = rows
+            return dataset._write_to_hdx('all', pagekwargs, 'id')
+
+        if compact:
+            create = Dataset._get_compact_creator()
+        else:
+            create = lambda datasetdict: Dataset._dataset_from_dict(datasetdict, configuration)
+
+        def create_datasets(result):
+            return [create(datasetdict) for datasetdict in result or list()]
+
+        sizer = dataset._get_page_sizer(page_size)
+        read_page = sizer.timed(read_page)
+        pages = list()
+        for page, result in dataset._read_pages(read_page, sizer.pages(start, total_rows)):
+            if not result:
+                logger.debug(result)
+                break
+            pages.append((page, create_datasets(result)))
+            if len(result) < page[1]:
+                break
+        # if datasets change during the crawl, pages shift so that datasets are duplicated (or missed) at page
+        # boundaries. Only the pages involved are read again rather than the whole crawl.
+        reread = Dataset._get_pages_with_duplicates(pages)
         attempts = 0
-        while attempts < max_attempts and all_datasets is None:  # if the dataset names vary for multiple calls, then must redo query
-            all_datasets = list()
-            for page in range(total_rows // page_size + 1):
-                pagetimespagesize = page * page_size
-                kwargs['offset'] = start + pagetimespagesize
-                rows_left = total_rows - pagetimespagesize
-                rows = min(rows_left, page_size)
-                kwargs['limit'] = rows
-                result = dataset._write_to_hdx('all', kwargs, 'id')
-                datasets = list()
-                if result:
-                    no_results = len(result)
-                    for datasetdict in result:
-                        dataset = Dataset(configuration=configuration)
-                        dataset.old_data = dict()
-                        dataset.data = datasetdict
-                        dataset._dataset_create_resources()
-                        datasets.append(dataset)
-                    all_datasets += datasets
-                    if no_results < rows:
-                        break
-                else:
-                    logger.debug(result)
-            names_list = [dataset['name'] for dataset in all_datasets]
-            names = set(names_list)
-            if len(names_list) != len(names):  # check for duplicates (shouldn't happen)
-                all_datasets = None
-                attempts += 1
-            # elif total_rows == max_int:
-            #     all_names = set(Dataset.get_all_dataset_names())  # check dataset names match package_list
-            #     if names != all_names:
-            #         all_datasets = None
-            #         attempts += 1
-        if attempts == max_attempts and all_datasets is None:
-            raise HDXError('Maximum attempts reached for getting all datasets!')
-        return all_datasets
+        while reread:
+            if attempts == max_attempts:
+                raise HDXError('Maximum attempts reached for getting all datasets!')
+            attempts += 1
+            logger.info('Rereading pages of all datasets at offsets: %s' %
+                        ', '.join([str(pages[index][0][0]) for index in reread]))
+            shifted = set()
+            results = dataset._read_pages(read_page, [pages[index][0] for index in reread])
+            for index, (page, result) in zip(reread, results):
+                datasets = create_datasets(result)
+                if Dataset._get_page_boundary(datasets) != Dataset._get_page_boundary(pages[index][1]):
+                    # page has moved so neighbouring pages may have too
+                    shifted.update([x for x in (index - 1, index + 1) if 0 <= x < len(pages)])
+                pages[index] = (page, datasets)
+            shifted -= set(reread)
+            reread = sorted(set(Dataset._get_pages_with_duplicates(pages)) | shifted)
+        return [x for _, datasets in pages for x in datasets]
+
+    @staticmethod
+    def _get_page_boundary(datasets):
+        # type: (List['Dataset']) -> Tuple[Optional[str], Optional[str]]
+        """Get names of first and last datasets in page
+
+        Args:
+            datasets (List[Dataset]): Datasets in page
+
+        Returns:
+            Tuple[Optional[str], Optional[str]]: Names of first and last datasets in page (None if page is empty)
+        """
+        if not datasets:
+            return None, None
+        return datasets[0]['name'], datasets[-1]['name']
+
+    @staticmethod
+    def _get_pages_with_duplicates(pages):
+        # type: (List[Tuple[Any, List['Dataset']]]) -> List[int]
+        """Get indices of pages containing datasets that appear more than once
+
+        Args:
+            pages (List[Tuple[Any, List[Dataset]]]): List of (page, datasets in page)
+
+        Returns:
+            List[int]: Sorted indices of pages containing duplicated datasets
+        """
+        name_pages = dict()
+        for index, (_, datasets) in enumerate(pages):
+            for x in datasets:
+                name_pages.setdefault(x['name'], list()).append(index)
+        indices = set()
+        for page_indices in name_pages.values():
+            if len(page_indices) > 1:
+                indices.update(page_indices)
+        return sorted(indices)
+
+    @staticmethod
+    def _get_utc_timestamp(timestamp):
+        # type: (Union[datetime, str]) -> datetime
+        """Get timestamp as datetime without timezone in UTC. Timestamps with a timezone are converted to UTC. Those
+        without are assumed to be UTC like metadata_modified in HDX.
+
+        Args:
+            timestamp (Union[datetime.datetime, str]): Timestamp as datetime.datetime object or string
+
+        Returns:
+            datetime.datetime: Timestamp in UTC without timezone
+        """
+        if not isinstance(timestamp, datetime):
+            timestamp = Dataset._parse_date(timestamp, None)
+        utcoffset = timestamp.utcoffset()
+        if utcoffset is not None:
+            timestamp = timestamp - utcoffset
+        return timestamp.replace(tzinfo=None)
+
+    @staticmethod
+    def _get_solr_timestamp(timestamp):
+        # type: (Union[datetime, str]) -> str
+        """Get timestamp in UTC in the format used in Solr queries (see _get_utc_timestamp)
+
+        Args:
+            timestamp (Union[datetime.datetime, str]): Timestamp as datetime.datetime object or string
+
+        Returns:
+            str: Timestamp in Solr format eg. 2016-03-29T17:33:22.912Z
+        """
+        timestamp = Dataset._get_utc_timestamp(timestamp)
+        return '%s.%03dZ' % (timestamp.strftime('%Y-%m-%dT%H:%M:%S'), timestamp.microsecond // 1000)
+
+    @staticmethod
+    def get_modified_since(timestamp=None, checkpoint=None, configuration=None, **kwargs):
+        # type: (Optional[Union[datetime, str]], Optional[Union[Checkpoint, str]], Optional[Configuration], ...) -> List[Union['Dataset', DatasetSummary]]
+        """Get datasets in HDX modified on or after timestamp (ie. with metadata_modified in [timestamp TO *]). If a
+        checkpoint is supplied, the timestamp defaults to the latest metadata_modified of the datasets returned by
+        the previous call and once all datasets have been read, the checkpoint is moved on to the latest
+        metadata_modified of the datasets returned. Since the timestamp is inclusive, the latest dataset(s) from the
+        previous call will be returned again. If rows is given with a checkpoint, datasets are sorted by
+        metadata_modified ascending so that the checkpoint does not move past datasets that were not returned. start
+        cannot be given with a checkpoint.
+
+        Args:
+            timestamp (Optional[Union[datetime.datetime, str]]): UTC timestamp. Defaults to checkpoint value or all datasets.
+            checkpoint (Optional[Union[Checkpoint, str]]): Checkpoint or path to checkpoint file. Defaults to None.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See search_in_hdx
+
+        Returns:
+            List[Union[Dataset, DatasetSummary]]: List of datasets modified on or after timestamp
+        """
+        if isinstance(checkpoint, six.string_types):
+            checkpoint = Checkpoint(checkpoint)
+        if checkpoint is not None:
+            if kwargs.get('start'):
+                raise HDXError('Cannot use start with a checkpoint!')
+            if 'rows' in kwargs:
+                if kwargs.get('keyset') or kwargs.get('sort', modified_sort) != modified_sort:
+                    raise HDXError('Datasets must be sorted by %s to use rows with a checkpoint!' % modified_sort)
+                kwargs['sort'] = modified_sort
+            if timestamp is None:
+                timestamp = checkpoint.get('metadata_modified')
+        if timestamp is not None:
+            modifiedfilter = 'metadata_modified:[%s TO *]' % Dataset._get_solr_timestamp(timestamp)
+            fq = kwargs.get('fq')
+            if fq:
+                kwargs['fq'] = '%s AND (%s)' % (modifiedfilter, fq)
+            else:
+                kwargs['fq'] = modifiedfilter
+        fields = kwargs.get('fields')
+        if fields and 'metadata_modified' not in fields:
+            kwargs['fields'] = list(fields) + ['metadata_modified']
+        datasets = Dataset.search_in_hdx(configuration=configuration, **kwargs)
+        if checkpoint is not None and datasets:
+            checkpoint.set('metadata_modified', max([x['metadata_modified'] for x in datasets]))
+        return datasets
 
     @staticmethod
     def get_all_resources(datasets):
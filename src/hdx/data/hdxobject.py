@@ -10,14 +10,20 @@ else:
 
 import abc
 import copy
+import json
 import logging
+import sys
+import time
+from itertools import islice
+from multiprocessing.pool import ThreadPool
 
 from ckanapi.errors import NotFound
-from typing import Optional, List, Tuple, TypeVar, Union
+from six.moves import range
+from typing import Optional, List, Tuple, TypeVar, Union, Callable, Iterable, Iterator, Any, Dict, Set
 
 from hdx.utilities import raisefrom
 from hdx.hdx_configuration import Configuration
-from hdx.utilities.dictandlist import merge_two_dictionaries
+from hdx.utilities.dictandlist import merge_two_dictionaries, merge_changed_keys
 from hdx.utilities.loader import load_yaml_into_existing_dict, load_json_into_existing_dict
 
 logger = logging.getLogger(__name__)
@@ -25,10 +31,117 @@ logger = logging.getLogger(__name__)
 HDXObjectUpperBound = TypeVar('T', bound='HDXObject')
 
 
+read_only_actions = ('list', 'all')  # actions that go through _write_to_hdx but do not write
+max_attempts = 5
+page_size = 1000
+max_int = sys.maxsize
+
+
 class HDXError(Exception):
     pass
 
 
+class HDXInconsistentResultsError(HDXError):
+    pass
+
+
+class PageSizer(object):
+    """Chooses the number of rows to request in each page of a paginated read from HDX. Unless adaptive paging is
+    turned on in the configuration (paging: adaptive), every page has the default page size. Otherwise, after each
+    page the time taken and the estimated size of the response are used to choose the next page size so that a page
+    takes about paging: target_seconds and is no bigger than paging: max_page_bytes, within paging: min_page_size
+    and paging: max_page_size. Page sizes are only adapted when pages are read one at a time.
+
+    Args:
+        page_size (int): Default page size
+        configuration (Configuration): HDX configuration
+        workers (int): Number of pages read concurrently. Defaults to 1.
+    """
+
+    def __init__(self, page_size, configuration, workers=1):
+        # type: (int, Configuration, int) -> None
+        paging = configuration.get('paging', dict())
+        self.adaptive = paging.get('adaptive', False) and workers <= 1
+        self.min_size = paging.get('min_page_size', 100)
+        self.max_size = paging.get('max_page_size', 5000)
+        self.target_seconds = paging.get('target_seconds', 5)
+        self.max_bytes = paging.get('max_page_bytes', 10000000)
+        if self.adaptive:
+            self.size = max(min(page_size, self.max_size), self.min_size)
+        else:
+            self.size = page_size
+        self.row_bytes = None  # type: Optional[float]
+
+    def pages(self, start, total_rows):
+        # type: (int, int) -> Iterator[Tuple[int, int]]
+        """Generate (offset, rows) pages to read. The size of each page is only decided when it is requested so that
+        it can take into account the pages already read.
+
+        Args:
+            start (int): Offset of first page
+            total_rows (int): Total number of rows to read
+
+        Returns:
+            Iterator[Tuple[int, int]]: Iterator over (offset, rows)
+        """
+        rows_read = 0
+        while rows_read < total_rows:
+            rows = min(total_rows - rows_read, self.size)
+            yield start + rows_read, rows
+            rows_read += rows
+
+    def update(self, no_results, seconds, result):
+        # type: (int, float, Any) -> None
+        """Choose the next page size given the number of results, time taken and result of the last page read. The
+        size of a page is estimated from its number of results and the average size of a result, which is measured
+        only on the first page read so that later pages are not serialised again.
+
+        Args:
+            no_results (int): Number of results in page
+            seconds (float): Time taken to read page
+            result (Any): Result of page (used to measure average result size on first page)
+
+        Returns:
+            None
+        """
+        if not self.adaptive or not no_results:
+            return
+        if self.row_bytes is None:
+            self.row_bytes = len(json.dumps(result)) / float(no_results)
+        no_bytes = int(self.row_bytes * no_results)
+        ideal_sizes = [self.max_bytes * no_results // max(no_bytes, 1)]
+        if seconds > 0:
+            ideal_sizes.append(int(self.target_seconds * no_results / seconds))
+        size = min(ideal_sizes + [self.size * 2])  # grow gradually but shrink at once
+        size = max(min(size, self.max_size), self.min_size)
+        logger.info('Page of %d rows (%d bytes) read in %.2f seconds. Next page size: %d rows.' %
+                    (no_results, no_bytes, seconds, size))
+        self.size = size
+
+    def timed(self, read_page, count_results=len):
+        # type: (Callable[[Any], Any], Callable[[Any], int]) -> Callable[[Any], Any]
+        """Wrap function that reads a page so that the page size is updated after each page read
+
+        Args:
+            read_page (Callable[[Any], Any]): Function that reads a page from HDX and returns the result
+            count_results (Callable[[Any], int]): Function that counts results in page result. Defaults to len.
+
+        Returns:
+            Callable[[Any], Any]: Function that reads a page from HDX and returns the result
+        """
+        if not self.adaptive:
+            return read_page
+
+        def timed_read_page(page):
+            begin = time.time()
+            result = read_page(page)
+            if result:
+                self.update(count_results(result), time.time() - begin, result)
+            return result
+
+        return timed_read_page
+
+
 class HDXObject(UserDict, object):
     """HDXObject abstract class containing helper functions for creating, checking, and updating HDX objects.
     New HDX objects should extend this in similar fashion to Resource for example.
@@ -93,15 +206,17 @@ class HDXObject(UserDict, object):
         self.data = load_json_into_existing_dict(self.data, path)
 
     def _read_from_hdx(self, object_type, value, fieldname='id',
-                       action=None, **kwargs):
-        # type: (str, str, Optional[str], Optional[str], ...) -> Tuple[bool, Union[dict, str]]
-        """Makes a read call to HDX passing in given parameter.
+                       action=None, use_readcache=True, **kwargs):
+        # type: (str, str, Optional[str], Optional[str], bool, ...) -> Tuple[bool, Union[dict, str]]
+        """Makes a read call to HDX passing in given parameter. If a read cache has been set up (see
+        Configuration.setup_readcache), results of the show action are taken from and stored in it.
 
         Args:
             object_type (str): Description of HDX object type (for messages)
             value (str): Value of HDX field
             fieldname (Optional[str]): HDX field name. Defaults to id.
             action (Optional[str]): Replacement CKAN action url to use. Defaults to None.
+            use_readcache (bool): Whether to use read cache if one has been set up. Defaults to True.
             **kwargs: Other fields to pass to CKAN.
 
         Returns:
@@ -111,35 +226,314 @@ class HDXObject(UserDict, object):
             raise HDXError('Empty %s field name!' % object_type)
         if action is None:
             action = self.actions()['show']
+        else:
+            use_readcache = False
+        if use_readcache:
+            found, result = self._get_from_readcache(action, value, kwargs)
+            if found:
+                return True, result
         data = {fieldname: value}
         data.update(kwargs)
         try:
             result = self.configuration.call_remoteckan(action, data)
+            if use_readcache:
+                self._set_in_readcache(action, value, kwargs, result)
             return True, result
         except NotFound:
             return False, '%s=%s: not found!' % (fieldname, value)
         except Exception as e:
             raisefrom(HDXError, 'Failed when trying to read: %s=%s! (POST)' % (fieldname, value), e)
 
-    def _load_from_hdx(self, object_type, id_field):
-        # type: (str, str) -> bool
-        """Helper method to load the HDX object given by identifier from HDX
+    def _get_from_readcache(self, action, value, kwargs):
+        # type: (str, str, dict) -> Tuple[bool, Any]
+        """Get copy of result of show action from the read cache if one has been set up
+
+        Args:
+            action (str): CKAN show action
+            value (str): Value of HDX field
+            kwargs (dict): Other fields passed to CKAN
+
+        Returns:
+            Tuple[bool, Any]: (True if found, result or None)
+        """
+        if not self.configuration.has_readcache():
+            return False, None
+        found, result = self.configuration.readcache().get(action, value, json.dumps(kwargs, sort_keys=True))
+        if found:
+            return True, copy.deepcopy(result)
+        return False, None
+
+    def _set_in_readcache(self, action, value, kwargs, result):
+        # type: (str, str, dict, Any) -> None
+        """Store copy of result of show action in the read cache if one has been set up
+
+        Args:
+            action (str): CKAN show action
+            value (str): Value of HDX field
+            kwargs (dict): Other fields passed to CKAN
+            result (Any): Result of show action
+
+        Returns:
+            None
+        """
+        if self.configuration.has_readcache():
+            self.configuration.readcache().set(action, value, copy.deepcopy(result),
+                                               json.dumps(kwargs, sort_keys=True))
+
+    def _get_paging_workers(self):
+        # type: () -> int
+        """Get the number of pages to read from HDX concurrently (paging: workers in configuration)
+
+        Returns:
+            int: Number of pages to read concurrently
+        """
+        return self.configuration.get('paging', dict()).get('workers', 1)
+
+    def _get_page_sizer(self, page_size):
+        # type: (int) -> PageSizer
+        """Get object that chooses the number of rows in each page read from HDX (see PageSizer)
+
+        Args:
+            page_size (int): Default page size
+
+        Returns:
+            PageSizer: Object that chooses page sizes
+        """
+        return PageSizer(page_size, self.configuration, self._get_paging_workers())
+
+    def _read_pages(self, read_page, pages):
+        # type: (Callable[[Any], Any], Iterable[Any]) -> Iterator[Tuple[Any, Any]]
+        """Helper method to read pages from HDX yielding tuples of page and result in page order. If more than one
+        worker is configured, pages are read concurrently in batches of that many pages so that at most one batch of
+        results is held in memory at a time.
+
+        Args:
+            read_page (Callable[[Any], Any]): Function that reads a page from HDX and returns the result
+            pages (Iterable[Any]): Pages to read (passed to read_page)
+
+        Returns:
+            Iterator[Tuple[Any, Any]]: Iterator over (page, result)
+        """
+        workers = self._get_paging_workers()
+        if workers <= 1:
+            for page in pages:
+                yield page, read_page(page)
+            return
+        pool = ThreadPool(workers)
+        try:
+            pages = iter(pages)
+            batch = list(islice(pages, workers))
+            while batch:
+                for page, result in zip(batch, pool.map(read_page, batch)):
+                    yield page, result
+                batch = list(islice(pages, workers))
+        finally:
+            pool.close()
+            pool.join()
+
+    def _iter_search_pages(self, object_type, read_page, start, total_rows, default_page_size=None):
+        # type: (str, Callable[[Tuple[int, int]], Any], int, int, Optional[int]) -> Iterator[dict]
+        """Helper method to read the pages of a search of HDX objects yielding the HDX object metadata dicts in order.
+        Each page result must contain count and results. If paging workers in the configuration is more than 1, the
+        count is first obtained from HDX and then that many pages at a time are read concurrently. Otherwise, pages
+        are read one after another and their size is adapted if adaptive paging is turned on (see PageSizer). If the
+        count changes between pages or an HDX object is returned more than once, HDXInconsistentResultsError is raised.
+
+        Args:
+            object_type (str): Description of HDX object type (for messages)
+            read_page (Callable[[Tuple[int, int]], Any]): Function that reads page given (offset, rows) from HDX
+            start (int): Offset of first HDX object to read
+            total_rows (int): Maximum number of HDX objects to read
+            default_page_size (Optional[int]): Default number of rows in page. Defaults to None (page_size).
+
+        Returns:
+            Iterator[dict]: Iterator over HDX object metadata dicts
+        """
+        if default_page_size is None:
+            default_page_size = page_size
+        if self._get_paging_workers() > 1:
+            # find out how many HDX objects there are so that the pages can be read concurrently
+            first_count = self._get_search_count(read_page((start, 0)))
+            if not first_count:
+                return
+            pages = self._get_search_pages(start, total_rows, first_count, default_page_size)
+        else:
+            first_count = None
+            sizer = self._get_page_sizer(default_page_size)
+            read_page = sizer.timed(read_page, self._count_search_results)
+            pages = sizer.pages(start, total_rows)
+        ids = set()
+        for (_, rows), result in self._read_pages(read_page, pages):
+            results, first_count = self._check_search_page(object_type, result, first_count, ids)
+            if results is None:
+                break
+            for hdxobjectdict in results:
+                yield hdxobjectdict
+            if len(results) < rows:
+                break
+
+    @staticmethod
+    def _get_search_count(result):
+        # type: (Any) -> Optional[int]
+        """Get count of HDX objects from result of a search page
+
+        Args:
+            result (Any): Result of search page
+
+        Returns:
+            Optional[int]: Count of HDX objects or None
+        """
+        return result.get('count', None) if result else None
+
+    @staticmethod
+    def _count_search_results(result):
+        # type: (dict) -> int
+        """Get number of HDX objects returned in a search page
+
+        Args:
+            result (dict): Result of search page
+
+        Returns:
+            int: Number of HDX objects in page
+        """
+        return len(result.get('results', list()))
+
+    @staticmethod
+    def _get_search_pages(start, total_rows, count, default_page_size):
+        # type: (int, int, int, int) -> List[Tuple[int, int]]
+        """Get (offset, rows) pages to read concurrently given the count of HDX objects in a search
+
+        Args:
+            start (int): Offset of first HDX object to read
+            total_rows (int): Maximum number of HDX objects to read
+            count (int): Count of HDX objects in search
+            default_page_size (int): Number of rows in page
+
+        Returns:
+            List[Tuple[int, int]]: List of (offset, rows)
+        """
+        total_rows = max(min(total_rows, count - start), 0)
+        return [(start + offset, min(default_page_size, total_rows - offset))
+                for offset in range(0, total_rows, default_page_size)]
+
+    @staticmethod
+    def _check_search_page(object_type, result, first_count, ids):
+        # type: (str, Any, Optional[int], Set[str]) -> Tuple[Optional[List[dict]], Optional[int]]
+        """Helper method to check the result of a search page, raising HDXInconsistentResultsError if the count has
+        changed from the first page or an HDX object has already been returned. The ids of the HDX objects in the page
+        are added to ids.
+
+        Args:
+            object_type (str): Description of HDX object type (for messages)
+            result (Any): Result of search page
+            first_count (Optional[int]): Count of HDX objects from first page or None if this is the first page
+            ids (Set[str]): Ids of HDX objects already returned
+
+        Returns:
+            Tuple[Optional[List[dict]], Optional[int]]: (HDX object metadata dicts or None if search is over, first count)
+        """
+        if not result:
+            logger.debug(result)
+            return None, first_count
+        count = result.get('count', None)
+        if not count:
+            return None, first_count
+        if first_count is None:
+            first_count = count
+        elif count != first_count:  # Make sure counts are all same for multiple calls to HDX
+            raise HDXInconsistentResultsError('Count of %ss changed from %d to %d during search!' %
+                                              (object_type, first_count, count))
+        results = result['results']
+        for hdxobjectdict in results:
+            hdxobjectid = hdxobjectdict['id']
+            if hdxobjectid in ids:  # check for duplicates (shouldn't happen)
+                raise HDXInconsistentResultsError('%s %s returned more than once during search!' %
+                                                  (object_type.capitalize(), hdxobjectid))
+            ids.add(hdxobjectid)
+        return results, first_count
+
+    @staticmethod
+    def _search_consistently(object_type, search):
+        # type: (str, Callable[[], Iterable[Any]]) -> List[Any]
+        """Helper method to read all results of a search of HDX objects, redoing the search if the results are
+        inconsistent (HDXInconsistentResultsError is raised) up to max_attempts times
+
+        Args:
+            object_type (str): Description of HDX object type (for messages)
+            search (Callable[[], Iterable[Any]]): Function that searches HDX
+
+        Returns:
+            List[Any]: Results of search
+        """
+        attempts = 0
+        while attempts < max_attempts:  # if the count values vary for multiple calls, then must redo query
+            try:
+                return list(search())
+            except HDXInconsistentResultsError as e:
+                logger.debug(e)
+                attempts += 1
+        raise HDXError('Maximum attempts reached for searching for %ss!' % object_type)
+
+    def _load_from_hdx(self, object_type, id_field, use_readcache=True):
+        # type: (str, str, bool) -> bool
+        """Helper method to load the HDX object given by identifier from HDX. If a journal has been set up (see
+        Configuration.setup_journal), journaled writes of the object are applied to it.
 
         Args:
             object_type (str): Description of HDX object type (for messages)
             id_field (str): HDX object identifier
+            use_readcache (bool): Whether to use read cache if one has been set up. Defaults to True.
 
         Returns:
             bool: True if loaded, False if not
         """
-        success, result = self._read_from_hdx(object_type, id_field)
+        success, result = self._read_from_hdx(object_type, id_field, use_readcache=use_readcache)
         if success:
-            self.old_data = self.data
-            self.data = result
+            self._set_loaded_data(result)
             return True
         logger.debug(result)
         return False
 
+    def _set_loaded_data(self, result):
+        # type: (dict) -> None
+        """Helper method to replace metadata with HDX object metadata loaded from HDX, saving current metadata
+
+        Args:
+            result (dict): HDX object metadata loaded from HDX
+
+        Returns:
+            None
+        """
+        self.old_data = self.data
+        self.data = self._apply_journal(result)
+
+    def _apply_journal(self, data):
+        # type: (dict) -> dict
+        """Apply journaled updates and patches of the HDX object given by metadata to it if a journal has been set up
+
+        Args:
+            data (dict): HDX object metadata read from HDX
+
+        Returns:
+            dict: HDX object metadata with journaled writes applied
+        """
+        if not self.configuration.has_journal() or not isinstance(data, dict):
+            return data
+        return self.configuration.journal().apply_pending(data, self._get_journal_actions(self.actions()))
+
+    @staticmethod
+    def _get_journal_actions(actions):
+        # type: (Dict[str, str]) -> List[str]
+        """Get CKAN actions whose journaled writes change an HDX object of a type given its actions
+
+        Args:
+            actions (Dict[str, str]): Dictionary of actions of HDX object type
+
+        Returns:
+            List[str]: Update and patch actions
+        """
+        return [actions[action] for action in ('update', 'patch') if action in actions]
+
     @staticmethod
     @abc.abstractmethod
     def read_from_hdx(id_field, configuration=None):
@@ -160,6 +554,9 @@ class HDXObject(UserDict, object):
         if not self.data:
             raise HDXError('No data in %s!' % object_type)
         if id_field_name not in self.data:
+            if self.configuration.has_journal():
+                raise HDXError('No %s field (mandatory) in %s! Objects created in a journal have no %s until the '
+                               'journal is replayed.' % (id_field_name, object_type, id_field_name))
             raise HDXError('No %s field (mandatory) in %s!' % (id_field_name, object_type))
 
     def _check_load_existing_object(self, object_type, id_field_name):
@@ -174,7 +571,7 @@ class HDXObject(UserDict, object):
             None
         """
         self._check_existing_object(object_type, id_field_name)
-        if not self._load_from_hdx(object_type, self.data[id_field_name]):
+        if not self._load_from_hdx(object_type, self.data[id_field_name], use_readcache=False):
             raise HDXError('No existing %s to update!' % object_type)
 
     @abc.abstractmethod
@@ -205,52 +602,82 @@ class HDXObject(UserDict, object):
             if field not in self.data and field not in ignore_fields:
                 raise HDXError('Field %s is missing in %s!' % (field, object_type))
 
-    def _merge_hdx_update(self, object_type, id_field_name, file_to_upload=None):
-        # type: (str, str, Optional[str]) -> None
-        """Helper method to check if HDX object exists and update it
+    def _merge_hdx_update(self, object_type, id_field_name, file_to_upload=None, patch=False):
+        # type: (str, str, Optional[str], bool) -> bool
+        """Helper method to check if HDX object exists and update it. If merging the metadata into the metadata just
+        loaded from HDX changes nothing and there is no file to upload, HDX is not updated.
 
         Args:
             object_type (str): Description of HDX object type (for messages)
             id_field_name (str): Name of field containing HDX object identifier
             file_to_upload (Optional[str]): File to upload to HDX
+            patch (bool): Whether to send only changed fields using patch action. Defaults to False.
 
         Returns:
-            None
+            bool: True if HDX object was updated in HDX, False if it was unchanged
+        """
+        changed_fields, file_to_upload = self._prepare_hdx_update(object_type, id_field_name, file_to_upload)
+        if not changed_fields and file_to_upload is None:
+            return False
+        if patch:
+            self._patch_to_hdx(id_field_name, changed_fields, file_to_upload)
+        else:
+            self._save_to_hdx('update', id_field_name, file_to_upload)
+        return True
+
+    def _prepare_hdx_update(self, object_type, id_field_name, file_to_upload=None):
+        # type: (str, str, Optional[str]) -> Tuple[List[str], Optional[str]]
+        """Helper method to merge the metadata into the metadata just loaded from HDX and check the result. If nothing
+        changed and there is no file to upload, this is logged.
+
+        Args:
+            object_type (str): Description of HDX object type (for messages)
+            id_field_name (str): Name of field containing HDX object identifier
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            Tuple[List[str], Optional[str]]: (Changed fields, file to upload or None if it does not need uploading)
         """
+        file_to_upload = self._get_file_to_upload_if_changed(self.old_data, self.data, file_to_upload)
+        changed_fields = merge_changed_keys(self.data, self.old_data)
         merge_two_dictionaries(self.data, self.old_data)
         ignore_field = self.configuration['%s' % object_type].get('ignore_on_update')
         self.check_required_fields(ignore_fields=[ignore_field])
-        self._save_to_hdx('update', id_field_name, file_to_upload)
+        if not changed_fields and file_to_upload is None:
+            logger.info('%s %s is unchanged. Not updating.' % (object_type, self.data[id_field_name]))
+        return changed_fields, file_to_upload
 
     @abc.abstractmethod
     def update_in_hdx(self):
-        # type: () -> None
+        # type: () -> bool
         """Abstract method to check if HDX object exists in HDX and if so, update it
 
         Returns:
-            None
+            bool: True if HDX object was updated in HDX, False if it was unchanged
         """
         raise NotImplementedError
 
-    def _update_in_hdx(self, object_type, id_field_name, file_to_upload=None):
-        # type: (str, str, Optional[str]) -> None
+    def _update_in_hdx(self, object_type, id_field_name, file_to_upload=None, patch=False):
+        # type: (str, str, Optional[str], bool) -> bool
         """Helper method to check if HDX object exists in HDX and if so, update it
 
         Args:
             object_type (str): Description of HDX object type (for messages)
             id_field_name (str): Name of field containing HDX object identifier
             file_to_upload (Optional[str]): File to upload to HDX
+            patch (bool): Whether to send only changed fields using patch action. Defaults to False.
 
         Returns:
-            None
+            bool: True if HDX object was updated in HDX, False if it was unchanged
         """
 
         self._check_load_existing_object(object_type, id_field_name)
-        self._merge_hdx_update(object_type, id_field_name, file_to_upload)
+        return self._merge_hdx_update(object_type, id_field_name, file_to_upload, patch)
 
     def _write_to_hdx(self, action, data, id_field_name, file_to_upload=None):
         # type: (str, dict, str, Optional[str]) -> dict
-        """Creates or updates an HDX object in HDX and return HDX object metadata dict
+        """Creates or updates an HDX object in HDX and return HDX object metadata dict. If a journal has been set up
+        (see Configuration.setup_journal), the write is appended to it instead and the data is returned.
 
         Args:
             action (str): Action to perform eg. 'create', 'update'
@@ -261,6 +688,9 @@ class HDXObject(UserDict, object):
         Returns:
             dict: HDX object metadata
         """
+        if action not in read_only_actions and self.configuration.has_journal():
+            self.configuration.journal().append(self.actions()[action], data, id_field_name, file_to_upload)
+            return copy.deepcopy(data)
         file = None
         try:
             if file_to_upload:
@@ -268,12 +698,61 @@ class HDXObject(UserDict, object):
                 files = [('upload', file)]
             else:
                 files = None
-            return self.configuration.call_remoteckan(self.actions()[action], data, files=files)
+            result = self.configuration.call_remoteckan(self.actions()[action], data, files=files,
+                                                        upload_callback=self._get_upload_callback())
         except Exception as e:
             raisefrom(HDXError, 'Failed when trying to %s %s! (POST)' % (action, data[id_field_name]), e)
         finally:
             if file_to_upload and file:
                 file.close()
+            self._invalidate_cached(data)
+        self._invalidate_cached(result)
+        return result
+
+    def _get_file_to_upload_if_changed(self, local_data, hdx_data, file_to_upload):
+        # type: (dict, dict, Optional[str]) -> Optional[str]
+        """Get file to upload to HDX or None if it does not need uploading. HDX objects that upload files override
+        this.
+
+        Args:
+            local_data (dict): Metadata to be merged into metadata from HDX
+            hdx_data (dict): Metadata from HDX
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            Optional[str]: File to upload to HDX or None
+        """
+        return file_to_upload
+
+    def _get_upload_callback(self):
+        # type: () -> Optional[Callable[[int, int, float], None]]
+        """Get function to call with progress of file uploads if the HDX object uploads files (see
+        Resource.set_upload_callback)
+
+        Returns:
+            Optional[Callable[[int, int, float], None]]: Function to call with upload progress or None
+        """
+        return getattr(self, 'upload_callback', None)
+
+    def _invalidate_cached(self, data):
+        # type: (Optional[dict]) -> None
+        """Remove entries read using the id or name of the HDX object given by metadata from the read cache if one has
+        been set up. Entries for the dataset given by package_id and for any resources in the metadata are also
+        removed.
+
+        Args:
+            data (Optional[dict]): HDX object metadata
+
+        Returns:
+            None
+        """
+        if not self.configuration.has_readcache() or not isinstance(data, dict):
+            return
+        identifiers = [data[key] for key in ('id', 'name', 'package_id') if data.get(key)]
+        for resource in data.get('resources') or list():
+            if isinstance(resource, dict) and resource.get('id'):
+                identifiers.append(resource['id'])
+        self.configuration.readcache().invalidate(identifiers)
 
     def _save_to_hdx(self, action, id_field_name, file_to_upload=None):
         # type: (str, str, Optional[str]) -> None
@@ -292,6 +771,28 @@ class HDXObject(UserDict, object):
         self.old_data = self.data
         self.data = result
 
+    def _patch_to_hdx(self, id_field_name, fields, file_to_upload=None):
+        # type: (str, Iterable[str], Optional[str]) -> None
+        """Updates only the given fields of an HDX object in HDX using the patch action, saving current data and
+        replacing with returned HDX object data from HDX
+
+        Args:
+            id_field_name (str): Name of field containing HDX object identifier
+            fields (Iterable[str]): Fields of HDX object to send
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            None
+        """
+        if 'patch' not in self.actions():
+            raise HDXError('Patch is not supported for %s!' % self.data[id_field_name])
+        data = {id_field_name: self.data[id_field_name]}
+        for field in fields:
+            data[field] = self.data[field]
+        result = self._write_to_hdx('patch', data, id_field_name, file_to_upload)
+        self.old_data = self.data
+        self.data = result
+
     @abc.abstractmethod
     def create_in_hdx(self):
         # type: () -> None
@@ -318,7 +819,8 @@ class HDXObject(UserDict, object):
             None
         """
         self.check_required_fields()
-        if id_field_name in self.data and self._load_from_hdx(object_type, self.data[id_field_name]):
+        if id_field_name in self.data and self._load_from_hdx(object_type, self.data[id_field_name],
+                                                              use_readcache=False):
             logger.warning('%s exists. Updating %s' % (object_type, self.data[id_field_name]))
             self._merge_hdx_update(object_type, id_field_name, file_to_upload)
         else:
@@ -346,6 +848,9 @@ class HDXObject(UserDict, object):
             None
         """
         if id_field_name not in self.data:
+            if self.configuration.has_journal():
+                raise HDXError('No %s field (mandatory) in %s! Objects created in a journal have no %s until the '
+                               'journal is replayed.' % (id_field_name, object_type, id_field_name))
             raise HDXError('No %s field (mandatory) in %s!' % (id_field_name, object_type))
         self._save_to_hdx('delete', id_field_name)
 
@@ -416,23 +921,25 @@ class HDXObject(UserDict, object):
             newhdxobjects.append(hdxobject.data)
         return newhdxobjects
 
-    def _copy_hdxobjects(self, hdxobjects, hdxobjectclass, attribute_to_copy=None):
-        # type: (List[HDXObjectUpperBound], type, Optional[str]) -> List[HDXObjectUpperBound]
-        """Helper function to make a deep copy of a supplied list of HDX objects
+    def _snapshot_hdxobjects(self, hdxobjects, hdxobjectclass, attributes_to_copy=tuple()):
+        # type: (List[HDXObjectUpperBound], type, Iterable[str]) -> List[HDXObjectUpperBound]
+        """Helper function to make a copy-on-write snapshot of a supplied list of HDX objects. Only the top level of
+        each HDX object's metadata is copied so nested lists and dictionaries are shared with the original. Merging a
+        snapshot using merge_two_dictionaries with copy_branches=True copies only the nested lists and dictionaries
+        that are taken from it.
 
         Args:
-            hdxobjects (list[T <= HDXObject]): List of HDX objects to copy
-            hdxobjectclass (type): Type of the HDX Objects to be copied
-            attribute_to_copy (Optional[str]): An attribute to copy over from the HDX object. Defaults to None.
+            hdxobjects (list[T <= HDXObject]): List of HDX objects to snapshot
+            hdxobjectclass (type): Type of the HDX Objects to be snapshotted
+            attributes_to_copy (Iterable[str]): Attributes to copy over from the HDX object. Defaults to none.
 
         Returns:
-            list[T <= HDXObject]: Deep copy of list of HDX objects
+            list[T <= HDXObject]: Snapshot of list of HDX objects
         """
         newhdxobjects = list()
         for hdxobject in hdxobjects:
-            newhdxobjectdata = copy.deepcopy(hdxobject.data)
-            newhdxobject = hdxobjectclass(newhdxobjectdata, configuration=self.configuration)
-            if attribute_to_copy:
+            newhdxobject = hdxobjectclass(dict(hdxobject.data), configuration=self.configuration)
+            for attribute_to_copy in attributes_to_copy:
                 value = getattr(hdxobject, attribute_to_copy)
                 setattr(newhdxobject, attribute_to_copy, value)
             newhdxobjects.append(newhdxobject)
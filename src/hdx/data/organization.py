@@ -2,7 +2,7 @@
 """Organization class containing all logic for creating, checking, and updating organizations."""
 import logging
 from os.path import join
-from typing import Optional
+from typing import Optional, List, Dict, Union
 
 import hdx.data.dataset
 from hdx.data.hdxobject import HDXObject, HDXError
@@ -10,6 +10,8 @@ from hdx.data.user import User
 
 logger = logging.getLogger(__name__)
 
+max_fq_length = 2000  # keep filter queries well under server limits on request size
+
 
 class Organization(HDXObject):
     """Organization class containing all logic for creating, checking, and updating organizations.
@@ -36,6 +38,7 @@ class Organization(HDXObject):
         return {
             'show': 'organization_show',
             'update': 'organization_update',
+            'patch': 'organization_patch',
             'create': 'organization_create',
             'delete': 'organization_delete',
             'list': 'organization_list'
@@ -97,14 +100,17 @@ class Organization(HDXObject):
         """
         self._check_required_fields('organization', ignore_fields)
 
-    def update_in_hdx(self):
-        # type: () -> None
+    def update_in_hdx(self, patch=False):
+        # type: (bool) -> bool
         """Check if organization exists in HDX and if so, update organization
 
+        Args:
+            patch (bool): Whether to send only changed fields using organization_patch. Defaults to False.
+
         Returns:
-            None
+            bool: True if organization was updated in HDX, False if it was unchanged
         """
-        self._update_in_hdx('organization', 'id')
+        return self._update_in_hdx('organization', 'id', patch=patch)
 
     def create_in_hdx(self):
         # type: () -> None
@@ -225,6 +231,53 @@ class Organization(HDXObject):
                                                       configuration=self.configuration,
                                                       fq='organization:%s' % self.data['name'], **kwargs)
 
+    @staticmethod
+    def get_datasets_for_organizations(names, query='*:*', configuration=None, **kwargs):
+        # type: (List[str], Optional[str], Optional[Configuration], ...) -> Dict[str, List[Union[hdx.data.dataset.Dataset, hdx.data.dataset.DatasetSummary]]]
+        """Get datasets in several organizations using one dataset search for many organizations (split into as few
+        searches as possible while keeping filter queries shorter than max_fq_length) and grouping the results by
+        organization
+
+        Args:
+            names (List[str]): Names of organizations
+            query (Optional[str]): Restrict datasets returned to this query (in Solr format). Defaults to '*:*'.
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See Dataset.search_in_hdx
+
+        Returns:
+            Dict[str, List[Union[Dataset, DatasetSummary]]]: Dictionary of organization name to datasets in organization
+        """
+        fields = kwargs.get('fields')
+        if fields and 'organization' not in fields:
+            kwargs['fields'] = list(fields) + ['organization']
+        extra_fq = kwargs.pop('fq', None)
+        organization_datasets = dict()
+        chunks = list()
+        chunk = list()
+        for name in names:
+            organization_datasets[name] = list()
+            chunk.append('"%s"' % name)
+            if len(chunk) > 1 and len(' OR '.join(chunk)) > max_fq_length:
+                chunks.append(chunk[:-1])
+                chunk = chunk[-1:]
+        if chunk:
+            chunks.append(chunk)
+        for chunk in chunks:
+            fq = 'organization:(%s)' % ' OR '.join(chunk)
+            if extra_fq:
+                fq = '%s AND (%s)' % (fq, extra_fq)
+            datasets = hdx.data.dataset.Dataset.search_in_hdx(query=query, configuration=configuration, fq=fq,
+                                                              **kwargs)
+            for dataset in datasets:
+                organization = dataset.get('organization')
+                if isinstance(organization, dict):  # full datasets have organization details
+                    organization = organization.get('name')
+                if organization in organization_datasets:
+                    organization_datasets[organization].append(dataset)
+                else:
+                    logger.warning('Dataset %s has unexpected organization %s' % (dataset['id'], organization))
+        return organization_datasets
+
     @staticmethod
     def get_all_organization_names(configuration=None, **kwargs):
         # type: (Optional[Configuration], ...) -> List[str]
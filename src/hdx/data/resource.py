@@ -1,11 +1,13 @@
 # -*- coding: utf-8 -*-
 """Resource class containing all logic for creating, checking, and updating resources."""
+import hashlib
 import logging
+import os
 import zipfile
 from os import unlink
 from os.path import join, splitext
 from tempfile import gettempdir
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Iterator, Callable
 
 import tabulator
 from tabulator import Stream
@@ -14,10 +16,12 @@ from hdx.utilities import raisefrom
 from hdx.utilities.downloader import Download
 from hdx.utilities.loader import load_yaml, load_json
 from hdx.utilities.path import script_dir_plus_file
-from .hdxobject import HDXObject, HDXError
+from .hdxobject import HDXObject, HDXError, max_int
 
 logger = logging.getLogger(__name__)
 
+file_hashes = dict()  # MD5 hashes of files to upload keyed by path, inode, size and modification and change times
+
 
 class Resource(HDXObject):
     """Resource class containing all logic for creating, checking, and updating resources.
@@ -33,6 +37,7 @@ class Resource(HDXObject):
             initial_data = dict()
         super(Resource, self).__init__(initial_data, configuration=configuration)
         self.file_to_upload = None
+        self.upload_callback = None
 
     @staticmethod
     def actions():
@@ -45,6 +50,7 @@ class Resource(HDXObject):
         return {
             'show': 'resource_show',
             'update': 'resource_update',
+            'patch': 'resource_patch',
             'create': 'resource_create',
             'delete': 'resource_delete',
             'search': 'resource_search',
@@ -118,6 +124,106 @@ class Resource(HDXObject):
         """
         self.file_to_upload = file_to_upload
 
+    def get_upload_callback(self):
+        # type: () -> Optional[Callable[[int, int, float], None]]
+        """Get the function called with the progress of uploading the file
+
+        Returns:
+            Optional[Callable[[int, int, float], None]]: Function called with upload progress or None if there isn't one
+        """
+        return self.upload_callback
+
+    def set_upload_callback(self, upload_callback):
+        # type: (Optional[Callable[[int, int, float], None]]) -> None
+        """Set a function to be called with the progress of uploading the file. It is called repeatedly during the
+        upload with the number of bytes sent so far, the total number of bytes and the average throughput in bytes
+        per second. The file is then always uploaded with a streaming multipart body.
+
+        Args:
+            upload_callback (Optional[Callable[[int, int, float], None]]): Function to call with upload progress
+
+        Returns:
+            None
+        """
+        self.upload_callback = upload_callback
+
+    @staticmethod
+    def get_file_hash(path):
+        # type: (str) -> str
+        """Get MD5 hash of file (as Download.hash_stream does for urls). Hashes are remembered for each path, device,
+        inode, size, modification time and change time so that a file is only read once while it is unchanged. A file
+        replaced by another with the same size and modification time (eg. by renaming over it) has a different inode
+        and change time so it is read again.
+
+        Args:
+            path (str): Path to file
+
+        Returns:
+            str: MD5 hash of file
+        """
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime, stat.st_ctime)
+        file_hash = file_hashes.get(key)
+        if file_hash is None:
+            md5hash = hashlib.md5()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1048576), b''):
+                    md5hash.update(chunk)
+            file_hash = md5hash.hexdigest()
+            file_hashes[key] = file_hash
+        return file_hash
+
+    def _add_file_hash(self):
+        # type: () -> None
+        """Add MD5 hash of file to upload (if any) to hash field so that it is stored in HDX with the upload
+
+        Returns:
+            None
+        """
+        if self.file_to_upload:
+            self.data['hash'] = self.get_file_hash(self.file_to_upload)
+
+    def is_file_unchanged(self, hdx_data):
+        # type: (dict) -> bool
+        """Check if file to upload has the same MD5 hash as the hash field of the resource metadata from HDX, in which
+        case it need not be uploaded again. Always False if upload: skip_unchanged in the configuration is False.
+
+        Args:
+            hdx_data (dict): Resource metadata from HDX
+
+        Returns:
+            bool: True if file to upload is the same as the one in HDX, False if not
+        """
+        if not self.file_to_upload or not hdx_data.get('hash'):
+            return False
+        if not self.configuration.get('upload', dict()).get('skip_unchanged', True):
+            return False
+        return self.get_file_hash(self.file_to_upload) == hdx_data['hash']
+
+    def _get_file_to_upload_if_changed(self, local_data, hdx_data, file_to_upload):
+        # type: (dict, dict, Optional[str]) -> Optional[str]
+        """Get file to upload to HDX or None if it is the same as the file in HDX (see is_file_unchanged). If it is
+        unchanged, the url is removed from the local metadata so that the url of the file in HDX is kept. Otherwise,
+        its hash is added to the local metadata so that it is stored in HDX with the upload.
+
+        Args:
+            local_data (dict): Metadata to be merged into metadata from HDX
+            hdx_data (dict): Metadata from HDX
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            Optional[str]: File to upload to HDX or None
+        """
+        if not file_to_upload:
+            return file_to_upload
+        if self.is_file_unchanged(hdx_data):
+            logger.info('File %s is unchanged in HDX. Not uploading.' % file_to_upload)
+            local_data.pop('url', None)
+            local_data['hash'] = hdx_data['hash']
+            return None
+        local_data['hash'] = self.get_file_hash(file_to_upload)
+        return file_to_upload
+
     def check_required_fields(self, ignore_fields=list()):
         # type: (List[str]) -> None
         """Check that metadata for resource is complete and add resource_type and url_type if not supplied.
@@ -149,14 +255,17 @@ class Resource(HDXObject):
                 del self.data['tracking_summary']
         self._check_required_fields('resource', ignore_fields)
 
-    def update_in_hdx(self):
-        # type: () -> None
+    def update_in_hdx(self, patch=False):
+        # type: (bool) -> bool
         """Check if resource exists in HDX and if so, update it
 
+        Args:
+            patch (bool): Whether to send only changed fields using resource_patch. Defaults to False.
+
         Returns:
-            None
+            bool: True if resource was updated in HDX, False if it was unchanged
         """
-        self._update_in_hdx('resource', 'id', self.file_to_upload)
+        return self._update_in_hdx('resource', 'id', self.file_to_upload, patch=patch)
 
     def create_in_hdx(self):
         # type: () -> None
@@ -165,6 +274,7 @@ class Resource(HDXObject):
         Returns:
             None
         """
+        self._add_file_hash()
         self._create_in_hdx('resource', 'id', 'name', self.file_to_upload)
 
     def delete_from_hdx(self):
@@ -179,31 +289,58 @@ class Resource(HDXObject):
     @staticmethod
     def search_in_hdx(query, configuration=None, **kwargs):
         # type: (str, Optional[Configuration], ...) -> List['Resource']
-        """Searches for resources in HDX. NOTE: Does not search dataset metadata!
+        """Searches for resources in HDX. NOTE: Does not search dataset metadata! All matching resources are read
+        page by page. If paging workers in the configuration is more than 1, pages of results are read from HDX
+        concurrently.
 
         Args:
             query (str): Query
             configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
             **kwargs: See below
-            order_by (str): A field on the Resource model that orders the results
+            order_by (str): A field on the Resource model that orders the results. Defaults to id.
             offset (int): Apply an offset to the query
-            limit (int): Apply a limit to the query
+            limit (int): Apply a limit to the query. Defaults to all resources (sys.maxsize).
         Returns:
             List[Resource]: List of resources resulting from query
         """
 
-        resources = []
+        return Resource._search_consistently('resource', lambda: Resource.iter_search_in_hdx(
+            query, configuration=configuration, **kwargs))
+
+    @staticmethod
+    def iter_search_in_hdx(query, configuration=None, **kwargs):
+        # type: (str, Optional[Configuration], ...) -> Iterator['Resource']
+        """Searches for resources in HDX yielding them page by page. If the count changes between pages or a
+        resource is returned more than once, HDXInconsistentResultsError is raised (see Dataset.iter_search_in_hdx).
+        NOTE: Does not search dataset metadata!
+
+        Args:
+            query (str): Query
+            configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+            **kwargs: See below
+            order_by (str): A field on the Resource model that orders the results. Defaults to id.
+            offset (int): Apply an offset to the query
+            limit (int): Apply a limit to the query. Defaults to all resources (sys.maxsize).
+        Returns:
+            Iterator[Resource]: Iterator over resources resulting from query
+        """
+
         resource = Resource(configuration=configuration)
-        success, result = resource._read_from_hdx('resource', query, 'query', Resource.actions()['search'])
-        if result:
-            count = result.get('count', None)
-            if count:
-                for resourcedict in result['results']:
-                    resource = Resource(resourcedict, configuration=configuration)
-                    resources.append(resource)
-        else:
-            logger.debug(result)
-        return resources
+        total_rows = kwargs.get('limit', max_int)
+        start = kwargs.get('offset', 0)
+        kwargs['order_by'] = kwargs.get('order_by', 'id')  # pages need a consistent order
+
+        def read_page(page):
+            offset, rows = page
+            pagekwargs = dict(kwargs)
+            pagekwargs['offset'] = offset
+            pagekwargs['limit'] = rows
+            _, result = resource._read_from_hdx('resource', query, 'query', Resource.actions()['search'],
+                                                **pagekwargs)
+            return result
+
+        for resourcedict in resource._iter_search_pages('resource', read_page, start, total_rows):
+            yield Resource(resourcedict, configuration=configuration)
 
     def download(self, folder=None):
         # type: (Optional[str]) -> Tuple[str, str]
@@ -232,6 +369,9 @@ class Resource(HDXObject):
         Returns:
             None
         """
+        if self.configuration.has_journal():
+            self._write_to_hdx('datastore_delete', {'resource_id': self.data['id'], 'force': True}, 'resource_id')
+            return
         success, result = self._read_from_hdx('datastore', self.data['id'], 'resource_id',
                                               self.actions()['datastore_delete'],
                                               force=True)
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""Session class keeping one instance of each HDX object read in a unit of work and writing back only those that
+changed."""
+import copy
+import logging
+from typing import Optional, List, Any, Type, Iterable, Tuple
+
+from hdx.data.dataset import Dataset
+from hdx.data.hdxobject import HDXObject, HDXObjectUpperBound
+from hdx.data.organization import Organization
+from hdx.data.showcase import Showcase
+from hdx.data.user import User
+from hdx.hdx_configuration import Configuration
+
+logger = logging.getLogger(__name__)
+
+
+class Session(object):
+    """Unit of work for HDX objects. It keeps an identity map of the HDX objects read through it or added to it keyed
+    by type and id (and name for types with unique names) so that repeated reads of the same object return the same
+    instance. On leaving the with block (or calling flush), HDX objects that were changed since they were read or
+    last flushed are updated in HDX and ones added without an id are created in HDX. If the with block raises an
+    exception, nothing is written.
+
+    Args:
+        configuration (Optional[Configuration]): HDX configuration. Defaults to global configuration.
+    """
+    unique_name_types = (Dataset, Organization, Showcase, User)
+
+    def __init__(self, configuration=None):
+        # type: (Optional[Configuration]) -> None
+        if configuration is None:
+            self.configuration = Configuration.read()
+        else:
+            self.configuration = configuration
+        self.identity_map = dict()
+        self.objects = list()
+        self.states = dict()
+
+    def __enter__(self):
+        # type: () -> Session
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # type: (Any, Any, Any) -> None
+        if exc_type is None:
+            self.flush()
+
+    @staticmethod
+    def _get_state(hdxobject):
+        # type: (HDXObject) -> Any
+        """Get copy of HDX object metadata (including that of resources for datasets) for detecting changes
+
+        Args:
+            hdxobject (HDXObject): HDX object
+
+        Returns:
+            Any: Copy of HDX object metadata
+        """
+        if isinstance(hdxobject, Dataset):
+            return copy.deepcopy((hdxobject.data, hdxobject._get_resources_data()))
+        return copy.deepcopy(hdxobject.data)
+
+    def _get_keys(self, hdxobject):
+        # type: (HDXObject) -> List[Tuple[type, str]]
+        """Get keys for HDX object in identity map
+
+        Args:
+            hdxobject (HDXObject): HDX object
+
+        Returns:
+            List[Tuple[type, str]]: Keys for HDX object
+        """
+        keys = list()
+        hdxobjectclass = type(hdxobject)
+        if hdxobject.data.get('id'):
+            keys.append((hdxobjectclass, hdxobject.data['id']))
+        if isinstance(hdxobject, self.unique_name_types) and hdxobject.data.get('name'):
+            keys.append((hdxobjectclass, hdxobject.data['name']))
+        return keys
+
+    def _register(self, hdxobject):
+        # type: (HDXObjectUpperBound) -> None
+        """Add HDX object to identity map and record its state
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object
+
+        Returns:
+            None
+        """
+        for key in self._get_keys(hdxobject):
+            self.identity_map[key] = hdxobject
+        self.states[id(hdxobject)] = self._get_state(hdxobject)
+
+    def add(self, hdxobject):
+        # type: (HDXObjectUpperBound) -> HDXObjectUpperBound
+        """Add HDX object to session. If an HDX object of the same type with the same id (or name) is already in the
+        session, that object is returned instead and the given one is ignored. An HDX object without an id is
+        created in HDX when the session is flushed.
+
+        Args:
+            hdxobject (T <= HDXObject): HDX object
+
+        Returns:
+            T <= HDXObject: HDX object in session
+        """
+        for key in self._get_keys(hdxobject):
+            existing = self.identity_map.get(key)
+            if existing is not None:
+                return existing
+        if id(hdxobject) in self.states:
+            return hdxobject
+        self.objects.append(hdxobject)
+        if hdxobject.data.get('id'):
+            self._register(hdxobject)
+        else:
+            self.states[id(hdxobject)] = None
+        return hdxobject
+
+    def add_all(self, hdxobjects):
+        # type: (Iterable[HDXObjectUpperBound]) -> List[HDXObjectUpperBound]
+        """Add HDX objects to session (see add)
+
+        Args:
+            hdxobjects (Iterable[T <= HDXObject]): HDX objects
+
+        Returns:
+            List[T <= HDXObject]: HDX objects in session
+        """
+        return [self.add(hdxobject) for hdxobject in hdxobjects]
+
+    def read(self, hdxobjectclass, identifier):
+        # type: (Type[HDXObjectUpperBound], str) -> Optional[HDXObjectUpperBound]
+        """Get HDX object from session or if it is not in session, read it from HDX and add it to session
+
+        Args:
+            hdxobjectclass (Type[T <= HDXObject]): Type of HDX object eg. Dataset
+            identifier (str): Identifier of HDX object
+
+        Returns:
+            Optional[T <= HDXObject]: HDX object or None if not found
+        """
+        hdxobject = self.identity_map.get((hdxobjectclass, identifier))
+        if hdxobject is not None:
+            return hdxobject
+        hdxobject = hdxobjectclass.read_from_hdx(identifier, configuration=self.configuration)
+        if hdxobject is None:
+            return None
+        hdxobject = self.add(hdxobject)
+        self.identity_map[(hdxobjectclass, identifier)] = hdxobject
+        return hdxobject
+
+    def search_datasets(self, query='*:*', **kwargs):
+        # type: (Optional[str], ...) -> List[Dataset]
+        """Search for datasets in HDX (see Dataset.search_in_hdx) returning datasets already in session where they
+        exist and adding the others to it
+
+        Args:
+            query (Optional[str]): Query (in Solr format). Defaults to '*:*'.
+            **kwargs: See Dataset.search_in_hdx
+
+        Returns:
+            List[Dataset]: List of datasets resulting from query
+        """
+        return self.add_all(Dataset.search_in_hdx(query, configuration=self.configuration, **kwargs))
+
+    def is_dirty(self, hdxobject):
+        # type: (HDXObject) -> bool
+        """Check if HDX object in session has been changed since it was read or last flushed or has not been
+        created in HDX yet
+
+        Args:
+            hdxobject (HDXObject): HDX object
+
+        Returns:
+            bool: True if HDX object is new or changed, False if not
+        """
+        state = self.states.get(id(hdxobject))
+        if state is None:
+            return True
+        return self._get_state(hdxobject) != state
+
+    def get_dirty(self):
+        # type: () -> List[HDXObject]
+        """Get HDX objects in session that are new or have been changed
+
+        Returns:
+            List[HDXObject]: HDX objects that are new or changed
+        """
+        return [hdxobject for hdxobject in self.objects if self.is_dirty(hdxobject)]
+
+    def flush(self):
+        # type: () -> List[HDXObject]
+        """Create new HDX objects and update changed ones in HDX in the order they were added to the session
+
+        Returns:
+            List[HDXObject]: HDX objects written to HDX
+        """
+        written = list()
+        for hdxobject in self.get_dirty():
+            if self.states[id(hdxobject)] is None:
+                hdxobject.create_in_hdx()
+            else:
+                hdxobject.update_in_hdx()
+            self._register(hdxobject)
+            written.append(hdxobject)
+        logger.info('Session flushed %d of %d HDX objects' % (len(written), len(self.objects)))
+        return written
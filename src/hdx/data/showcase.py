@@ -101,13 +101,13 @@ class Showcase(hdx.data.hdxobject.HDXObject):
         self._check_required_fields('showcase', ignore_fields)
 
     def update_in_hdx(self):
-        # type: () -> None
+        # type: () -> bool
         """Check if showcase exists in HDX and if so, update it
 
         Returns:
-            None
+            bool: True if showcase was updated in HDX, False if it was unchanged
         """
-        self._update_in_hdx('showcase', 'name')
+        return self._update_in_hdx('showcase', 'name')
 
     def create_in_hdx(self):
         # type: () -> None
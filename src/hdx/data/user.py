@@ -96,18 +96,19 @@ class User(HDXObject):
         self._check_required_fields('user', ignore_fields)
 
     def update_in_hdx(self):
-        # type: () -> None
+        # type: () -> bool
         """Check if user exists in HDX and if so, update user
 
         Returns:
-            None
+            bool: True if user was updated in HDX, False if it was unchanged
         """
         capacity = self.data.get('capacity')
         if capacity is not None:
             del self.data['capacity']  # remove capacity (which comes from users from Organization)
-        self._update_in_hdx('user', 'id')
+        updated = self._update_in_hdx('user', 'id')
         if capacity is not None:
             self.data['capacity'] = capacity
+        return updated
 
     def create_in_hdx(self):
         # type: () -> None
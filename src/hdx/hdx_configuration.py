@@ -12,14 +12,23 @@ else:
 
 import logging
 from base64 import b64decode
+from functools import partial
 from os.path import expanduser, join
-from typing import Optional
+from typing import Optional, Any, Callable, List, Tuple
 
 import ckanapi
+import requests
+from ckanapi.common import prepare_action, reverse_apicontroller_action
 
 from hdx.utilities.dictandlist import merge_two_dictionaries
 from hdx.utilities.loader import load_yaml, load_json, load_file_to_str
+from hdx.utilities.multipart import MultipartEncoder, get_file_size
+from hdx.utilities.idcache import IdCache
+from hdx.utilities.journal import Journal
 from hdx.utilities.path import script_dir_plus_file
+from hdx.utilities.ratelimiter import RateLimiter
+from hdx.utilities.readcache import ReadCache
+from hdx.utilities.transport import ReplayingTransport
 
 logger = logging.getLogger(__name__)
 
@@ -54,6 +63,11 @@ class Configuration(UserDict, object):
 
         self._remoteckan = None
         self._emailer = None
+        self._ratelimiter = None
+        self._idcache = None
+        self._readcache = None
+        self._journal = None
+        self._transport = None
 
         hdx_config_found = False
         hdx_config_dict = kwargs.get('hdx_config_dict', None)
@@ -175,20 +189,82 @@ class Configuration(UserDict, object):
     def call_remoteckan(self, *args, **kwargs):
         # type: (...) -> dict
         """
-        Calls the remote CKAN
+        Calls the remote CKAN. Calls are subject to the rate limiter if one has been set up unless they are replayed
+        by a ReplayingTransport.
+
+        Files of at least upload: stream_min_bytes in the configuration (or any size if upload_callback is given) are
+        uploaded with a streaming multipart body so that they are not read into memory.
 
         Args:
             *args: Arguments to pass to remote CKAN call_action method
-            **kwargs: Keyword arguments to pass to remote CKAN call_action method
+            **kwargs: Keyword arguments to pass to remote CKAN call_action method and upload_callback (see below)
+            upload_callback (Callable[[int, int, float], None]): Function to call with bytes uploaded, total bytes and bytes per second
 
         Returns:
             dict: The response from the remote CKAN call_action method
 
         """
+        upload_callback = kwargs.pop('upload_callback', None)
         requests_kwargs = kwargs.get('requests_kwargs', dict())
         requests_kwargs['auth'] = self._get_credentials()
         kwargs['requests_kwargs'] = requests_kwargs
-        return self.remoteckan().call_action(*args, **kwargs)
+        if self._ratelimiter is not None and not isinstance(self._transport, ReplayingTransport):
+            self._ratelimiter.wait()  # replayed calls do not go to HDX so are not rate limited
+        if self._is_streaming_upload(kwargs.get('files'), upload_callback):
+            send = partial(self._call_remoteckan_streaming, upload_callback=upload_callback)
+        else:
+            send = self.remoteckan().call_action
+        if self._transport is not None:
+            return self._transport.call_action(send, *args, **kwargs)
+        return send(*args, **kwargs)
+
+    def _is_streaming_upload(self, files, upload_callback):
+        # type: (Optional[List[Tuple[str, Any]]], Optional[Callable[[int, int, float], None]]) -> bool
+        """Check if files should be uploaded with a streaming multipart body
+
+        Args:
+            files (Optional[List[Tuple[str, Any]]]): List of (form field name, file) to upload or None
+            upload_callback (Optional[Callable[[int, int, float], None]]): Function to call with upload progress
+
+        Returns:
+            bool: True if files should be streamed, False if not
+        """
+        if not files:
+            return False
+        if upload_callback is not None:
+            return True
+        stream_min_bytes = self.data.get('upload', dict()).get('stream_min_bytes', 10000000)
+        return sum(get_file_size(file) for _, file in files) >= stream_min_bytes
+
+    def _call_remoteckan_streaming(self, action, data_dict=None, files=None, requests_kwargs=None,
+                                   upload_callback=None):
+        # type: (str, Optional[dict], List[Tuple[str, Any]], Optional[dict], Optional[Callable[[int, int, float], None]]) -> dict
+        """
+        Calls the remote CKAN sending files with a streaming multipart body so that only a chunk of each file is in
+        memory at a time
+
+        Args:
+            action (str): CKAN action
+            data_dict (Optional[dict]): Data to pass to CKAN action. Defaults to None.
+            files (List[Tuple[str, Any]]): List of (form field name, file opened in binary mode) to upload
+            requests_kwargs (Optional[dict]): Keyword arguments to pass to requests. Defaults to None.
+            upload_callback (Optional[Callable[[int, int, float], None]]): Function to call with upload progress. Defaults to None.
+
+        Returns:
+            dict: The response from the remote CKAN action
+
+        """
+        remoteckan = self.remoteckan()
+        url, data, headers = prepare_action(action, data_dict, remoteckan.apikey, files)
+        body = MultipartEncoder(data, files, callback=upload_callback)
+        headers['Content-Type'] = body.content_type
+        headers['User-Agent'] = remoteckan.user_agent
+        url = '%s/%s' % (remoteckan.address.rstrip('/'), url)
+        if not remoteckan.session:
+            remoteckan.session = requests.Session()
+        response = remoteckan.session.post(url, data=body, headers=headers, files=None, allow_redirects=False,
+                                           **(requests_kwargs or dict()))
+        return reverse_apicontroller_action(url, response.status_code, response.text)
 
     def create_remoteckan(self):
         # type: () -> ckanapi.RemoteCKAN
@@ -257,6 +333,207 @@ class Configuration(UserDict, object):
         """
         self._emailer = Email(**kwargs)
 
+    def ratelimiter(self):
+        # type: () -> RateLimiter
+        """
+        Return the RateLimiter object (see :any:`RateLimiter`) shared by all calls to the remote CKAN
+
+        Returns:
+            RateLimiter: The rate limiter object
+
+        """
+        if self._ratelimiter is None:
+            raise ConfigurationError('There is no rate limiter set up! Use setup_ratelimiter(...)')
+        return self._ratelimiter
+
+    def has_ratelimiter(self):
+        # type: () -> bool
+        """
+        Return whether a rate limiter has been set up
+
+        Returns:
+            bool: True if a rate limiter has been set up, False if not
+
+        """
+        return self._ratelimiter is not None
+
+    def setup_ratelimiter(self, calls_per_second=None):
+        # type: (Optional[float]) -> None
+        """
+        Set up rate limiter shared by all calls to the remote CKAN including those made from different threads
+
+        Args:
+            calls_per_second (Optional[float]): Maximum calls per second. Defaults to None (no rate limit).
+
+        Returns:
+            None
+        """
+        if calls_per_second is None:
+            self._ratelimiter = None
+        else:
+            self._ratelimiter = RateLimiter(calls_per_second)
+
+    def idcache(self):
+        # type: () -> IdCache
+        """
+        Return the IdCache object (see :any:`IdCache`) used to look up the ids of HDX objects by name
+
+        Returns:
+            IdCache: The id cache object
+
+        """
+        if self._idcache is None:
+            raise ConfigurationError('There is no id cache set up! Use setup_idcache(...)')
+        return self._idcache
+
+    def has_idcache(self):
+        # type: () -> bool
+        """
+        Return whether an id cache has been set up
+
+        Returns:
+            bool: True if an id cache has been set up, False if not
+
+        """
+        return self._idcache is not None
+
+    def setup_idcache(self, path=None):
+        # type: (Optional[str]) -> None
+        """
+        Set up cache of the ids of HDX objects by name. This avoids looking up HDX objects by name in HDX when their
+        ids are known or they are known not to exist. If a path is given, the cache is saved to it when the
+        interpreter exits. Any id cache already set up is saved before it is replaced.
+
+        Args:
+            path (Optional[str]): Path to JSON file to load cache from and save it to. Defaults to None (not persisted).
+
+        Returns:
+            None
+        """
+        if self._idcache is not None:
+            self._idcache.save()
+        self._idcache = IdCache(path)
+
+    def readcache(self):
+        # type: () -> ReadCache
+        """
+        Return the ReadCache object (see :any:`ReadCache`) used to cache HDX objects read from HDX
+
+        Returns:
+            ReadCache: The read cache object
+
+        """
+        if self._readcache is None:
+            raise ConfigurationError('There is no read cache set up! Use setup_readcache(...)')
+        return self._readcache
+
+    def has_readcache(self):
+        # type: () -> bool
+        """
+        Return whether a read cache has been set up
+
+        Returns:
+            bool: True if a read cache has been set up, False if not
+
+        """
+        return self._readcache is not None
+
+    def setup_readcache(self, max_size=1000, ttl=300):
+        # type: (int, float) -> None
+        """
+        Set up cache of HDX objects read from HDX by id or name so that reading the same object again does not
+        call HDX. Objects written to HDX are removed from the cache.
+
+        Args:
+            max_size (int): Maximum number of HDX objects to cache. Defaults to 1000.
+            ttl (float): Number of seconds for which HDX objects are cached. Defaults to 300.
+
+        Returns:
+            None
+        """
+        self._readcache = ReadCache(max_size, ttl)
+
+    def journal(self):
+        # type: () -> Journal
+        """
+        Return the Journal object (see :any:`Journal`) to which writes to HDX are sent
+
+        Returns:
+            Journal: The journal object
+
+        """
+        if self._journal is None:
+            raise ConfigurationError('There is no journal set up! Use setup_journal(...)')
+        return self._journal
+
+    def has_journal(self):
+        # type: () -> bool
+        """
+        Return whether a journal has been set up
+
+        Returns:
+            bool: True if a journal has been set up, False if not
+
+        """
+        return self._journal is not None
+
+    def setup_journal(self, path=None):
+        # type: (Optional[str]) -> None
+        """
+        Set up journal so that writes to HDX are appended to a local file instead of being sent to HDX. They can be
+        sent to HDX later using Journal.replay. Reads are still made from HDX.
+
+        Args:
+            path (Optional[str]): Path to journal file. Defaults to None (writes are sent to HDX).
+
+        Returns:
+            None
+        """
+        if path is None:
+            self._journal = None
+        else:
+            self._journal = Journal(path)
+
+    def transport(self):
+        # type: () -> Any
+        """
+        Return the transport through which calls to the remote CKAN are made (eg. RecordingTransport or
+        ReplayingTransport)
+
+        Returns:
+            Any: The transport object
+
+        """
+        if self._transport is None:
+            raise ConfigurationError('There is no transport set up! Use setup_transport(...)')
+        return self._transport
+
+    def has_transport(self):
+        # type: () -> bool
+        """
+        Return whether a transport has been set up
+
+        Returns:
+            bool: True if a transport has been set up, False if not
+
+        """
+        return self._transport is not None
+
+    def setup_transport(self, transport=None):
+        # type: (Optional[Any]) -> None
+        """
+        Set up transport through which calls to the remote CKAN are made. A transport is an object with a method
+        call_action(send, action, data_dict=None, **kwargs) where send is the remote CKAN call_action method. See
+        RecordingTransport and ReplayingTransport in hdx.utilities.transport.
+
+        Args:
+            transport (Optional[Any]): Transport. Defaults to None (calls are sent directly to remote CKAN).
+
+        Returns:
+            None
+        """
+        self._transport = transport
+
     @staticmethod
     def load_api_key(path):
         # type: (str) -> str
@@ -1,3 +1,5 @@
+import gzip
+import os
 import sys
 
 import six
@@ -20,3 +22,32 @@ def raisefrom(exc_type, message, exc):
         six.raise_from(exc_type(message), exc)
     else:
         six.reraise(exc_type, '%s - %s' % (message, exc), sys.exc_info()[2])
+
+
+def save_atomically(path, text, compress=False):
+    # type: (str, str, bool) -> None
+    """Save text to file, replacing the file only once the new contents have been written so that a failure does not
+    leave a corrupt file
+
+    Args:
+        path (str): Path to file
+        text (str): Text to save
+        compress (bool): Whether to gzip compress file. Defaults to False.
+
+    Returns:
+        None
+
+    """
+    temp_path = '%s.tmp' % path
+    if compress:
+        with gzip.open(temp_path, 'wb') as f:
+            f.write(text.encode('utf-8'))
+    else:
+        with open(temp_path, 'wt') as f:
+            f.write(text)
+    try:
+        os.replace(temp_path, path)
+    except AttributeError:  # Python 2
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(temp_path, path)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Checkpoint store for values such as high-water marks that must persist between runs"""
+import json
+import os
+from os.path import exists
+from typing import Any, Optional
+
+from hdx.utilities import save_atomically
+from hdx.utilities.loader import load_json
+
+
+class Checkpoint(object):
+    """Small persistent store of named values (eg. the last metadata_modified seen) kept in a local JSON file so that
+    a later run can continue from where the previous one finished.
+
+    Args:
+        path (str): Path to JSON checkpoint file. It is created on first save if it does not exist.
+    """
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        if exists(path) and os.path.getsize(path) != 0:
+            self.values = load_json(path)
+        else:
+            self.values = dict()
+
+    def get(self, key, default=None):
+        # type: (str, Optional[Any]) -> Any
+        """Get value stored in checkpoint
+
+        Args:
+            key (str): Name of value
+            default (Optional[Any]): Value to return if name is not in checkpoint. Defaults to None.
+
+        Returns:
+            Any: Value stored in checkpoint or default
+        """
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        # type: (str, Any) -> None
+        """Store value in checkpoint and save checkpoint file. The file is replaced only once the new contents have
+        been written so that a failed run does not leave a corrupt checkpoint.
+
+        Args:
+            key (str): Name of value
+            value (Any): Value to store (must be serialisable to JSON)
+
+        Returns:
+            None
+        """
+        self.values[key] = value
+        save_atomically(self.path, json.dumps(self.values, indent=2, sort_keys=True))
@@ -1,7 +1,8 @@
 # -*- coding: utf-8 -*-
 """Dict and List utilities"""
+import copy
 import itertools
-from typing import List, Optional, TypeVar, Callable
+from typing import List, Optional, TypeVar, Callable, Any
 
 import six
 from six.moves import UserDict, zip_longest
@@ -9,8 +10,24 @@ from six.moves import UserDict, zip_longest
 DictUpperBound = TypeVar('T', bound='dict')
 
 
-def merge_two_dictionaries(a, b, merge_lists=False):
-    # type: (DictUpperBound, DictUpperBound, bool) -> DictUpperBound
+def copy_branch(value):
+    # type: (Any) -> Any
+    """Returns a deep copy of value if it is a list or dictionary and otherwise value itself (which is immutable for
+    the types handled by merge_two_dictionaries)
+
+    Args:
+        value (Any): Value to copy
+
+    Returns:
+        Any: Copy of value or value
+    """
+    if isinstance(value, (list, dict, UserDict)):
+        return copy.deepcopy(value)
+    return value
+
+
+def merge_two_dictionaries(a, b, merge_lists=False, copy_branches=False):
+    # type: (DictUpperBound, DictUpperBound, bool, bool) -> DictUpperBound
     """Merges b into a and returns merged result
 
     NOTE: tuples and arbitrary objects are not handled as it is totally ambiguous what should happen
@@ -19,6 +36,7 @@ def merge_two_dictionaries(a, b, merge_lists=False):
         a (DictUpperBound): dictionary to merge into
         b (DictUpperBound): dictionary to merge from
         merge_lists (bool): Whether to merge lists (True) or replace lists (False). Default is False.
+        copy_branches (bool): Whether to copy lists and dictionaries taken from b so that a shares no structure with b. Default is False.
 
     Returns:
         DictUpperBound: Merged dictionary
@@ -29,9 +47,11 @@ def merge_two_dictionaries(a, b, merge_lists=False):
     try:
         if a is None or isinstance(a, (six.string_types, six.text_type, six.integer_types, float)):
             # border case for first run or if a is a primitive
-            a = b
+            a = copy_branch(b) if copy_branches else b
         elif isinstance(a, list):
             # lists can be appended or replaced
+            if copy_branches:
+                b = copy_branch(b)
             if isinstance(b, list):
                 if merge_lists:
                     # merge lists
@@ -47,9 +67,10 @@ def merge_two_dictionaries(a, b, merge_lists=False):
             if isinstance(b, (dict, UserDict)):
                 for key in b:
                     if key in a:
-                        a[key] = merge_two_dictionaries(a[key], b[key], merge_lists=merge_lists)
+                        a[key] = merge_two_dictionaries(a[key], b[key], merge_lists=merge_lists,
+                                                        copy_branches=copy_branches)
                     else:
-                        a[key] = b[key]
+                        a[key] = copy_branch(b[key]) if copy_branches else b[key]
             else:
                 raise ValueError('Cannot merge non-dict "%s" into dict "%s"' % (b, a))
         else:
@@ -59,6 +80,145 @@ def merge_two_dictionaries(a, b, merge_lists=False):
     return a
 
 
+def merge_would_change(a, b, merge_lists=False):
+    # type: (DictUpperBound, DictUpperBound, bool) -> bool
+    """Checks whether merging b into a (see merge_two_dictionaries) would change a without copying or modifying a
+
+    Args:
+        a (DictUpperBound): dictionary to merge into
+        b (DictUpperBound): dictionary to merge from
+        merge_lists (bool): Whether to merge lists (True) or replace lists (False). Default is False.
+
+    Returns:
+        bool: True if merging would change a, False if not
+    """
+    if a is None or isinstance(a, (six.string_types, six.text_type, six.integer_types, float)):
+        return a != b
+    if isinstance(a, list):
+        if isinstance(b, list):
+            if merge_lists:
+                return len(b) != 0
+            return a != b
+        return True
+    if isinstance(a, (dict, UserDict)) and isinstance(b, (dict, UserDict)):
+        for key in b:
+            if key not in a or merge_would_change(a[key], b[key], merge_lists=merge_lists):
+                return True
+        return False
+    return True
+
+
+def merge_changed_keys(a, b, merge_lists=False):
+    # type: (DictUpperBound, DictUpperBound, bool) -> List[str]
+    """Returns the top level keys of b whose merge into a (see merge_two_dictionaries) would change a
+
+    Args:
+        a (DictUpperBound): dictionary to merge into
+        b (DictUpperBound): dictionary to merge from
+        merge_lists (bool): Whether to merge lists (True) or replace lists (False). Default is False.
+
+    Returns:
+        List[str]: Keys of b that would change a
+    """
+    return [key for key in b if key not in a or merge_would_change(a[key], b[key], merge_lists=merge_lists)]
+
+
+def _read_only(self, *args, **kwargs):
+    # type: (Any, Any, Any) -> None
+    """Raise TypeError for methods that would modify a frozen dictionary or list
+
+    Returns:
+        None
+    """
+    raise TypeError('%s object is read-only' % type(self).__name__)
+
+
+class FrozenDict(dict):
+    """Dictionary that cannot be modified. Copies made with copy.copy or copy.deepcopy are ordinary dictionaries (and
+    lists) that can be modified.
+    """
+    __slots__ = ()
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        # type: () -> dict
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        # type: (dict) -> dict
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        # type: () -> tuple
+        return type(self), (dict(self),)
+
+
+class FrozenList(list):
+    """List that cannot be modified. Copies made with copy.copy or copy.deepcopy are ordinary lists (and dictionaries)
+    that can be modified.
+    """
+    __slots__ = ()
+    __setitem__ = __delitem__ = __setslice__ = __delslice__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = reverse = sort = _read_only
+
+    def __copy__(self):
+        # type: () -> list
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        # type: (dict) -> list
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        # type: () -> tuple
+        return type(self), (list(self),)
+
+
+def intern_values(value, table=None, frozen=False):
+    # type: (Any, Optional[dict], bool) -> Any
+    """Returns a copy of value in which dictionary keys and strings equal to ones already in table are replaced by
+    those in table (and otherwise added to it) so that repeated strings are stored only once however many times they
+    appear. Dictionaries whose values are all strings, numbers, booleans or None are shared in the same way. The
+    result must therefore be treated as read-only unless frozen is True in which case dictionaries and lists are
+    FrozenDict and FrozenList objects that cannot be modified. Other values are returned unchanged.
+
+    Args:
+        value (Any): Value to intern eg. dictionary returned by HDX
+        table (Optional[dict]): Table of interned values to share between calls. Defaults to None (new table).
+        frozen (bool): Whether to make dictionaries and lists read-only. Defaults to False.
+
+    Returns:
+        Any: Copy of value with repeated strings and flat dictionaries shared
+    """
+    if table is None:
+        table = dict()
+    if isinstance(value, six.string_types):
+        return table.setdefault(value, value)
+    if isinstance(value, dict):
+        interned = dict()
+        flat = True
+        for key, subvalue in value.items():
+            if isinstance(key, six.string_types):
+                key = table.setdefault(key, key)
+            subvalue = intern_values(subvalue, table, frozen)
+            if isinstance(subvalue, (dict, list)):
+                flat = False
+            interned[key] = subvalue
+        if frozen:
+            interned = FrozenDict(interned)
+        if not flat:
+            return interned
+        # include the type of each value so that eg. 1 and True are not treated as equal
+        flatkey = (frozen, frozenset((key, type(subvalue), subvalue) for key, subvalue in interned.items()))
+        return table.setdefault(flatkey, interned)
+    if isinstance(value, list):
+        interned = [intern_values(x, table, frozen) for x in value]
+        if frozen:
+            return FrozenList(interned)
+        return interned
+    return value
+
+
 def merge_dictionaries(dicts, merge_lists=False):
     # type: (List[DictUpperBound], bool) -> DictUpperBound
     """Merges all dictionaries in dicts into a single dictionary and returns result
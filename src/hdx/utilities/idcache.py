@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Cache of HDX object names to ids"""
+import atexit
+import json
+import os
+import threading
+import weakref
+from os.path import exists
+from typing import Optional, Tuple
+
+from hdx.utilities import save_atomically
+from hdx.utilities.loader import load_json
+
+_persisted_caches = weakref.WeakSet()  # type: weakref.WeakSet
+
+
+@atexit.register
+def _save_persisted_caches():
+    # type: () -> None
+    """Save all id caches that have a JSON file when the interpreter exits
+
+    Returns:
+        None
+    """
+    for idcache in list(_persisted_caches):
+        idcache.save()
+
+
+class IdCache(object):
+    """Cache of the ids of HDX objects by object type and name. A name can also be recorded as not existing in HDX
+    (a negative entry) in which case its id is None. The cache can optionally be persisted to a JSON file so that it
+    can be reused between runs. It is then saved when the interpreter exits (and when it is replaced using
+    Configuration.setup_idcache) and can also be saved at any time with save. It is safe to use from multiple threads.
+
+    Args:
+        path (Optional[str]): Path to JSON file to load cache from and save it to. Defaults to None (not persisted).
+    """
+
+    def __init__(self, path=None):
+        # type: (Optional[str]) -> None
+        self.path = path
+        if path and exists(path) and os.path.getsize(path) != 0:
+            self.ids = load_json(path)
+        else:
+            self.ids = dict()
+        self.lock = threading.Lock()
+        if path:
+            _persisted_caches.add(self)
+
+    def get(self, object_type, name):
+        # type: (str, str) -> Tuple[bool, Optional[str]]
+        """Look up the id of an HDX object by name
+
+        Args:
+            object_type (str): Type of HDX object eg. dataset
+            name (str): Name of HDX object
+
+        Returns:
+            Tuple[bool, Optional[str]]: (True if name is in cache, id or None if name does not exist in HDX)
+        """
+        with self.lock:
+            ids = self.ids.get(object_type, dict())
+            if name not in ids:
+                return False, None
+            return True, ids[name]
+
+    def set(self, object_type, name, identifier):
+        # type: (str, str, Optional[str]) -> None
+        """Store the id of an HDX object by name
+
+        Args:
+            object_type (str): Type of HDX object eg. dataset
+            name (str): Name of HDX object
+            identifier (Optional[str]): Id of HDX object or None if it does not exist in HDX
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.ids.setdefault(object_type, dict())[name] = identifier
+
+    def remove(self, object_type, name):
+        # type: (str, str) -> None
+        """Remove an HDX object from the cache so that it will be looked up in HDX
+
+        Args:
+            object_type (str): Type of HDX object eg. dataset
+            name (str): Name of HDX object
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.ids.get(object_type, dict()).pop(name, None)
+
+    def clear(self):
+        # type: () -> None
+        """Remove all entries from the cache
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.ids = dict()
+
+    def save(self):
+        # type: () -> None
+        """Save cache to its JSON file if one was given. The file is replaced only once the new contents have been
+        written.
+
+        Returns:
+            None
+        """
+        if not self.path:
+            return
+        with self.lock:
+            contents = json.dumps(self.ids, indent=2, sort_keys=True)
+        save_atomically(self.path, contents)
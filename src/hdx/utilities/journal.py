@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""Journal of writes to HDX that can be replayed later
+
+The writes in a journal can be inspected and replayed from the command line eg.
+python -m hdx.utilities.journal journal.jsonl --hdx_site prod
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
+from os.path import abspath, exists
+from typing import Optional, List, Any, Dict, Tuple, Iterable, Set
+
+from hdx.utilities import save_atomically
+
+logger = logging.getLogger(__name__)
+
+
+class JournalError(Exception):
+    pass
+
+
+class Journal(object):
+    """Append-only journal of writes to HDX kept in a local JSON lines file. Each line holds the CKAN action, its
+    data and the path of any file to upload. It is safe to append to from multiple threads. Writes pending for each
+    HDX object are indexed when first needed and the index is rebuilt after the journal is appended to or cleared
+    through this object.
+
+    Args:
+        path (str): Path to journal file. It is created on first append if it does not exist.
+    """
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        self.lock = threading.Lock()
+        self.index = None  # type: Optional[Dict[str, List[Tuple[int, Dict]]]]
+
+    def append(self, action, data, id_field_name, file_to_upload=None):
+        # type: (str, dict, str, Optional[str]) -> None
+        """Append write to journal
+
+        Args:
+            action (str): CKAN action eg. package_update
+            data (dict): Data to send to CKAN action
+            id_field_name (str): Name of field containing HDX object identifier
+            file_to_upload (Optional[str]): File to upload to HDX
+
+        Returns:
+            None
+        """
+        entry = {'action': action, 'identifier': data.get(id_field_name), 'data': data,
+                 'file_to_upload': abspath(file_to_upload) if file_to_upload else None, 'time': time.time()}
+        line = json.dumps(entry, sort_keys=True)
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write('%s\n' % line)
+            self.index = None
+
+    def read(self):
+        # type: () -> List[Dict]
+        """Read writes from journal in the order they were made
+
+        Returns:
+            List[Dict]: List of writes
+        """
+        with self.lock:
+            return self._read()
+
+    def _read(self):
+        # type: () -> List[Dict]
+        """Read writes from journal in the order they were made without taking the lock
+
+        Returns:
+            List[Dict]: List of writes
+        """
+        if not exists(self.path):
+            return list()
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def clear(self, entries=None):
+        # type: (Optional[List[Dict]]) -> None
+        """Remove all writes from journal or replace them with the given ones
+
+        Args:
+            entries (Optional[List[Dict]]): Writes to keep in journal. Defaults to None (remove all).
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.index = None
+            if not entries:
+                if exists(self.path):
+                    os.remove(self.path)
+                return
+            save_atomically(self.path, ''.join('%s\n' % json.dumps(entry, sort_keys=True) for entry in entries))
+
+    def _get_index(self):
+        # type: () -> Dict[str, List[Tuple[int, Dict]]]
+        """Get writes in journal with their positions keyed by the identifier of the HDX object they write, reading
+        the journal only if the index has not been built since it was last appended to or cleared
+
+        Returns:
+            Dict[str, List[Tuple[int, Dict]]]: Dictionary of identifier to list of (position, write)
+        """
+        with self.lock:
+            if self.index is None:
+                index = dict()
+                for position, entry in enumerate(self._read()):
+                    if entry['identifier'] is not None:
+                        index.setdefault(entry['identifier'], list()).append((position, entry))
+                self.index = index
+            return self.index
+
+    @staticmethod
+    def _apply_indexed(index, data, actions):
+        # type: (Dict[str, List[Tuple[int, Dict]]], dict, Iterable[str]) -> None
+        """Apply indexed writes of an HDX object to its metadata in the order they were made
+
+        Args:
+            index (Dict[str, List[Tuple[int, Dict]]]): Dictionary of identifier to list of (position, write)
+            data (dict): HDX object metadata read from HDX
+            actions (Iterable[str]): CKAN actions that change the HDX object
+
+        Returns:
+            None
+        """
+        identifiers = set(data[key] for key in ('id', 'name') if data.get(key))
+        entries = dict()
+        for identifier in identifiers:
+            for position, entry in index.get(identifier, list()):
+                if entry['action'] in actions:
+                    entries[position] = entry
+        for position in sorted(entries):
+            data.update(copy.deepcopy(entries[position]['data']))
+
+    def apply_pending(self, data, actions, children_key=None, children_actions=None):
+        # type: (dict, Iterable[str], Optional[str], Optional[Iterable[str]]) -> dict
+        """Apply journaled writes of an HDX object to its metadata read from HDX in the order they were made. This
+        means an update made while a journal is set up is built on top of earlier journaled writes to the same
+        object rather than on stale metadata from HDX. Journaled writes of the HDX objects it contains (eg. the
+        resources of a dataset) can be applied in the same pass.
+
+        Args:
+            data (dict): HDX object metadata read from HDX
+            actions (Iterable[str]): CKAN actions that change the HDX object eg. package_update, package_patch
+            children_key (Optional[str]): Field containing metadata of contained HDX objects eg. resources. Defaults to None.
+            children_actions (Optional[Iterable[str]]): CKAN actions that change contained HDX objects. Defaults to None.
+
+        Returns:
+            dict: HDX object metadata with journaled writes applied
+        """
+        index = self._get_index()
+        if not index:
+            return data
+        self._apply_indexed(index, data, actions)
+        if children_key:
+            for child in data.get(children_key) or list():
+                if isinstance(child, dict):
+                    self._apply_indexed(index, child, children_actions)
+        return data
+
+    @staticmethod
+    def get_touched(entry):
+        # type: (Dict) -> Set[str]
+        """Get identifiers of HDX objects that a write changes. These are the HDX object and for resources, the
+        dataset that contains it.
+
+        Args:
+            entry (Dict): Write
+
+        Returns:
+            Set[str]: Identifiers of HDX objects
+        """
+        data = entry['data']
+        touched = set(data[key] for key in ('id', 'name', 'package_id') if data.get(key))
+        if entry['identifier'] is not None:
+            touched.add(entry['identifier'])
+        return touched
+
+    @staticmethod
+    def coalesce(entries):
+        # type: (List[Dict]) -> List[Dict]
+        """Remove updates of HDX objects that are superseded by a later update of the same object. An update is
+        only superseded if the later update sends every field that it sends, uploads a file if it does and no other
+        write to the object comes between them, so no change is lost.
+
+        Args:
+            entries (List[Dict]): Writes in the order they were made
+
+        Returns:
+            List[Dict]: Writes with superseded updates removed
+        """
+        coalesced = list()
+        last_updates = dict()  # identifier -> index of last update with no later write to the object
+        for entry in entries:
+            action = entry['action']
+            identifier = entry['identifier']
+            is_update = action.endswith('_update') and identifier is not None
+            if is_update and identifier in last_updates:
+                index = last_updates[identifier]
+                earlier = coalesced[index]
+                if earlier['action'] == action and set(earlier['data']) <= set(entry['data']) and \
+                        (entry['file_to_upload'] or not earlier['file_to_upload']):
+                    coalesced[index] = None
+            for touched in Journal.get_touched(entry):
+                last_updates.pop(touched, None)
+            if is_update:
+                last_updates[identifier] = len(coalesced)
+            coalesced.append(entry)
+        return [entry for entry in coalesced if entry is not None]
+
+    @staticmethod
+    def get_batches(entries):
+        # type: (List[Dict]) -> List[List[Dict]]
+        """Split writes into batches that can be sent concurrently. A batch is a run of consecutive writes with the
+        same action for different HDX objects so the order of writes to any one object is kept.
+
+        Args:
+            entries (List[Dict]): Writes in the order they were made
+
+        Returns:
+            List[List[Dict]]: Batches of writes
+        """
+        batches = list()
+        batch = list()
+        identifiers = set()
+        for entry in entries:
+            identifier = entry['identifier']
+            if batch and (entry['action'] != batch[0]['action'] or identifier is None or identifier in identifiers):
+                batches.append(batch)
+                batch = list()
+                identifiers = set()
+            batch.append(entry)
+            if identifier is not None:
+                identifiers.add(identifier)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def send(configuration, entry):
+        # type: (Any, Dict) -> Any
+        """Send write to HDX
+
+        Args:
+            configuration (Configuration): HDX configuration
+            entry (Dict): Write
+
+        Returns:
+            Any: Result from HDX
+        """
+        file_to_upload = entry['file_to_upload']
+        if file_to_upload:
+            with open(file_to_upload, 'rb') as file:
+                return configuration.call_remoteckan(entry['action'], entry['data'], files=[('upload', file)])
+        return configuration.call_remoteckan(entry['action'], entry['data'])
+
+    def replay(self, configuration, workers=4):
+        # type: (Any, int) -> List[Tuple[Dict, Exception]]
+        """Send coalesced writes in journal to HDX in the order they were made. Batches of writes that do not depend
+        on each other are sent concurrently. Once a write to an HDX object fails, later writes to that object are not
+        sent. Resources created by replayed resource_create writes are added to later package_update writes of their
+        dataset so that the update does not remove them. After each batch, the journal is rewritten with the writes
+        that are still to be sent or that failed, so if replay is interrupted, writes already sent are not sent again
+        when it is rerun. Writes that are not sent successfully are kept in the journal so that they can be replayed
+        again later.
+
+        Args:
+            configuration (Configuration): HDX configuration. It must not have a journal set up.
+            workers (int): Number of worker threads. Defaults to 4.
+
+        Returns:
+            List[Tuple[Dict, Exception]]: Failed writes and their exceptions
+        """
+        entries = self.coalesce(self.read())
+        logger.info('Replaying %d writes from journal %s' % (len(entries), self.path))
+        failed = set()
+        created_resources = dict()  # dataset id or name -> resources created during replay
+
+        def send_entry(entry):
+            if self.get_touched(entry) & failed:
+                return entry, JournalError('Not sent as an earlier write to %s failed' % entry['identifier'])
+            try:
+                result = self.send(configuration, entry)
+                if entry['action'] == 'resource_create' and isinstance(result, dict) and result.get('id'):
+                    created_resources.setdefault(result.get('package_id'), list()).append(result)
+                return None
+            except Exception as e:
+                logger.error('Failed to replay %s of %s: %s' % (entry['action'], entry['identifier'], e))
+                return entry, e
+
+        def add_created_resources(entry):
+            if entry['action'] != 'package_update' or 'resources' not in entry['data']:
+                return entry
+            resources = entry['data']['resources']
+            resource_ids = set(resource.get('id') for resource in resources)
+            new_resources = list()
+            for identifier in self.get_touched(entry):
+                for resource in created_resources.get(identifier, list()):
+                    if resource['id'] not in resource_ids:
+                        new_resources.append(resource)
+                        resource_ids.add(resource['id'])
+            if not new_resources:
+                return entry
+            entry = copy.deepcopy(entry)
+            entry['data']['resources'].extend(new_resources)
+            return entry
+
+        failures = list()
+        batches = self.get_batches(entries)
+        pool = ThreadPool(workers)
+        try:
+            for i, batch in enumerate(batches):
+                for failure in pool.map(send_entry, batch):
+                    if failure is not None:
+                        failures.append(failure)
+                        failed.update(self.get_touched(failure[0]))
+                remaining = list()
+                for later_batch in batches[i + 1:]:
+                    later_batch[:] = [add_created_resources(entry) for entry in later_batch]
+                    remaining.extend(later_batch)
+                self.clear([entry for entry, _ in failures] + remaining)
+        finally:
+            pool.close()
+            pool.join()
+        return failures
+
+
+def main():
+    # type: () -> None
+    """Show or replay writes in journal"""
+    from hdx.hdx_configuration import Configuration
+    parser = argparse.ArgumentParser(description='Show or replay writes to HDX in journal')
+    parser.add_argument('journal', help='Path to journal file')
+    parser.add_argument('-s', '--hdx_site', default=None, help='HDX site to use eg. prod, test')
+    parser.add_argument('-k', '--hdx_key', default=None, help='HDX key')
+    parser.add_argument('-w', '--workers', default=4, type=int, help='Number of worker threads')
+    parser.add_argument('--show', action='store_true', help='Show coalesced writes instead of replaying them')
+    args = parser.parse_args()
+    journal = Journal(args.journal)
+    if args.show:
+        for entry in journal.coalesce(journal.read()):
+            print('%s %s%s' % (entry['action'], entry['identifier'],
+                               ' (upload %s)' % entry['file_to_upload'] if entry['file_to_upload'] else ''))
+        return
+    kwargs = dict()
+    if args.hdx_site:
+        kwargs['hdx_site'] = args.hdx_site
+    if args.hdx_key:
+        kwargs['hdx_key'] = args.hdx_key
+    Configuration._create(**kwargs)
+    failures = journal.replay(Configuration.read(), workers=args.workers)
+    if failures:
+        raise SystemExit('%d writes failed and were kept in the journal' % len(failures))
+
+
+if __name__ == '__main__':
+    main()
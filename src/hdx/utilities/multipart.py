@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""Streaming multipart form data encoder for uploading files without reading them into memory"""
+import os
+import time
+import uuid
+from typing import Optional, List, Tuple, Dict, Callable, Any, Iterator, Union
+
+import six
+
+
+def get_file_size(file):
+    # type: (Any) -> int
+    """Get number of bytes from current position to end of file leaving position unchanged
+
+    Args:
+        file (Any): File opened in binary mode
+
+    Returns:
+        int: Number of bytes
+    """
+    position = file.tell()
+    file.seek(0, os.SEEK_END)
+    size = file.tell() - position
+    file.seek(position)
+    return size
+
+
+class MultipartEncoder(object):
+    """Multipart form data request body that reads the files being uploaded a chunk at a time as the body is sent so
+    that the memory used does not depend on the size of the files. It can be passed as the data of a requests POST
+    along with the content_type as the Content-Type header. The length of the body is known up front so that
+    Content-Length can be set.
+
+    If a callback is given, it is called every time a chunk of the body is read with the number of bytes read so far,
+    the total number of bytes in the body and the average throughput in bytes per second.
+
+    Args:
+        fields (Dict[Union[str, bytes], Union[str, bytes]]): Form fields
+        files (List[Tuple[str, Any]]): List of (form field name, file opened in binary mode)
+        callback (Optional[Callable[[int, int, float], None]]): Function to call with progress. Defaults to None.
+        chunk_size (int): Number of bytes to read at a time when iterating. Defaults to 65536.
+        boundary (Optional[str]): Multipart boundary. Defaults to None (random boundary).
+    """
+
+    def __init__(self, fields, files, callback=None, chunk_size=65536, boundary=None):
+        # type: (Dict[Union[str, bytes], Union[str, bytes]], List[Tuple[str, Any]], Optional[Callable[[int, int, float], None]], int, Optional[str]) -> None
+        if boundary is None:
+            boundary = uuid.uuid4().hex
+        self.boundary = boundary
+        self.content_type = 'multipart/form-data; boundary=%s' % boundary
+        self.callback = callback
+        self.chunk_size = chunk_size
+        self.parts = list()  # each part is either bytes or a file with the number of bytes to read from it
+        self.length = 0
+        for name, value in sorted(fields.items(), key=lambda x: self._encode(x[0])):
+            self._add_bytes(self._get_header(name))
+            self._add_bytes(self._encode(value))
+            self._add_bytes(b'\r\n')
+        for name, file in files:
+            filename = os.path.basename(getattr(file, 'name', name))
+            self._add_bytes(self._get_header(name, filename))
+            self._add_file(file)
+            self._add_bytes(b'\r\n')
+        self._add_bytes(('--%s--\r\n' % boundary).encode('utf-8'))
+        self.index = 0
+        self.offset = 0
+        self.bytes_read = 0
+        self.start_time = None
+
+    @staticmethod
+    def _encode(value):
+        # type: (Union[str, bytes]) -> bytes
+        """Encode value as UTF-8 if it is not already bytes
+
+        Args:
+            value (Union[str, bytes]): Value to encode
+
+        Returns:
+            bytes: Encoded value
+        """
+        if isinstance(value, six.binary_type):
+            return value
+        return six.text_type(value).encode('utf-8')
+
+    def _get_header(self, name, filename=None):
+        # type: (Union[str, bytes], Optional[str]) -> bytes
+        """Get boundary and headers for a part
+
+        Args:
+            name (Union[str, bytes]): Form field name
+            filename (Optional[str]): File name if part is a file. Defaults to None.
+
+        Returns:
+            bytes: Boundary and headers
+        """
+        if isinstance(name, six.binary_type):
+            name = name.decode('utf-8')
+        header = '--%s\r\nContent-Disposition: form-data; name="%s"' % (self.boundary, name)
+        if filename is not None:
+            header = '%s; filename="%s"\r\nContent-Type: application/octet-stream' % (header, filename)
+        return ('%s\r\n\r\n' % header).encode('utf-8')
+
+    def _add_bytes(self, value):
+        # type: (bytes) -> None
+        """Add bytes to body
+
+        Args:
+            value (bytes): Bytes to add
+
+        Returns:
+            None
+        """
+        self.parts.append(value)
+        self.length += len(value)
+
+    def _add_file(self, file):
+        # type: (Any) -> None
+        """Add contents of file from its current position to its end to body
+
+        Args:
+            file (Any): File opened in binary mode
+
+        Returns:
+            None
+        """
+        size = get_file_size(file)
+        self.parts.append((file, size))
+        self.length += size
+
+    def __len__(self):
+        # type: () -> int
+        return self.length
+
+    def __iter__(self):
+        # type: () -> Iterator[bytes]
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, size=-1):
+        # type: (int) -> bytes
+        """Read next chunk of body
+
+        Args:
+            size (int): Maximum number of bytes to read. Defaults to -1 (read rest of body into memory).
+
+        Returns:
+            bytes: Next chunk of body (empty once the whole body has been read)
+        """
+        if self.start_time is None:
+            self.start_time = time.time()
+        if size is None or size < 0:
+            size = self.length - self.bytes_read
+        chunks = list()
+        remaining = size
+        while remaining > 0 and self.index < len(self.parts):
+            part = self.parts[self.index]
+            if isinstance(part, six.binary_type):
+                chunk = part[self.offset:self.offset + remaining]
+                part_size = len(part)
+            else:
+                file, part_size = part
+                chunk = b''
+                if self.offset < part_size:  # empty files have nothing to read
+                    chunk = file.read(min(remaining, part_size - self.offset))
+                    if not chunk:
+                        raise IOError('File %s is shorter than when upload started!' % getattr(file, 'name', ''))
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            self.offset += len(chunk)
+            if self.offset >= part_size:
+                self.index += 1
+                self.offset = 0
+        data = b''.join(chunks)
+        self.bytes_read += len(data)
+        if self.callback is not None and data:
+            elapsed = time.time() - self.start_time
+            throughput = self.bytes_read / elapsed if elapsed > 0 else 0.0
+            self.callback(self.bytes_read, self.length, throughput)
+        return data
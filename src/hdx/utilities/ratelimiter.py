@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Rate limiter shared between threads"""
+import threading
+import time
+
+
+class RateLimiter(object):
+    """Spaces out calls so that no more than calls_per_second are made in total by all threads using the rate limiter.
+    Each call to wait reserves the next free slot and sleeps until it is reached.
+
+    Args:
+        calls_per_second (float): Maximum number of calls per second
+    """
+
+    def __init__(self, calls_per_second):
+        # type: (float) -> None
+        if calls_per_second <= 0:
+            raise ValueError('Calls per second must be greater than 0!')
+        self.interval = 1.0 / calls_per_second
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        # type: () -> float
+        """Reserve the next free slot without waiting for it. Callers that cannot block (eg. coroutines) can wait
+        the returned number of seconds themselves.
+
+        Returns:
+            float: Number of seconds until the call can be made
+        """
+        with self.lock:
+            now = time.time()
+            call_time = max(now, self.next_time)
+            self.next_time = call_time + self.interval
+        return call_time - now
+
+    def wait(self):
+        # type: () -> float
+        """Wait until a call can be made without exceeding the rate limit
+
+        Returns:
+            float: Number of seconds waited
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""Least recently used cache with time to live for results read from HDX"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Iterable, Tuple, Hashable, Dict, Set
+
+
+class ReadCache(object):
+    """Cache of results read from HDX keyed by action and identifier. Once it holds max_size entries, the least
+    recently used entry is dropped when a new one is added. Entries older than ttl seconds are not returned. Entries
+    can be invalidated by identifier when an HDX object is written. An index from identifiers to the keys of the
+    entries containing them is kept so that invalidating does not scan the cache. It is safe to use from multiple
+    threads.
+
+    Args:
+        max_size (int): Maximum number of entries. Defaults to 1000.
+        ttl (float): Number of seconds for which entries are valid. Defaults to 300.
+    """
+
+    def __init__(self, max_size=1000, ttl=300):
+        # type: (int, float) -> None
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.index = dict()  # type: Dict[str, Set[Tuple[str, str, Hashable]]]
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, action, identifier, params=''):
+        # type: (str, str, Hashable) -> Tuple[bool, Any]
+        """Get result from cache
+
+        Args:
+            action (str): Action used to read result eg. package_show
+            identifier (str): Identifier passed to action
+            params (Hashable): Any other parameters passed to action. Defaults to ''.
+
+        Returns:
+            Tuple[bool, Any]: (True if result is in cache, result or None)
+        """
+        key = (action, identifier, params)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expiry, result, _ = entry
+                if expiry > time.time():
+                    del self.entries[key]
+                    self.entries[key] = entry
+                    self.hits += 1
+                    return True, result
+                self._remove(key)
+            self.misses += 1
+            return False, None
+
+    def set(self, action, identifier, result, params=''):
+        # type: (str, str, Any, Hashable) -> None
+        """Store result in cache
+
+        Args:
+            action (str): Action used to read result eg. package_show
+            identifier (str): Identifier passed to action
+            result (Any): Result to store
+            params (Hashable): Any other parameters passed to action. Defaults to ''.
+
+        Returns:
+            None
+        """
+        key = (action, identifier, params)
+        identifiers = self._get_result_identifiers(result)
+        identifiers.add(identifier)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.time() + self.ttl, result, identifiers)
+            for entry_identifier in identifiers:
+                self.index.setdefault(entry_identifier, set()).add(key)
+            while len(self.entries) > self.max_size:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        # type: (Tuple[str, str, Hashable]) -> None
+        """Remove entry from cache and its key from the index. Must be called holding the lock.
+
+        Args:
+            key (Tuple[str, str, Hashable]): Key of entry
+
+        Returns:
+            None
+        """
+        _, _, identifiers = self.entries.pop(key)
+        for identifier in identifiers:
+            keys = self.index.get(identifier)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.index[identifier]
+
+    @staticmethod
+    def _get_result_identifiers(result):
+        # type: (Any) -> Set[str]
+        """Get ids and names of the HDX object in a result and of any resources in it
+
+        Args:
+            result (Any): Result stored in cache
+
+        Returns:
+            Set[str]: Identifiers in result
+        """
+        if not isinstance(result, dict):
+            return set()
+        identifiers = set(result[key] for key in ('id', 'name') if result.get(key))
+        for resource in result.get('resources') or list():
+            if isinstance(resource, dict) and resource.get('id'):
+                identifiers.add(resource['id'])
+        return identifiers
+
+    def invalidate(self, identifiers):
+        # type: (Iterable[str]) -> None
+        """Remove all entries whatever the action that were read using any of the given identifiers or whose result
+        has one of them as its id or name or as the id of one of its resources. For example, invalidating a dataset id
+        also removes the dataset read by name.
+
+        Args:
+            identifiers (Iterable[str]): Identifiers (eg. ids and names) of HDX objects
+
+        Returns:
+            None
+        """
+        with self.lock:
+            keys = set()
+            for identifier in identifiers:
+                keys.update(self.index.get(identifier, ()))
+            for key in keys:
+                self._remove(key)
+
+    def clear(self):
+        # type: () -> None
+        """Remove all entries from the cache
+
+        Returns:
+            None
+        """
+        with self.lock:
+            self.entries.clear()
+            self.index.clear()
+
+    def stats(self):
+        # type: () -> Dict[str, int]
+        """Get cache statistics
+
+        Returns:
+            Dict[str, int]: Dictionary with number of hits, misses and evictions and current size
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self.entries)}
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""Transports for calls to HDX that record them to or replay them from compressed cassette files"""
+import copy
+import gzip
+import json
+import threading
+import time
+from typing import Optional, Any, Callable, Union, Dict
+
+import ckanapi.errors
+
+from hdx.utilities import save_atomically
+
+
+class CassetteError(Exception):
+    pass
+
+
+def get_request_key(action, data_dict):
+    # type: (str, Optional[Dict]) -> str
+    """Get key used to match a call to HDX with recorded calls
+
+    Args:
+        action (str): CKAN action
+        data_dict (Optional[Dict]): Data passed to CKAN action
+
+    Returns:
+        str: Key for call
+    """
+    return json.dumps([action, data_dict], sort_keys=True)
+
+
+class RecordingTransport(object):
+    """Transport that sends calls to HDX and records them with their results (or errors) and timings so that they can
+    be saved to a gzip compressed JSON cassette file with save. It can be used as a context manager that saves on
+    exit.
+
+    Args:
+        path (str): Path to cassette file
+    """
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        self.interactions = list()
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        # type: () -> RecordingTransport
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # type: (Any, Any, Any) -> None
+        self.save()
+
+    def call_action(self, send, action, data_dict=None, **kwargs):
+        # type: (Callable[..., Any], str, Optional[Dict], ...) -> Any
+        """Send call to HDX and record it
+
+        Args:
+            send (Callable[..., Any]): Function that sends call to HDX (eg. RemoteCKAN.call_action)
+            action (str): CKAN action
+            data_dict (Optional[Dict]): Data passed to CKAN action. Defaults to None.
+            **kwargs: Other arguments for send eg. files
+
+        Returns:
+            Any: Result of call
+        """
+        interaction = {'action': action, 'data': copy.deepcopy(data_dict)}
+        start = time.time()
+        try:
+            result = send(action, data_dict, **kwargs)
+            interaction['result'] = copy.deepcopy(result)
+            return result
+        except Exception as e:
+            if isinstance(e, ckanapi.errors.CKANAPIError):
+                args = list(e.args)
+            else:  # arguments of other errors may not be serialisable and are replayed as CKANAPIError anyway
+                args = [str(e)]
+            interaction['error'] = {'type': type(e).__name__, 'args': args}
+            raise
+        finally:
+            interaction['seconds'] = time.time() - start
+            with self.lock:
+                self.interactions.append(interaction)
+
+    def save(self):
+        # type: () -> None
+        """Save recorded calls to cassette file. Any values that cannot be serialised to JSON are saved as their repr.
+
+        Returns:
+            None
+        """
+        with self.lock:
+            contents = json.dumps({'interactions': self.interactions}, sort_keys=True, default=repr)
+        save_atomically(self.path, contents, compress=True)
+
+
+class ReplayingTransport(object):
+    """Transport that replays calls to HDX from a cassette file made by RecordingTransport without any network
+    access. Calls are matched on action and data. If the same call was recorded more than once, its results are
+    returned in the order they were recorded after which the last one is repeated. Latency can be simulated by
+    sleeping for a fixed number of seconds, a number of seconds returned by a function (eg. drawn from a
+    distribution) or the time the call took when it was recorded.
+
+    Args:
+        path (str): Path to cassette file
+        latency (Union[float, Callable[[], float], str, None]): Seconds, function returning seconds or 'recorded'. Defaults to None (no latency).
+    """
+
+    def __init__(self, path, latency=None):
+        # type: (str, Union[float, Callable[[], float], str, None]) -> None
+        self.path = path
+        self.latency = latency
+        with gzip.open(path, 'rb') as f:
+            interactions = json.loads(f.read().decode('utf-8'))['interactions']
+        self.interactions = dict()
+        for interaction in interactions:
+            key = get_request_key(interaction['action'], interaction['data'])
+            self.interactions.setdefault(key, list()).append(interaction)
+        self.counts = dict()
+        self.lock = threading.Lock()
+
+    def _get_latency(self, interaction):
+        # type: (Dict) -> float
+        """Get number of seconds to sleep before returning result of call
+
+        Args:
+            interaction (Dict): Recorded call
+
+        Returns:
+            float: Number of seconds
+        """
+        if self.latency is None:
+            return 0
+        if self.latency == 'recorded':
+            return interaction.get('seconds', 0)
+        if callable(self.latency):
+            return self.latency()
+        return self.latency
+
+    def call_action(self, send, action, data_dict=None, **kwargs):
+        # type: (Callable[..., Any], str, Optional[Dict], ...) -> Any
+        """Replay recorded call to HDX
+
+        Args:
+            send (Callable[..., Any]): Function that sends call to HDX (not used)
+            action (str): CKAN action
+            data_dict (Optional[Dict]): Data passed to CKAN action. Defaults to None.
+            **kwargs: Other arguments for send (not used)
+
+        Returns:
+            Any: Recorded result of call
+        """
+        key = get_request_key(action, data_dict)
+        with self.lock:
+            interactions = self.interactions.get(key)
+            if not interactions:
+                raise CassetteError('No recorded call for %s with %s in %s!' % (action, data_dict, self.path))
+            count = self.counts.get(key, 0)
+            self.counts[key] = count + 1
+        interaction = interactions[min(count, len(interactions) - 1)]
+        latency = self._get_latency(interaction)
+        if latency > 0:
+            time.sleep(latency)
+        error = interaction.get('error')
+        if error is not None:
+            errorclass = getattr(ckanapi.errors, error['type'], ckanapi.errors.CKANAPIError)
+            raise errorclass(*error['args'])
+        return copy.deepcopy(interaction['result'])
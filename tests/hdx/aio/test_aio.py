@@ -0,0 +1,365 @@
+# -*- coding: UTF-8 -*-
+"""Asyncio Interface Tests"""
+import asyncio
+import copy
+import json
+import re
+import threading
+from os import unlink
+from os.path import join
+
+import pytest
+import requests
+
+import hdx.data.dataset
+
+from hdx.aio import executor
+from hdx.aio.dataset import AsyncDataset
+from hdx.aio.organization import AsyncOrganization
+from hdx.aio.remoteckan import call_remoteckan, setup_session, close_session
+from hdx.aio.resource import AsyncResource
+from hdx.data.dataset import Dataset
+from hdx.data.organization import Organization
+from hdx.data.resource import Resource
+from hdx.hdx_configuration import Configuration
+from hdx.utilities.downloader import DownloadError
+from data import MockResponse
+from data.test_dataset import TestDataset as DatasetTests, alldict, mockshow as dataset_mockshow, \
+    mocksearch as dataset_mocksearch, mockpaged as dataset_mockpaged
+from data.test_resource import mockshow as resource_mockshow, mocksearch as resource_mocksearch
+
+
+def mockwrite(url, datadict, uploaded):
+    result = copy.deepcopy(datadict)
+    if 'package' in url:
+        result['id'] = '6f36a41c-f126-4b18-aaaf-6c2ddfbc5d4d'
+        for resource in result.get('resources', list()):
+            resource['id'] = resource.get('id', 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5')
+            resource['package_id'] = result['id']
+    elif uploaded:
+        result['url_type'] = 'upload'
+        result['url'] = 'http://test-data.humdata.org/dataset/%s/resource/%s/download/%s' % \
+                        (result.get('package_id'), result.get('id'), uploaded)
+    return MockResponse(200,
+                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_update"}' % json.dumps(result))
+
+
+def mockpost(url, datadict, uploaded=None):
+    if 'create' in url or 'update' in url or 'patch' in url or 'delete' in url:
+        return mockwrite(url, datadict, uploaded)
+    if 'package' in url:
+        if 'search' in url:
+            return dataset_mocksearch(url, datadict)
+        if datadict.get('id') == '6f36a41c-f126-4b18-aaaf-6c2ddfbc5d4d':
+            datadict['id'] = 'TEST1'
+        return dataset_mockshow(url, datadict)
+    if 'resource_search' in url:
+        return resource_mocksearch(url, datadict)
+    if datadict.get('id') == 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5':
+        datadict['id'] = 'TEST1'
+    return resource_mockshow(url, datadict)
+
+
+def parse_multipart(body):
+    fields = dict(re.findall(r'name="(\w+)"\r\n\r\n(.*?)\r\n', body.decode('utf-8')))
+    uploaded = re.search(r'filename="(.*?)"', body.decode('utf-8')).group(1)
+    return fields, uploaded
+
+
+class MockAsyncResponse(object):
+    def __init__(self, session, url, data):
+        self.session = session
+        self.url = url
+        self.data = data
+        self.status = None
+        self.content = None
+
+    async def __aenter__(self):
+        self.session.in_flight += 1
+        self.session.max_in_flight = max(self.session.max_in_flight, self.session.in_flight)
+        await asyncio.sleep(0.01)
+        self.session.in_flight -= 1
+        if isinstance(self.data, bytes):
+            response = self.session.mock(self.url, json.loads(self.data.decode('utf-8')))
+        else:
+            body = b''.join([chunk async for chunk in self.data])
+            self.session.uploads.append(body)
+            response = self.session.mock(self.url, *parse_multipart(body))
+        self.status = response.status_code
+        self.content = response.text
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def text(self):
+        return self.content
+
+
+class MockContent(object):
+    def __init__(self, content):
+        self.content = content
+
+    async def iter_chunked(self, size):
+        for i in range(0, len(self.content), size):
+            yield self.content[i:i + size]
+
+
+class MockAsyncDownload(object):
+    def __init__(self, url):
+        self.url = url
+        self.content = MockContent(b'a,b\n' * 10000)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    def raise_for_status(self):
+        if 'lalala' in self.url:
+            raise ValueError('Not found!')
+
+
+class MockAsyncSession(object):
+    def __init__(self, mock=mockpost):
+        self.mock = mock
+        self.closed = False
+        self.urls = list()
+        self.uploads = list()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def post(self, url, data, headers):
+        self.urls.append(url)
+        return MockAsyncResponse(self, url, data)
+
+    def get(self, url):
+        self.urls.append(url)
+        return MockAsyncDownload(url)
+
+    async def close(self):
+        self.closed = True
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class TestAio:
+    @pytest.fixture(scope='function')
+    def post(self, monkeypatch):
+        threads = set()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                threads.add(threading.current_thread().name)
+                return mockpost(url, json.loads(data.decode('utf-8')))
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        return threads
+
+    def test_dataset(self, configuration, post):
+        session = MockAsyncSession()
+
+        async def read_many():
+            setup_session(session)
+            dataset = await AsyncDataset.read_from_hdx('TEST1')
+            assert isinstance(dataset, Dataset)
+            assert dataset['name'] == 'MyDataset1'
+            assert len(dataset.get_resources()) == 2
+            assert await AsyncDataset.read_from_hdx('TEST2') is None
+            datasets = await asyncio.gather(*[AsyncDataset.read_from_hdx('TEST1') for _ in range(200)])
+            await close_session()
+            return datasets
+
+        datasets = run(read_many())
+        assert all(x['name'] == 'MyDataset1' for x in datasets)
+        assert session.max_in_flight == 200
+        assert session.closed is True
+        assert post == set()
+
+        async def search_many():
+            setup_session(session)
+            results = await asyncio.gather(*[AsyncDataset.search_in_hdx('ACLED') for _ in range(20)])
+            await close_session()
+            return results
+
+        session = MockAsyncSession()
+        results = run(search_many())
+        assert len(results) == 20
+        assert all(len(x) == 10 for x in results)
+        assert set(x.rsplit('/', 1)[1] for x in session.urls) == {'package_search'}
+        assert post == set()
+
+        async def organization_datasets():
+            setup_session(session)
+            organization = Organization({'name': 'acled'})
+            return await AsyncOrganization.get_datasets(organization, query='ACLED')
+
+        session = MockAsyncSession()
+        assert len(run(organization_datasets())) == 10
+        assert set(x.rsplit('/', 1)[1] for x in session.urls) == {'package_search'}
+        assert post == set()
+
+    def test_get_all_datasets(self, configuration, post):
+        offsets = list()
+
+        def mockall(url, datadict):
+            offset = datadict['offset']
+            offsets.append(offset)
+            if offset == 3 and offsets.count(3) == 1:  # dataset added during crawl shifts page
+                datadict['offset'] = 2
+            return dataset_mockpaged(url, datadict)
+
+        session = MockAsyncSession(mockall)
+
+        async def get_all():
+            setup_session(session)
+            return await AsyncDataset.get_all_datasets()
+
+        hdx.data.dataset.page_size = 3
+        try:
+            datasets = run(get_all())
+        finally:
+            hdx.data.dataset.page_size = 1000
+        assert [x['name'] for x in datasets] == [x['name'] for x in alldict]
+        assert offsets == [0, 3, 6, 9, 0, 3, 6]
+        assert post == set()
+
+    def test_readcache(self, configuration, post):
+        Configuration.read().setup_readcache()
+        session = MockAsyncSession()
+
+        async def read_twice():
+            setup_session(session)
+            dataset = await AsyncDataset.read_from_hdx('TEST1')
+            dataset['title'] = 'Changed'
+            return await AsyncDataset.read_from_hdx('TEST1')
+
+        dataset = run(read_twice())
+        assert dataset['title'] == 'MyDataset'
+        assert [x.rsplit('/', 1)[1] for x in session.urls] == ['package_show']
+        assert post == set()
+
+    def test_create_update_dataset(self, configuration, post, fixturesfolder):
+        session = MockAsyncSession()
+        progress = list()
+
+        async def create():
+            setup_session(session)
+            dataset = Dataset(copy.deepcopy(DatasetTests.dataset_data))
+            resource = Resource(copy.deepcopy(DatasetTests.resources_data[0]))
+            del resource['id']
+            resource.set_file_to_upload(join(fixturesfolder, 'test_data.csv'))
+            resource.set_upload_callback(lambda read, total, throughput: progress.append((read, total)))
+            dataset.add_update_resource(resource)
+            outcome = await AsyncDataset.create_in_hdx(dataset)
+            return dataset, outcome
+
+        dataset, outcome = run(create())
+        assert outcome == 'created'
+        assert dataset['id'] == '6f36a41c-f126-4b18-aaaf-6c2ddfbc5d4d'
+        resource = dataset.get_resources()[0]
+        assert resource['url'].endswith('/download/test_data.csv')
+        assert [x.rsplit('/', 1)[1] for x in session.urls] == ['package_show', 'package_create', 'resource_show',
+                                                               'resource_update']
+        assert len(session.uploads) == 1
+        assert b'filename="test_data.csv"' in session.uploads[0]
+        assert progress[-1][0] == progress[-1][1] == len(session.uploads[0])
+        assert post == set()
+
+        async def update(patch):
+            setup_session(session)
+            dataset = await AsyncDataset.read_from_hdx('TEST1')
+            dataset['title'] = 'Async title'
+            return dataset, await AsyncDataset.update_in_hdx(dataset, patch=patch)
+
+        session = MockAsyncSession()
+        dataset, updated = run(update(False))
+        assert updated is True
+        assert dataset['title'] == 'Async title'
+        assert [x.rsplit('/', 1)[1] for x in session.urls] == ['package_show', 'package_show', 'package_update']
+        session = MockAsyncSession()
+        dataset, updated = run(update(True))
+        assert updated is True
+        assert dataset['title'] == 'Async title'
+        assert [x.rsplit('/', 1)[1] for x in session.urls] == ['package_show', 'package_show', 'package_patch']
+        assert post == set()
+
+    def test_resource(self, configuration, post, fixturesfolder):
+        session = MockAsyncSession()
+
+        async def update():
+            setup_session(session)
+            resource = await AsyncResource.read_from_hdx('TEST1')
+            assert isinstance(resource, Resource)
+            resource['description'] = 'Async description'
+            assert await AsyncResource.update_in_hdx(resource) is True
+            assert resource['description'] == 'Async description'
+            assert resource['id'] == 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5'
+            resource = Resource({'id': 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5'})
+            assert await AsyncResource.update_in_hdx(resource) is False
+            await AsyncResource.delete_from_hdx(resource)
+            return resource
+
+        resource = run(update())
+        assert [x.rsplit('/', 1)[1] for x in session.urls] == ['resource_show', 'resource_show', 'resource_update',
+                                                               'resource_show', 'resource_delete']
+        assert post == set()
+
+        async def create():
+            setup_session(session)
+            resource.set_file_to_upload(join(fixturesfolder, 'test_data.csv'))
+            await AsyncResource.create_in_hdx(resource)
+            return await AsyncResource.search_in_hdx('name:ACLED')
+
+        session = MockAsyncSession()
+        resources = run(create())
+        assert resource['id'] == 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5'
+        assert resource['url'].endswith('/download/test_data.csv')
+        assert resource['hash']
+        assert [x.rsplit('/', 1)[1] for x in session.urls] == ['resource_show', 'resource_update',
+                                                               'resource_search']
+        assert len(resources) == 4
+        assert post == set()
+
+        async def download(url):
+            setup_session(session)
+            resource['url'] = url
+            return await AsyncResource.download(resource, fixturesfolder)
+
+        url, path = run(download('http://test-data.humdata.org/test_download.csv'))
+        try:
+            assert url == 'http://test-data.humdata.org/test_download.csv'
+            assert path == join(fixturesfolder, 'test_download.csv')
+            with open(path, 'rb') as f:
+                assert f.read() == b'a,b\n' * 10000
+        finally:
+            unlink(path)
+        with pytest.raises(DownloadError):
+            run(download('http://lalala/test_download.csv'))
+        assert post == set()
+
+    def test_call_remoteckan(self, configuration, post):
+        session = MockAsyncSession()
+
+        async def call():
+            setup_session(session)
+            return await call_remoteckan('package_show', {'id': 'TEST1'})
+
+        assert run(call())['name'] == 'MyDataset1'
+        assert session.urls == ['https://test-data.humdata.org/api/action/package_show']
+
+    def test_executor(self, configuration, post):
+        executor.setup_executor(workers=2)
+        try:
+            assert executor.get_executor()._max_workers == 2
+            assert run(executor.run_in_executor(lambda x: x * 2, 3)) == 6
+        finally:
+            executor.setup_executor()
@@ -1,6 +1,7 @@
 # -*- coding: UTF-8 -*-
 """Global fixtures"""
 import smtplib
+import sys
 from os.path import join
 
 import pytest
@@ -8,6 +9,9 @@ import pytest
 from hdx.hdx_configuration import Configuration
 from hdx.hdx_locations import Locations
 
+if sys.version_info < (3, 7):
+    collect_ignore = ['aio']  # asyncio interface needs Python 3.7+
+
 
 @pytest.fixture(scope='session')
 def fixturesfolder():
@@ -0,0 +1,93 @@
+# -*- coding: UTF-8 -*-
+"""Catalog Tests"""
+import datetime
+import json
+from os.path import join
+
+import pytest
+import requests
+
+from hdx.data.catalog import Catalog
+from hdx.data.dataset import Dataset
+from .test_dataset import mockpaged, mockmodified
+
+
+class TestCatalog:
+    @pytest.fixture(scope='function')
+    def refresh(self, monkeypatch):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                if 'search' in url:
+                    return mockmodified(url, datadict)
+                return mockpaged(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+
+    def test_refresh(self, configuration, refresh, tmpdir):
+        path = join(str(tmpdir), 'catalog.db')
+        catalog = Catalog(path)
+        assert catalog.get_state('metadata_modified') is None
+        assert catalog.refresh() == 10
+        assert catalog.get_state('metadata_modified') == '2016-03-29T17:33:22.912275'
+        assert catalog.refresh() == 1
+        assert len(catalog.get_datasets()) == 10
+        assert catalog.refresh(full=True) == 10
+        assert len(catalog.get_datasets()) == 10
+        catalog.close()
+        catalog = Catalog(path)
+        assert len(catalog.get_datasets()) == 10
+        catalog.close()
+
+    def test_refresh_failure(self, configuration, refresh, monkeypatch):
+        catalog = Catalog()
+        assert catalog.refresh() == 10
+        add_dataset = Catalog._add_dataset
+        added = list()
+
+        def fail_add_dataset(self, dataset):
+            if len(added) == 5:
+                raise RuntimeError('Failed')
+            added.append(dataset['name'])
+            add_dataset(self, dataset)
+
+        monkeypatch.setattr(Catalog, '_add_dataset', fail_add_dataset)
+        with pytest.raises(RuntimeError):
+            catalog.refresh(full=True)
+        assert len(catalog.get_datasets()) == 10
+        assert catalog.get_state('metadata_modified') == '2016-03-29T17:33:22.912275'
+        monkeypatch.setattr(Catalog, '_add_dataset', add_dataset)
+        datasets = Dataset.get_all_datasets()
+        datasets[0]['dataset_date'] = 'lala'
+        monkeypatch.setattr(Dataset, 'get_all_datasets', staticmethod(lambda **kwargs: datasets))
+        assert catalog.refresh(full=True) == 9
+        assert catalog.get_dataset(datasets[0]['name']) is None
+        assert len(catalog.get_datasets()) == 9
+        catalog.close()
+
+    def test_get_datasets(self, configuration, refresh):
+        catalog = Catalog()
+        catalog.refresh()
+        dataset = catalog.get_dataset('acled-conflict-data-for-libya')
+        assert isinstance(dataset, Dataset)
+        assert dataset['id'] == '6a5aebc1-f5a9-4842-8183-b8118228e71e'
+        assert dataset.get_tags() == ['conflict', 'political violence', 'protests', 'war']
+        assert catalog.get_dataset('6a5aebc1-f5a9-4842-8183-b8118228e71e')['name'] == 'acled-conflict-data-for-libya'
+        assert catalog.get_dataset('NOTEXIST') is None
+        assert len(catalog.get_datasets(organization='acled')) == 10
+        assert len(catalog.get_datasets(organization='b67e6c74-c185-4f43-b561-0e114a736f19')) == 10
+        assert len(catalog.get_datasets(organization='lala')) == 0
+        datasets = catalog.get_datasets(location='LBY')
+        assert [x['name'] for x in datasets] == ['acled-conflict-data-for-libya']
+        assert len(catalog.get_datasets(tag='conflict', location='lby')) == 1
+        assert len(catalog.get_datasets(tag='lala')) == 0
+        assert len(catalog.get_datasets(date_from='2015-12-31', date_to='2016-01-01')) == 10
+        assert len(catalog.get_datasets(date_from=datetime.datetime(2016, 1, 1))) == 0
+        assert len(catalog.get_datasets(date_to='1996-12-31')) == 0
+        assert len(catalog.get_datasets(modified_since='2016-03-29T17:33:21.618Z')) == 2
+        assert len(catalog.get_datasets(modified_since='2016-03-29T22:33:21.618+05:00')) == 2
+        assert Catalog._get_iso_date('2017-01-01T05:00:00+05:00') == '2017-01-01T00:00:00'
+        assert catalog.get_organization_names() == ['acled']
+        assert 'lby' in catalog.get_location_names()
+        catalog.close()
@@ -10,16 +10,20 @@ from os.path import join
 
 import pytest
 import requests
+from dateutil.tz import tzoffset
 
 from hdx.data import dataset
-from hdx.data.dataset import Dataset
-from hdx.data.hdxobject import HDXError
+from hdx.data.dataset import Dataset, DatasetSummary
+from hdx.data.hdxobject import HDXError, HDXInconsistentResultsError, PageSizer
 from hdx.data.organization import Organization
 from hdx.data.resource import Resource
 from hdx.data.user import User
 from hdx.hdx_configuration import Configuration
+from hdx.utilities.checkpoint import Checkpoint
 from hdx.utilities.dictandlist import merge_two_dictionaries
+from hdx.utilities.journal import Journal
 from hdx.utilities.loader import load_yaml
+from hdx.utilities.transport import RecordingTransport, ReplayingTransport
 from . import MockResponse, user_data, organization_data
 from .test_organization import organization_mockshow
 from .test_showcase import showcase_resultdict
@@ -170,6 +174,86 @@ def mocksearch(url, datadict):
                         '{"success": false, "error": {"message": "Not found", "__type": "Not Found Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}')
 
 
+def mockpaged(url, datadict):
+    if 'search' in url:
+        newsearchdict = copy.deepcopy(searchdict)
+        if datadict.get('sort') == 'id asc':
+            results = sorted(newsearchdict['results'], key=lambda x: x['id'])
+            fq = datadict.get('fq')
+            if fq and fq.startswith('id:{"'):
+                lastid = fq[5:fq.index('"', 5)]
+                results = [x for x in results if x['id'] > lastid]
+            newsearchdict['results'] = results
+        start = datadict['start']
+        newsearchdict['results'] = newsearchdict['results'][start:start + datadict['rows']]
+        fl = datadict.get('fl')
+        if fl:
+            newsearchdict['results'] = [{k: x[k] for k in fl if k in x} for x in newsearchdict['results']]
+        result = json.dumps(newsearchdict)
+        return MockResponse(200,
+                            '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}' % result)
+    if 'current' in url:
+        offset = datadict['offset']
+        result = json.dumps(alldict[offset:offset + datadict['limit']])
+        return MockResponse(200,
+                            '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=current_package_list_with_resources"}' % result)
+    return MockResponse(404,
+                        '{"success": false, "error": {"message": "TEST ERROR: Not paged", "__type": "TEST ERROR: Not Paged Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}')
+
+
+def mockmodified(url, datadict):
+    if 'search' not in url:
+        return MockResponse(404,
+                            '{"success": false, "error": {"message": "TEST ERROR: Not search", "__type": "TEST ERROR: Not Search Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}')
+    newsearchdict = copy.deepcopy(searchdict)
+    fq = datadict.get('fq')
+    if fq:
+        if not fq.startswith('metadata_modified:['):
+            return MockResponse(404,
+                                '{"success": false, "error": {"message": "TEST ERROR: Bad fq", "__type": "TEST ERROR: Bad fq Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}')
+        timestamp = fq[19:fq.index(' TO *]')][:-1]
+        newsearchdict['results'] = [x for x in newsearchdict['results']
+                                    if x['metadata_modified'][:len(timestamp)] >= timestamp]
+    if datadict.get('sort') == 'metadata_modified asc':
+        newsearchdict['results'] = sorted(newsearchdict['results'], key=lambda x: x['metadata_modified'])
+    newsearchdict['count'] = len(newsearchdict['results'])
+    start = datadict['start']
+    newsearchdict['results'] = newsearchdict['results'][start:start + datadict['rows']]
+    fl = datadict.get('fl')
+    if fl:
+        newsearchdict['results'] = [{k: x[k] for k in fl if k in x} for x in newsearchdict['results']]
+    result = json.dumps(newsearchdict)
+    return MockResponse(200,
+                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}' % result)
+
+
+def mocksummary(url, datadict):
+    if 'search' not in url or datadict['rows'] != 0:
+        return MockResponse(404,
+                            '{"success": false, "error": {"message": "TEST ERROR: Not summary", "__type": "TEST ERROR: Not Summary Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}')
+    if datadict['q'] == 'NOTEXIST':
+        return MockResponse(404,
+                            '{"success": false, "error": {"message": "Not found", "__type": "Not Found Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}')
+    results = searchdict['results']
+    fq = datadict.get('fq')
+    if fq:
+        results = [x for x in results if fq in ['groups:%s' % group['name'] for group in x['groups']]]
+    facets = dict()
+    for field in datadict.get('facet.field', list()):
+        counts = dict()
+        for result in results:
+            if field == 'organization':
+                values = [result['organization']['name']]
+            else:
+                values = [x['name'] for x in result[field]]
+            for value in values:
+                counts[value] = counts.get(value, 0) + 1
+        facets[field] = counts
+    result = json.dumps({'count': len(results), 'facets': facets, 'results': list()})
+    return MockResponse(200,
+                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}' % result)
+
+
 def mocklist(url):
     if 'list' not in url:
         return MockResponse(404,
@@ -300,6 +384,32 @@ class TestDataset:
 
         monkeypatch.setattr(requests, 'Session', MockSession)
 
+    @pytest.fixture(scope='function')
+    def post_patch(self, monkeypatch):
+        calls = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                if isinstance(data, dict):
+                    datadict = {k.decode('utf8'): v.decode('utf8') for k, v in data.items()}
+                else:
+                    datadict = json.loads(data.decode('utf-8'))
+                if 'show' in url:
+                    return mockshow(url, datadict)
+                calls.append((url.rsplit('/', 1)[-1], datadict))
+                if 'resource' in url:
+                    resultdictcopy = copy.deepcopy(TestDataset.resources_data[0])
+                else:
+                    resultdictcopy = copy.deepcopy(resultdict)
+                merge_two_dictionaries(resultdictcopy, datadict)
+                result = json.dumps(resultdictcopy)
+                return MockResponse(200,
+                                    '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_patch"}' % result)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        return calls
+
     @pytest.fixture(scope='function')
     def post_update(self, monkeypatch):
         class MockSession(object):
@@ -379,6 +489,36 @@ class TestDataset:
 
         monkeypatch.setattr(requests, 'Session', MockSession)
 
+    @pytest.fixture(scope='function')
+    def paged(self, monkeypatch):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                return mockpaged(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+
+    @pytest.fixture(scope='function')
+    def modified(self, monkeypatch):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                return mockmodified(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+
+    @pytest.fixture(scope='function')
+    def summary(self, monkeypatch):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                return mocksummary(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+
     @pytest.fixture(scope='function')
     def post_list(self, monkeypatch):
         class MockSession(object):
@@ -473,7 +613,7 @@ class TestDataset:
         resources_data = copy.deepcopy(TestDataset.resources_data)
         resource = Resource(resources_data[0])
         dataset.add_update_resources([resource, resource])
-        dataset.create_in_hdx()
+        assert dataset.create_in_hdx() == 'created'
         assert dataset['id'] == '6f36a41c-f126-4b18-aaaf-6c2ddfbc5d4d'
         assert len(dataset.resources) == 2
 
@@ -518,6 +658,242 @@ class TestDataset:
         os.unlink(file.name)
         assert len(dataset.resources) == 2
 
+    def test_update_in_hdx_unchanged(self, configuration, post_update, monkeypatch):
+        urls = list()
+        mocksession = requests.Session
+        post = mocksession.post
+
+        def recordingpost(url, *args, **kwargs):
+            urls.append(url)
+            return post(url, *args, **kwargs)
+
+        monkeypatch.setattr(mocksession, 'post', staticmethod(recordingpost))
+        dataset = Dataset.read_from_hdx('TEST4')
+        assert dataset.update_in_hdx() is False
+        assert [x for x in urls if 'update' in x] == list()
+        assert dataset.create_in_hdx() == 'unchanged'
+        assert [x for x in urls if 'update' in x or 'create' in x] == list()
+        dataset.get_resources()[0]['format'] = dataset.get_resources()[0]['format']
+        assert dataset.update_in_hdx() is False
+        dataset.get_resources()[0]['description'] = 'New description'
+        dataset['name'] = 'MyDataset1'
+        assert dataset.update_in_hdx() is True
+        assert len([x for x in urls if 'package_update' in x]) == 1
+        dataset['caveats'] = 'New caveats'
+        assert dataset.create_in_hdx() == 'updated'
+        assert len([x for x in urls if 'package_update' in x]) == 2
+
+    def test_snapshot_resources(self, configuration, post_patch):
+        dataset = Dataset.read_from_hdx('TEST4')
+        resource = dataset.get_resources()[0]
+        resource['extras'] = {'tags': ['a']}
+        local_resources = dataset.get_resources()
+        dataset._dataset_load_from_hdx('TEST4', use_readcache=False)
+        snapshot = dataset.old_data['resources'][0]
+        assert snapshot.data is not resource.data
+        assert snapshot.data['extras'] is resource.data['extras']
+        assert snapshot.get_file_to_upload() == resource.get_file_to_upload()
+        dataset._dataset_merge_hdx_update(True)
+        resource['extras']['tags'].append('b')
+        assert local_resources[0]['extras'] == {'tags': ['a', 'b']}
+        assert dataset.get_resources()[0]['extras'] == {'tags': ['a']}
+
+    def test_update_in_hdx_patch(self, configuration, post_patch):
+        dataset = Dataset.read_from_hdx('TEST4')
+        assert dataset.update_in_hdx(patch=True) is False
+        assert post_patch == list()
+        dataset['dataset_date'] = '02/26/2016'
+        assert dataset.update_in_hdx(patch=True) is True
+        assert post_patch == [('package_patch', {'id': 'TEST4', 'dataset_date': '02/26/2016'})]
+        assert dataset['dataset_date'] == '02/26/2016'
+        assert len(dataset.get_resources()) == 2
+        del post_patch[:]
+        dataset = Dataset.read_from_hdx('TEST4')
+        resource = dataset.get_resources()[0]
+        dataset.get_resources()[0]['description'] = 'New description'
+        resources_data = copy.deepcopy(TestDataset.resources_data)
+        resources_data[0]['name'] = 'New resource'
+        dataset.add_update_resource(resources_data[0])
+        assert dataset.update_in_hdx(patch=True) is True
+        assert post_patch[0] == ('resource_patch', {'id': resource['id'], 'description': 'New description'})
+        assert post_patch[1][0] == 'resource_create'
+        assert post_patch[1][1]['name'] == 'New resource'
+        assert post_patch[1][1]['package_id'] == 'TEST4'
+        assert len(post_patch) == 2
+        assert len(dataset.get_resources()) == 3
+
+    def test_skip_unchanged_upload(self, configuration, post_patch):
+        filetoupload = join('tests', 'fixtures', 'test_data.csv')
+        file_hash = Resource.get_file_hash(filetoupload)
+        resultdict['resources'][0]['hash'] = file_hash
+        try:
+            dataset = Dataset.read_from_hdx('TEST4')
+            dataset.get_resources()[0].set_file_to_upload(filetoupload)
+            assert dataset.update_in_hdx(patch=True) is False
+            assert post_patch == list()
+        finally:
+            resultdict['resources'][0]['hash'] = ''
+        dataset = Dataset.read_from_hdx('TEST4')
+        resource = dataset.get_resources()[0]
+        resource.set_file_to_upload(filetoupload)
+        assert dataset.update_in_hdx(patch=True) is True
+        assert post_patch == [('resource_patch', {'id': resource['id'], 'hash': file_hash})]
+
+    def test_bulk_create_in_hdx(self, configuration, post_patch):
+        Configuration.read().setup_ratelimiter(1000)
+        dataset_data = copy.deepcopy(TestDataset.dataset_data)
+        new_dataset = Dataset(dataset_data)
+        new_dataset.add_update_resources(copy.deepcopy(TestDataset.resources_data))
+        unchanged_dataset = Dataset.read_from_hdx('TEST4')
+        updated_dataset = Dataset.read_from_hdx('TEST4')
+        updated_dataset['dataset_date'] = '02/26/2016'
+        failed_dataset = Dataset({'name': 'MyDataset4'})
+        datasets = [new_dataset, unchanged_dataset, failed_dataset, updated_dataset]
+        results = Dataset.bulk_create_in_hdx(datasets, workers=2)
+        Configuration.read().setup_ratelimiter()
+        assert [x[0] for x in results] == datasets
+        assert [x[1] for x in results] == ['created', 'unchanged', 'failed', 'updated']
+        assert [x[2] for x in results if x[1] != 'failed'] == [None, None, None]
+        assert isinstance(results[2][2], HDXError)
+        assert len(post_patch) == 2
+        assert Dataset.bulk_create_in_hdx([]) == list()
+
+    def test_idcache(self, configuration, post_patch, monkeypatch, tmpdir):
+        shows = list()
+        mocksession = requests.Session
+        post = mocksession.post
+
+        def recordingpost(url, data, *args, **kwargs):
+            if 'show' in url:
+                shows.append(json.loads(data.decode('utf-8'))['id'])
+            return post(url, data, *args, **kwargs)
+
+        monkeypatch.setattr(mocksession, 'post', staticmethod(recordingpost))
+        path = join(str(tmpdir), 'idcache.json')
+        Configuration.read().setup_idcache(path)
+        idcache = Configuration.read().idcache()
+        dataset_data = copy.deepcopy(TestDataset.dataset_data)
+        dataset = Dataset(dataset_data)
+        dataset.add_update_resources(copy.deepcopy(TestDataset.resources_data))
+        dataset.create_in_hdx()
+        assert shows == ['MyDataset1']
+        assert idcache.get('dataset', 'MyDataset1') == (True, '6f36a41c-f126-4b18-aaaf-6c2ddfbc5d4d')
+        del shows[:]
+        idcache.set('dataset', 'MyDataset1', 'TEST4')
+        dataset = Dataset(dataset_data)
+        dataset.add_update_resources(copy.deepcopy(TestDataset.resources_data))
+        dataset.create_in_hdx()
+        assert shows == ['TEST4']
+        del shows[:]
+        idcache.set('dataset', 'MyDataset5', None)
+        dataset_data['name'] = 'MyDataset5'
+        dataset = Dataset(dataset_data)
+        with pytest.raises(HDXError):
+            dataset.update_in_hdx()
+        dataset.add_update_resources(copy.deepcopy(TestDataset.resources_data))
+        dataset.create_in_hdx()
+        assert shows == list()
+        assert idcache.get('dataset', 'MyDataset5') == (True, '6f36a41c-f126-4b18-aaaf-6c2ddfbc5d4d')
+        dataset.delete_from_hdx()
+        assert idcache.get('dataset', 'MyDataset5') == (True, None)
+        idcache.save()
+        Configuration.read().setup_idcache(path)
+        idcache = Configuration.read().idcache()
+        assert idcache.get('dataset', 'MyDataset1') == (True, 'TEST4')
+        assert idcache.get('dataset', 'MyDataset5') == (True, None)
+        assert idcache.get('dataset', 'MyDataset6') == (False, None)
+
+    def test_readcache(self, configuration, post_patch, monkeypatch):
+        shows = list()
+        mocksession = requests.Session
+        post = mocksession.post
+
+        def recordingpost(url, data, *args, **kwargs):
+            if 'show' in url:
+                shows.append(json.loads(data.decode('utf-8'))['id'])
+            return post(url, data, *args, **kwargs)
+
+        monkeypatch.setattr(mocksession, 'post', staticmethod(recordingpost))
+        Configuration.read().setup_readcache()
+        readcache = Configuration.read().readcache()
+        dataset = Dataset.read_from_hdx('TEST4')
+        dataset['dataset_date'] = '02/26/2016'
+        dataset.get_resources()[0]['description'] = 'New description'
+        dataset = Dataset.read_from_hdx('TEST4')
+        assert shows == ['TEST4']
+        assert dataset['dataset_date'] == '06/04/2016'
+        assert dataset.get_resources()[0]['description'] != 'New description'
+        assert readcache.stats() == {'hits': 1, 'misses': 1, 'evictions': 0, 'size': 1}
+        assert Dataset.read_from_hdx('TEST2') is None
+        assert Dataset.read_from_hdx('TEST2') is None
+        assert shows == ['TEST4', 'TEST2', 'TEST2']
+        dataset['dataset_date'] = '02/26/2016'
+        assert dataset.update_in_hdx() is True
+        assert readcache.stats()['size'] == 0
+        Dataset.read_from_hdx('TEST4')
+        assert shows == ['TEST4', 'TEST2', 'TEST2', 'TEST4', 'TEST4']
+
+    def test_journal(self, configuration, post_patch, tmpdir):
+        path = join(str(tmpdir), 'journal.jsonl')
+        Configuration.read().setup_journal(path)
+        dataset = Dataset.read_from_hdx('TEST4')
+        dataset['dataset_date'] = '02/26/2016'
+        assert dataset.update_in_hdx() is True
+        assert dataset['dataset_date'] == '02/26/2016'
+        dataset = Dataset.read_from_hdx('TEST4')
+        assert dataset['dataset_date'] == '02/26/2016'
+        dataset = Dataset({'id': 'TEST4', 'name': 'MyDataset1', 'caveats': 'Journaled'})
+        assert dataset.update_in_hdx() is True
+        dataset_data = copy.deepcopy(TestDataset.dataset_data)
+        dataset_data['name'] = 'MyDataset5'
+        dataset = Dataset(dataset_data)
+        dataset.add_update_resources(copy.deepcopy(TestDataset.resources_data))
+        dataset.create_in_hdx()
+        resource = Resource(copy.deepcopy(TestDataset.resources_data[0]))
+        resource.set_file_to_upload(join('tests', 'fixtures', 'test_data.csv'))
+        dataset = Dataset(dataset_data)
+        dataset.add_update_resource(resource)
+        with pytest.raises(HDXError):
+            dataset.create_in_hdx()
+        assert post_patch == list()
+        entries = Configuration.read().journal().read()
+        assert [(x['action'], x['identifier']) for x in entries] == [('package_update', 'TEST4'),
+                                                                    ('package_update', 'TEST4'),
+                                                                    ('package_create', 'MyDataset5')]
+        assert entries[1]['data']['dataset_date'] == '02/26/2016'
+        assert entries[1]['data']['caveats'] == 'Journaled'
+        assert [x['identifier'] for x in Journal.coalesce(entries)] == ['TEST4', 'MyDataset5']
+        assert entries[0]['data']['dataset_date'] == '02/26/2016'
+        Configuration.read().setup_journal()
+        failures = Journal(path).replay(Configuration.read())
+        assert failures == list()
+        assert [x[0] for x in post_patch] == ['package_update', 'package_create']
+
+    def test_transport(self, configuration, post_patch, monkeypatch, tmpdir):
+        path = join(str(tmpdir), 'cassette.json.gz')
+        with RecordingTransport(path) as transport:
+            Configuration.read().setup_transport(transport)
+            dataset = Dataset.read_from_hdx('TEST4')
+            dataset['dataset_date'] = '02/26/2016'
+            dataset.update_in_hdx()
+            assert Dataset.read_from_hdx('TEST2') is None
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                raise AssertionError('No network access expected')
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        Configuration.read().setup_transport(ReplayingTransport(path))
+        dataset = Dataset.read_from_hdx('TEST4')
+        assert len(dataset.get_resources()) == 2
+        dataset['dataset_date'] = '02/26/2016'
+        assert dataset.update_in_hdx() is True
+        assert dataset['dataset_date'] == '02/26/2016'
+        assert Dataset.read_from_hdx('TEST2') is None
+        with pytest.raises(HDXError):
+            Dataset.read_from_hdx('TEST1')
+
     def test_update_in_hdx(self, configuration, post_update):
         dataset = Dataset()
         dataset['id'] = 'NOTEXIST'
@@ -675,6 +1051,246 @@ class TestDataset:
         with pytest.raises(HDXError):
             Dataset.search_in_hdx('ACLED')
 
+    def test_lazy_resources(self, configuration, all):
+        dataset.page_size = 1000
+        datasets = Dataset.get_all_datasets()
+        ds = datasets[4]
+        assert 'resources' not in ds.data
+        assert ds._resources_data is not None
+        assert ds._get_resources_data()[0]['name'] == 'Resource1'
+        resources = ds.get_resources()
+        assert ds._resources_data is None
+        assert len(resources) == 1
+        assert isinstance(resources[0], Resource)
+        assert resources[0]['name'] == 'Resource1'
+        assert ds.get_resources() is resources
+        ds.add_update_resource({'name': 'New Resource', 'format': 'csv'})
+        assert [x['name'] for x in ds._get_resources_data()] == ['Resource1', 'New Resource']
+        ds = datasets[0]
+        assert ds._resources_data is None
+        assert ds.get_resources() == list()
+
+    def test_iter_search_in_hdx(self, configuration, search):
+        dataset.page_size = 1000
+        datasets = Dataset.iter_search_in_hdx('ACLED')
+        first = next(datasets)
+        assert first['name'] == 'acled-conflict-data-for-libya'
+        assert len(list(datasets)) == 9
+        assert list(Dataset.iter_search_in_hdx('ajyhgr')) == list()
+        with pytest.raises(HDXError):
+            list(Dataset.iter_search_in_hdx('"'))
+        datasets = Dataset.iter_search_in_hdx('ACLED', rows=11)
+        with pytest.raises(HDXInconsistentResultsError):
+            for i, _ in enumerate(datasets):
+                assert i < 10
+        dataset.page_size = 5
+        datasets = Dataset.iter_search_in_hdx('ACLED')
+        with pytest.raises(HDXInconsistentResultsError):
+            for i, _ in enumerate(datasets):
+                assert i < 10
+        dataset.page_size = 1000
+
+    def test_concurrent_paging(self, configuration, paged):
+        Configuration.read()['paging']['workers'] = 4
+        dataset.page_size = 3
+        expected_names = [x['name'] for x in searchdict['results']]
+        datasets = Dataset.search_in_hdx('ACLED')
+        assert [x['name'] for x in datasets] == expected_names
+        datasets = Dataset.search_in_hdx('ACLED', start=2, rows=5)
+        assert [x['name'] for x in datasets] == expected_names[2:7]
+        datasets = Dataset.search_in_hdx('ACLED', start=20)
+        assert datasets == list()
+        expected_names = [x['name'] for x in alldict]
+        datasets = Dataset.get_all_datasets()
+        assert [x['name'] for x in datasets] == expected_names
+        datasets = Dataset.get_all_datasets(offset=1, limit=7)
+        assert [x['name'] for x in datasets] == expected_names[1:8]
+        dataset.page_size = 1000
+
+    def test_adaptive_paging(self, configuration, monkeypatch):
+        page_rows = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                page_rows.append(datadict.get('rows', datadict.get('limit')))
+                return mockpaged(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        paging = Configuration.read()['paging']
+        paging['adaptive'] = True
+        paging['min_page_size'] = 2
+        paging['max_page_size'] = 8
+        paging['target_seconds'] = 1000
+        dataset.page_size = 3
+        expected_names = [x['name'] for x in searchdict['results']]
+        datasets = Dataset.search_in_hdx('ACLED')
+        assert [x['name'] for x in datasets] == expected_names
+        assert page_rows == [3, 6, 8]
+        del page_rows[:]
+        datasets = Dataset.search_in_hdx('ACLED', keyset=True)
+        assert len(datasets) == 10
+        assert page_rows == [3, 6, 8]
+        del page_rows[:]
+        datasets = Dataset.get_all_datasets(limit=8)
+        assert [x['name'] for x in datasets] == [x['name'] for x in alldict[:8]]
+        assert page_rows == [3, 5]
+        del page_rows[:]
+        paging['max_page_bytes'] = 1000
+        datasets = Dataset.search_in_hdx('ACLED')
+        assert len(datasets) == 10
+        assert page_rows == [3, 2, 2, 2, 2]
+        del page_rows[:]
+        paging['workers'] = 2
+        datasets = Dataset.search_in_hdx('ACLED')
+        assert len(datasets) == 10
+        assert page_rows == [0, 3, 3, 3, 1]
+        dataset.page_size = 1000
+        paging['workers'] = 1
+        sizer = PageSizer(3, Configuration.read())
+        sizer.update(2, 0, [{'a': 'b'}, {'a': 'c'}])
+        assert sizer.row_bytes == 12
+        sizer.update(4, 0, None)  # average result size is only measured on first page
+        assert sizer.row_bytes == 12
+        assert sizer.size == 8
+
+    def test_keyset_paging(self, configuration, paged):
+        dataset.page_size = 3
+        expected_ids = sorted([x['id'] for x in searchdict['results']])
+        datasets = Dataset.search_in_hdx('ACLED', keyset=True)
+        assert [x['id'] for x in datasets] == expected_ids
+        datasets = Dataset.search_in_hdx('ACLED', fq='organization:acled', keyset=True, start=1, rows=7)
+        assert [x['id'] for x in datasets] == expected_ids[1:8]
+        datasets = Dataset.get_all_datasets(keyset=True, limit=4)
+        assert [x['id'] for x in datasets] == expected_ids[:4]
+        with pytest.raises(HDXError):
+            Dataset.search_in_hdx('ACLED', sort='name asc', keyset=True)
+        dataset.page_size = 1000
+
+    def test_search_fields(self, configuration, paged):
+        dataset.page_size = 3
+        datasets = Dataset.search_in_hdx('ACLED', fields=['name', 'metadata_modified'])
+        assert len(datasets) == 10
+        summary = datasets[0]
+        assert isinstance(summary, DatasetSummary)
+        assert summary == {'id': '6a5aebc1-f5a9-4842-8183-b8118228e71e', 'name': 'acled-conflict-data-for-libya',
+                           'metadata_modified': '2016-03-29T17:33:22.912275'}
+        assert summary['name'] == 'acled-conflict-data-for-libya'
+        assert summary.get('resources') is None
+        assert 'id' in summary
+        assert sorted(summary.keys()) == ['id', 'metadata_modified', 'name']
+        with pytest.raises(TypeError):
+            summary['name'] = 'lala'
+        with pytest.raises(AttributeError):
+            summary.name = 'lala'
+        datasets = Dataset.search_in_hdx('ACLED', fields=['id', 'name'], keyset=True)
+        assert sorted([x['id'] for x in datasets]) == [x['id'] for x in datasets]
+        assert len(datasets[0]) == 2
+        datasets = Dataset.get_all_datasets(fields=['name'], limit=4)
+        assert [x['name'] for x in datasets] == [x['name'] for x in searchdict['results'][:4]]
+        dataset.page_size = 1000
+
+    def test_search_compact(self, configuration, paged):
+        dataset.page_size = 3
+        datasets = Dataset.search_in_hdx('ACLED', compact=True)
+        assert len(datasets) == 10
+        assert all(isinstance(x, DatasetSummary) for x in datasets)
+        assert [x['id'] for x in datasets] == [x['id'] for x in searchdict['results']]
+        assert datasets[0] == searchdict['results'][0]
+        # repeated values are shared even across pages
+        assert datasets[0]._data['organization'] is datasets[9]._data['organization']
+        assert datasets[0]['organization'] is datasets[9]['organization']
+        with pytest.raises(TypeError):
+            datasets[0]['organization']['name'] = 'lala'
+        assert datasets[0]['license_id'] is datasets[9]['license_id']
+        summary = [x for x in datasets if 'resources' in x][0]
+        full_dataset = summary.to_dataset()
+        assert isinstance(full_dataset, Dataset)
+        assert full_dataset['name'] == summary['name']
+        assert len(full_dataset.get_resources()) == len(summary['resources'])
+        full_dataset.get_resources()[0]['name'] = 'lala'
+        assert summary['resources'][0]['name'] != 'lala'
+        with pytest.raises(TypeError):
+            summary['resources'].append({'name': 'lala'})
+        resources = copy.deepcopy(summary['resources'])
+        resources[0]['name'] = 'lala'
+        assert summary['resources'][0]['name'] != 'lala'
+        datasets = Dataset.search_in_hdx('ACLED', fields=['name'], compact=True, keyset=True)
+        assert sorted(datasets[0].keys()) == ['id', 'name']
+        dataset.page_size = 1000
+
+    def test_compact_memory(self, configuration):
+        tracemalloc = pytest.importorskip('tracemalloc')
+
+        responses = list()
+        for i in range(500):
+            datasetdict = copy.deepcopy(searchdict['results'][i % 10])
+            datasetdict['id'] = '%s-%d' % (datasetdict['id'][:30], i)
+            datasetdict['name'] = '%s-%d' % (datasetdict['name'], i)
+            responses.append(json.dumps(datasetdict))
+
+        def measure(create):
+            # memory retained after parsing each response as read from HDX and creating the object from it
+            tracemalloc.start()
+            try:
+                datasets = [create(json.loads(response)) for response in responses]
+                return tracemalloc.get_traced_memory()[0], datasets
+            finally:
+                tracemalloc.stop()
+
+        full_size, full_datasets = measure(lambda datasetdict: Dataset._dataset_from_dict(datasetdict))
+        compact_size, compact_datasets = measure(Dataset._get_compact_creator())
+        assert compact_size < full_size / 2
+        assert [x['name'] for x in compact_datasets] == [x['name'] for x in full_datasets]
+
+    def test_count_and_facets(self, configuration, summary):
+        assert Dataset.count_in_hdx() == 10
+        assert Dataset.count_in_hdx('ACLED', fq='groups:lby') == 1
+        facets = Dataset.facets_in_hdx('ACLED')
+        assert sorted(facets.keys()) == ['groups', 'organization', 'tags']
+        assert facets['organization'] == {'acled': 10}
+        assert facets['tags']['conflict'] == 10
+        assert facets['groups']['lby'] == 1
+        facets = Dataset.facets_in_hdx(facet_fields=['organization'], fq='groups:lby')
+        assert facets == {'organization': {'acled': 1}}
+        with pytest.raises(HDXError):
+            Dataset.count_in_hdx('NOTEXIST')
+
+    def test_get_modified_since(self, configuration, modified, tmpdir):
+        datasets = Dataset.get_modified_since()
+        assert len(datasets) == 10
+        datasets = Dataset.get_modified_since('2016-03-29T17:33:21.618Z')
+        assert len(datasets) == 2
+        datasets = Dataset.get_modified_since(datetime.datetime(2016, 3, 29, 17, 33, 21, 618480))
+        assert len(datasets) == 2
+        datasets = Dataset.get_modified_since('2016-03-29T19:33:21.618+02:00')
+        assert len(datasets) == 2
+        assert Dataset._get_solr_timestamp('2016-03-29T12:33:21.618-05:00') == '2016-03-29T17:33:21.618Z'
+        assert Dataset._get_solr_timestamp(datetime.datetime(2016, 3, 29, 19, 33, 21, 618480, tzinfo=tzoffset(None, 7200))) == '2016-03-29T17:33:21.618Z'
+        path = join(str(tmpdir), 'checkpoint.json')
+        checkpoint = Checkpoint(path)
+        datasets = Dataset.get_modified_since('2016-03-29T17:33:20.496527', checkpoint=checkpoint)
+        assert len(datasets) == 3
+        assert checkpoint.get('metadata_modified') == '2016-03-29T17:33:22.912275'
+        datasets = Dataset.get_modified_since(checkpoint=path, fields=['name'])
+        assert len(datasets) == 1
+        assert sorted(datasets[0].keys()) == ['id', 'metadata_modified', 'name']
+        assert Checkpoint(path).get('metadata_modified') == '2016-03-29T17:33:22.912275'
+        checkpoint = Checkpoint(join(str(tmpdir), 'checkpoint2.json'))
+        datasets = Dataset.get_modified_since('2016-03-29T17:33:20.496527', checkpoint=checkpoint, rows=1)
+        assert len(datasets) == 1
+        assert checkpoint.get('metadata_modified') == '2016-03-29T17:33:20.496527'
+        datasets = Dataset.get_modified_since(checkpoint=checkpoint, rows=2)
+        assert [x['metadata_modified'] for x in datasets] == ['2016-03-29T17:33:20.496527', '2016-03-29T17:33:21.618480']
+        assert checkpoint.get('metadata_modified') == '2016-03-29T17:33:21.618480'
+        with pytest.raises(HDXError):
+            Dataset.get_modified_since(checkpoint=checkpoint, start=1)
+        with pytest.raises(HDXError):
+            Dataset.get_modified_since(checkpoint=checkpoint, rows=1, sort='name asc')
+        with pytest.raises(HDXError):
+            Dataset.get_modified_since('lalala')
+
     def test_get_all_dataset_names(self, configuration, post_list):
         dataset_names = Dataset.get_all_dataset_names()
         assert dataset_names == dataset_list
@@ -683,12 +1299,40 @@ class TestDataset:
         dataset.page_size = 1000
         datasets = Dataset.get_all_datasets()
         assert len(datasets) == 10
+        compact_datasets = Dataset.get_all_datasets(compact=True)
+        assert [x['name'] for x in compact_datasets] == [x['name'] for x in datasets]
+        assert isinstance(compact_datasets[0], DatasetSummary)
+        organization = compact_datasets[0]['organization']
+        with pytest.raises(TypeError):
+            organization['name'] = 'changed'
+        assert compact_datasets[0]['organization'] == datasets[0]['organization']
+        assert compact_datasets[0].get('organization') is compact_datasets[0].get('organization')
         with pytest.raises(HDXError):
             Dataset.get_all_datasets(limit=11)
         # dataset.page_size = 1001
         # with pytest.raises(HDXError):
         #     Dataset.get_all_datasets()
 
+    def test_get_all_datasets_reread(self, configuration, monkeypatch):
+        offsets = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                offset = datadict['offset']
+                offsets.append(offset)
+                if offset == 3 and offsets.count(3) == 1:  # dataset added during crawl shifts page
+                    datadict['offset'] = 2
+                return mockpaged(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        dataset.page_size = 3
+        datasets = Dataset.get_all_datasets()
+        assert [x['name'] for x in datasets] == [x['name'] for x in alldict]
+        assert offsets == [0, 3, 6, 9, 0, 3, 6]
+        dataset.page_size = 1000
+
     def test_get_all_resources(self, configuration, search):
         datasets = Dataset.search_in_hdx('ACLED')
         resources = Dataset.get_all_resources(datasets)
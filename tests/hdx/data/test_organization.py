@@ -2,11 +2,13 @@
 """Organization Tests"""
 import copy
 import json
+import re
 from os.path import join
 
 import pytest
 import requests
 
+from hdx.data import organization
 from hdx.data.hdxobject import HDXError
 from hdx.data.organization import Organization
 from hdx.data.user import User
@@ -48,6 +50,7 @@ def mocklist(url):
                         '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=organization_list"}' % json.dumps(
                             organization_list))
 
+
 def mockgetdatasets(url, datadict):
     if 'search' not in url:
         return MockResponse(404,
@@ -57,6 +60,29 @@ def mockgetdatasets(url, datadict):
                             '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}' % json.dumps(
                                 searchdict))
 
+
+def mockgetmultiple(url, datadict):
+    if 'search' not in url:
+        return MockResponse(404,
+                            '{"success": false, "error": {"message": "TEST ERROR: Not search", "__type": "TEST ERROR: Not Search Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}')
+    names = re.findall(r'"([^"]+)"', datadict['fq'])
+    newsearchdict = copy.deepcopy(searchdict)
+    for i, result in enumerate(newsearchdict['results']):
+        if i % 2 == 1:
+            result['organization'] = {'name': 'wfp', 'id': 'wfp-id'}
+            result['owner_org'] = 'wfp-id'
+    results = [x for x in newsearchdict['results'] if x['organization']['name'] in names]
+    if 'groups:lby' in datadict['fq']:
+        results = [x for x in results if x['name'] == 'acled-conflict-data-for-libya']
+    if datadict.get('fl'):
+        results = [{'id': x['id'], 'organization': x['organization']['name']} for x in results]
+    newsearchdict['count'] = len(results)
+    newsearchdict['results'] = results[datadict['start']:datadict['start'] + datadict['rows']]
+    return MockResponse(200,
+                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=package_search"}' % json.dumps(
+                            newsearchdict))
+
+
 class TestOrganization:
     @pytest.fixture(scope='class')
     def static_yaml(self):
@@ -331,6 +357,33 @@ class TestOrganization:
         with pytest.raises(HDXError):
             organization.remove_user(123)
 
+    def test_get_datasets_for_organizations(self, configuration, monkeypatch):
+        fqs = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                fqs.append(datadict['fq'])
+                return mockgetmultiple(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        datasets = Organization.get_datasets_for_organizations(['acled', 'wfp', 'unicef'])
+        assert fqs == ['organization:("acled" OR "wfp" OR "unicef")']
+        assert sorted(datasets.keys()) == ['acled', 'unicef', 'wfp']
+        assert len(datasets['acled']) == 5
+        assert len(datasets['wfp']) == 5
+        assert datasets['unicef'] == list()
+        assert datasets['acled'][0]['name'] == 'acled-conflict-data-for-libya'
+        del fqs[:]
+        monkeypatch.setattr(organization, 'max_fq_length', 20)
+        datasets = Organization.get_datasets_for_organizations(['acled', 'wfp', 'unicef'], fq='groups:lby')
+        assert fqs == ['organization:("acled" OR "wfp") AND (groups:lby)', 'organization:("unicef") AND (groups:lby)']
+        assert [len(datasets[x]) for x in ('acled', 'wfp', 'unicef')] == [1, 0, 0]
+        datasets = Organization.get_datasets_for_organizations(['acled', 'wfp'], fields=['name'])
+        assert len(datasets['acled']) == 5
+        assert datasets['wfp'][0]['organization'] == 'wfp'
+
     def test_get_datasets(self, configuration, datasets_get):
         org_data = copy.deepcopy(resultdict)
         organization = Organization(org_data)
@@ -9,8 +9,10 @@ from os.path import join
 import pytest
 import requests
 
-from hdx.data.hdxobject import HDXError
+from hdx.data import hdxobject
+from hdx.data.hdxobject import HDXError, HDXInconsistentResultsError
 from hdx.data.resource import Resource
+from hdx.hdx_configuration import Configuration
 from hdx.utilities.dictandlist import merge_two_dictionaries
 from hdx.utilities.downloader import DownloadError
 from . import MockResponse
@@ -129,6 +131,19 @@ def mocksearch(url, datadict):
                         '{"success": false, "error": {"message": "Not found", "__type": "Not Found Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_search"}')
 
 
+def mockpaged(url, datadict):
+    if 'search' not in url:
+        return MockResponse(404,
+                            '{"success": false, "error": {"message": "TEST ERROR: Not search", "__type": "TEST ERROR: Not Search Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_search"}')
+    results = sorted(searchdict['results'], key=lambda x: x[datadict['order_by']])
+    if datadict['query'] == 'name:DUPLICATE':
+        results.insert(2, results[0])
+    offset = datadict['offset']
+    result = json.dumps({'count': len(results), 'results': results[offset:offset + datadict['limit']]})
+    return MockResponse(200,
+                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_search"}' % result)
+
+
 class TestResource:
     resource_data = {
         'name': 'MyResource1',
@@ -209,6 +224,57 @@ class TestResource:
 
         monkeypatch.setattr(requests, 'Session', MockSession)
 
+    @pytest.fixture(scope='function')
+    def post_stream(self, monkeypatch):
+        class MockSession(object):
+            bodies = list()
+
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                assert files is None
+                assert headers['Content-Type'].startswith('multipart/form-data; boundary=')
+                assert len(data) > 0
+                chunks = list()
+                while True:
+                    chunk = data.read(100)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                body = b''.join(chunks)
+                MockSession.bodies.append(body)
+                resultdictcopy = copy.deepcopy(resultdict)
+                resultdictcopy['url_type'] = 'upload'
+                resultdictcopy['resource_type'] = 'file.upload'
+                return MockResponse(200,
+                                    '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_create"}' % json.dumps(resultdictcopy))
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        return MockSession.bodies
+
+    @pytest.fixture(scope='function')
+    def post_hash(self, monkeypatch):
+        uploads = list()
+
+        class MockSession(object):
+            hash = ''
+
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                if isinstance(data, dict):
+                    datadict = {k.decode('utf8'): v.decode('utf8') for k, v in data.items()}
+                else:
+                    datadict = json.loads(data.decode('utf-8'))
+                resultdictcopy = copy.deepcopy(resultdict)
+                resultdictcopy['hash'] = MockSession.hash
+                if 'update' in url:
+                    uploads.append((files is not None, datadict))
+                    merge_two_dictionaries(resultdictcopy, datadict)
+                return MockResponse(200,
+                                    '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_update"}' % json.dumps(resultdictcopy))
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        return MockSession, uploads
+
     @pytest.fixture(scope='function')
     def post_update(self, monkeypatch):
         class MockSession(object):
@@ -224,6 +290,15 @@ class TestResource:
                     if datadict['resource_id'] == 'TEST1':
                         return MockResponse(200,
                                             '{"success": true, "result": {"fields": [{"type": "text", "id": "code"}, {"type": "text", "id": "title"}, {"type": "float", "id": "value"}, {"type": "timestamp", "id": "latest_date"}, {"type": "text", "id": "source"}, {"type": "text", "id": "source_link"}, {"type": "text", "id": "notes"}, {"type": "text", "id": "explore"}, {"type": "text", "id": "units"}], "method": "insert", "primary_key": "code", "resource_id": "bfa6b55f-10b6-4ba2-8470-33bb9a5194a5"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=datastore_create"}')
+                if 'patch' in url:
+                    if sorted(datadict.keys()) != ['format', 'id']:
+                        return MockResponse(404,
+                                            '{"success": false, "error": {"message": "TEST ERROR: Not only changed fields", "__type": "TEST ERROR: Not Patch Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_patch"}')
+                    resultdictcopy = copy.deepcopy(resultdict)
+                    merge_two_dictionaries(resultdictcopy, datadict)
+                    result = json.dumps(resultdictcopy)
+                    return MockResponse(200,
+                                        '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_patch"}' % result)
                 if 'update' not in url:
                     return MockResponse(404,
                                         '{"success": false, "error": {"message": "TEST ERROR: Not update", "__type": "TEST ERROR: Not Update Error"}, "help": "http://test-data.humdata.org/api/3/action/help_show?name=resource_update"}')
@@ -314,6 +389,16 @@ class TestResource:
 
         monkeypatch.setattr(requests, 'Session', MockSession)
 
+    @pytest.fixture(scope='function')
+    def paged(self, monkeypatch):
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                return mockpaged(url, datadict)
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+
     def test_read_from_hdx(self, configuration, read):
         resource = Resource.read_from_hdx('TEST1')
         assert resource['id'] == 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5'
@@ -363,6 +448,85 @@ class TestResource:
         with pytest.raises(HDXError):
             resource.create_in_hdx()
 
+    def test_streaming_upload(self, configuration, post_stream):
+        filetoupload = join('tests', 'fixtures', 'test_data.csv')
+        with open(filetoupload, 'rb') as f:
+            contents = f.read()
+        progress = list()
+        resource = Resource(copy.deepcopy(TestResource.resource_data))
+        resource.set_file_to_upload(filetoupload)
+        resource.set_upload_callback(lambda *args: progress.append(args))
+        assert resource.get_upload_callback() is not None
+        resource.create_in_hdx()
+        assert resource['url_type'] == 'upload'
+        body = post_stream[0]
+        assert b'name="name"\r\n\r\nMyResource1\r\n' in body
+        assert b'name="upload"; filename="test_data.csv"' in body
+        assert contents in body
+        assert len(progress) == len(body) // 100 + 1
+        assert progress[-1][:2] == (len(body), len(body))
+
+        resource = Resource(copy.deepcopy(TestResource.resource_data))
+        resource.set_file_to_upload(filetoupload)
+        upload = Configuration.read()['upload']
+        upload['stream_min_bytes'] = len(contents)
+        resource.create_in_hdx()
+        assert contents in post_stream[1]
+        upload['stream_min_bytes'] = 10000000
+
+    def test_get_file_hash(self, tmpdir):
+        path = join(str(tmpdir), 'test_hash.csv')
+        with open(path, 'wb') as f:
+            f.write(b'a,b')
+        file_hash = Resource.get_file_hash(path)
+        assert file_hash == Resource.get_file_hash(path)
+        stat = os.stat(path)
+        newpath = join(str(tmpdir), 'test_hash_new.csv')
+        with open(newpath, 'wb') as f:
+            f.write(b'c,d')
+        os.utime(newpath, (stat.st_atime, stat.st_mtime))
+        os.rename(newpath, path)  # same size and modification time
+        assert Resource.get_file_hash(path) != file_hash
+
+    def test_skip_unchanged_upload(self, configuration, post_hash):
+        mocksession, uploads = post_hash
+        filetoupload = join('tests', 'fixtures', 'test_data.csv')
+        file_hash = Resource.get_file_hash(filetoupload)
+        assert file_hash == Resource.get_file_hash(filetoupload)
+        mocksession.hash = file_hash
+        resource = Resource.read_from_hdx('TEST1')
+        resource.set_file_to_upload(filetoupload)
+        assert resource.is_file_unchanged(resource.data) is True
+        assert resource.update_in_hdx() is False
+        assert uploads == list()
+        assert resource['url'] == resultdict['url']
+
+        resource['url'] = 'ignore'
+        resource['description'] = 'New description'
+        assert resource.update_in_hdx() is True
+        assert uploads[0][0] is False
+        assert uploads[0][1]['url'] == resultdict['url']
+        assert uploads[0][1]['description'] == 'New description'
+        del uploads[:]
+
+        mocksession.hash = 'abc'
+        resource = Resource.read_from_hdx('TEST1')
+        resource.set_file_to_upload(filetoupload)
+        assert resource.is_file_unchanged(resource.data) is False
+        assert resource.update_in_hdx() is True
+        assert uploads[0][0] is True
+        assert uploads[0][1]['hash'] == file_hash
+        del uploads[:]
+
+        mocksession.hash = file_hash
+        upload = Configuration.read()['upload']
+        upload['skip_unchanged'] = False
+        resource = Resource.read_from_hdx('TEST1')
+        resource.set_file_to_upload(filetoupload)
+        assert resource.update_in_hdx() is True
+        assert uploads[0][0] is True
+        upload['skip_unchanged'] = True
+
     def test_update_in_hdx(self, configuration, post_update):
         resource = Resource()
         resource['id'] = 'NOTEXIST'
@@ -376,6 +540,13 @@ class TestResource:
         assert resource['id'] == 'de6549d8-268b-4dfe-adaf-a4ae5c8510d5'
         assert resource['format'] == 'XLSX'
 
+        resource = Resource.read_from_hdx('TEST1')
+        resource['id'] = 'TEST1'
+        resource['format'] = 'CSV'
+        assert resource.update_in_hdx(patch=True) is True
+        assert resource['format'] == 'CSV'
+        assert resource['name'] == 'MyResource1'
+
         resource['format'] = 'CSV'
         resource['id'] = 'TEST1'
         resource['name'] = 'MyResource1'
@@ -448,6 +619,27 @@ class TestResource:
         with pytest.raises(HDXError):
             Resource.search_in_hdx('fail')
 
+    def test_search_in_hdx_paging(self, configuration, paged):
+        hdxobject.page_size = 3
+        expected_ids = sorted([x['id'] for x in searchdict['results']])
+        resources = Resource.search_in_hdx('name:ACLED')
+        assert [x['id'] for x in resources] == expected_ids
+        resources = Resource.search_in_hdx('name:ACLED', offset=1, limit=2)
+        assert [x['id'] for x in resources] == expected_ids[1:3]
+        resources = Resource.iter_search_in_hdx('name:ACLED', order_by='name')
+        assert next(resources)['name'] == 'ACLED-All-Africa-File_20160101-to-date.xlsx'
+        assert len(list(resources)) == 3
+        with pytest.raises(HDXInconsistentResultsError):
+            list(Resource.iter_search_in_hdx('name:DUPLICATE'))
+        with pytest.raises(HDXError):
+            Resource.search_in_hdx('name:DUPLICATE')
+        Configuration.read()['paging']['workers'] = 2
+        resources = Resource.search_in_hdx('name:ACLED')
+        assert [x['id'] for x in resources] == expected_ids
+        resources = Resource.search_in_hdx('name:ACLED', offset=2)
+        assert [x['id'] for x in resources] == expected_ids[2:]
+        hdxobject.page_size = 1000
+
     def test_download(self, configuration, read, monkeypatch):
         resource = Resource.read_from_hdx('TEST1')
         resource2 = Resource.read_from_hdx('TEST4')
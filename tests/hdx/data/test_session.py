@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+"""Session Tests"""
+import copy
+import json
+
+import pytest
+import requests
+
+from hdx.data.dataset import Dataset
+from hdx.data.session import Session
+from hdx.utilities.dictandlist import merge_two_dictionaries
+from . import MockResponse
+from .test_dataset import mockshow, mocksearch, resultdict
+
+
+class TestSession:
+    @pytest.fixture(scope='function')
+    def post_session(self, monkeypatch):
+        calls = list()
+
+        class MockSession(object):
+            @staticmethod
+            def post(url, data, headers, files, allow_redirects, auth):
+                datadict = json.loads(data.decode('utf-8'))
+                action = url.rsplit('/', 1)[-1]
+                calls.append(action)
+                if 'show' in url:
+                    return mockshow(url, datadict)
+                if 'search' in url:
+                    return mocksearch(url, datadict)
+                resultdictcopy = copy.deepcopy(resultdict)
+                merge_two_dictionaries(resultdictcopy, datadict)
+                result = json.dumps(resultdictcopy)
+                return MockResponse(200,
+                                    '{"success": true, "result": %s, "help": "http://test-data.humdata.org/api/3/action/help_show?name=%s"}' % (result, action))
+
+        monkeypatch.setattr(requests, 'Session', MockSession)
+        return calls
+
+    def test_session(self, configuration, post_session):
+        with Session() as session:
+            dataset = session.read(Dataset, 'TEST4')
+            assert session.read(Dataset, 'TEST4') is dataset
+            assert session.read(Dataset, 'MyDataset1') is dataset
+            assert session.read(Dataset, 'TEST2') is None
+            datasets = session.search_datasets('ACLED')
+            assert len(datasets) == 10
+            assert session.search_datasets('ACLED') == datasets
+            assert all(x is y for x, y in zip(session.search_datasets('ACLED'), datasets))
+            assert session.read(Dataset, 'acled-conflict-data-for-libya') is datasets[0]
+            assert session.add(Dataset({'id': 'TEST4', 'name': 'MyDataset1'})) is dataset
+            assert post_session == ['package_show', 'package_show', 'package_search', 'package_search',
+                                    'package_search']
+            assert session.get_dirty() == list()
+            dataset['dataset_date'] = '02/26/2016'
+            dataset_data = copy.deepcopy(resultdict)
+            del dataset_data['id']
+            dataset_data['name'] = 'MyDataset5'
+            new_dataset = Dataset(dataset_data)
+            assert session.add(new_dataset) is new_dataset
+            assert session.add(new_dataset) is new_dataset
+            assert session.is_dirty(dataset) is True
+            assert session.is_dirty(datasets[0]) is False
+            del post_session[:]
+        assert 'package_update' in post_session
+        assert 'package_create' in post_session
+        assert len([x for x in post_session if x in ('package_update', 'package_create')]) == 2
+        assert session.get_dirty() == list()
+        assert session.flush() == list()
+
+        del post_session[:]
+        with pytest.raises(ValueError):
+            with Session() as session:
+                dataset = session.read(Dataset, 'TEST4')
+                dataset['dataset_date'] = '02/26/2016'
+                raise ValueError('Error')
+        assert post_session == ['package_show']
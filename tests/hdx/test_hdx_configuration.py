@@ -1,5 +1,6 @@
 # -*'coding: UTF-8 -*-
 """Configuration Tests"""
+import time
 from os.path import join
 
 import ckanapi
@@ -7,6 +8,7 @@ import pytest
 
 from hdx.hdx_configuration import Configuration, ConfigurationError
 from hdx.utilities.loader import LoadError
+from hdx.utilities.transport import RecordingTransport, ReplayingTransport
 
 
 class TestConfiguration:
@@ -222,6 +224,9 @@ hello there'''
                 'username': 'ZGF0YXByb2plY3Q=',
                 'password': 'aHVtZGF0YQ=='
             },
+            'paging': {'workers': 1, 'adaptive': False, 'min_page_size': 100, 'max_page_size': 5000,
+                       'target_seconds': 5, 'max_page_bytes': 10000000},
+            'upload': {'stream_min_bytes': 10000000, 'skip_unchanged': True},
             'dataset': {'required_fields': [
                 'name',
                 'private',
@@ -306,6 +311,9 @@ hello there'''
                 'password': 'aHVtZGF0YQ=='
             },
             'my_param': 'abc',
+            'paging': {'workers': 1, 'adaptive': False, 'min_page_size': 100, 'max_page_size': 5000,
+                       'target_seconds': 5, 'max_page_bytes': 10000000},
+            'upload': {'stream_min_bytes': 10000000, 'skip_unchanged': True},
             'dataset': {'required_fields': [
                 'name',
                 'private',
@@ -387,6 +395,9 @@ hello there'''
                 'username': 'ZGF0YXByb2plY3Q=',
                 'password': 'aHVtZGF0YQ=='
             },
+            'paging': {'workers': 1, 'adaptive': False, 'min_page_size': 100, 'max_page_size': 5000,
+                       'target_seconds': 5, 'max_page_bytes': 10000000},
+            'upload': {'stream_min_bytes': 10000000, 'skip_unchanged': True},
             'dataset': {'required_fields': [
                 'name',
                 'private',
@@ -506,3 +517,90 @@ hello there'''
         Configuration.delete()
         with pytest.raises(ConfigurationError):
             Configuration.read().remoteckan()
+
+    def test_ratelimiter(self, project_config_yaml):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        with pytest.raises(ConfigurationError):
+            configuration.ratelimiter()
+        configuration.setup_ratelimiter(10)
+        assert configuration.ratelimiter().interval == 0.1
+        configuration.setup_ratelimiter()
+        with pytest.raises(ConfigurationError):
+            configuration.ratelimiter()
+
+    def test_idcache(self, project_config_yaml, tmpdir):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.has_idcache() is False
+        with pytest.raises(ConfigurationError):
+            configuration.idcache()
+        configuration.setup_idcache()
+        assert configuration.has_idcache() is True
+        assert configuration.idcache().get('dataset', 'lala') == (False, None)
+        path = join(str(tmpdir), 'idcache.json')
+        configuration.setup_idcache(path)
+        configuration.idcache().set('dataset', 'lala', '1234')
+        configuration.setup_idcache(path)
+        assert configuration.idcache().get('dataset', 'lala') == (True, '1234')
+
+    def test_readcache(self, project_config_yaml):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.has_readcache() is False
+        with pytest.raises(ConfigurationError):
+            configuration.readcache()
+        configuration.setup_readcache(max_size=10, ttl=60)
+        assert configuration.has_readcache() is True
+        assert configuration.readcache().max_size == 10
+        assert configuration.readcache().ttl == 60
+
+    def test_journal(self, project_config_yaml, tmpdir):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        assert configuration.has_journal() is False
+        with pytest.raises(ConfigurationError):
+            configuration.journal()
+        path = join(str(tmpdir), 'journal.jsonl')
+        configuration.setup_journal(path)
+        assert configuration.journal().path == path
+        configuration.setup_journal()
+        assert configuration.has_journal() is False
+
+    def test_transport(self, project_config_yaml, tmpdir):
+        Configuration._create(hdx_site='prod', hdx_key='TEST_HDX_KEY',
+                              hdx_config_dict={},
+                              project_config_yaml=project_config_yaml)
+        configuration = Configuration.read()
+        with pytest.raises(ConfigurationError):
+            configuration.transport()
+
+        class MockTransport(object):
+            @staticmethod
+            def call_action(send, action, data_dict=None, **kwargs):
+                return {'action': action, 'data': data_dict}
+
+        configuration.setup_transport(MockTransport())
+        assert configuration.call_remoteckan('package_show', {'id': 'lala'}) == {'action': 'package_show',
+                                                                                 'data': {'id': 'lala'}}
+        path = join(str(tmpdir), 'cassette.json.gz')
+        with RecordingTransport(path) as transport:
+            transport.call_action(lambda action, data_dict: {'id': 'lala'}, 'package_show', {'id': 'lala'})
+        configuration.setup_transport(ReplayingTransport(path))
+        configuration.setup_ratelimiter(0.1)
+        start = time.time()
+        for _ in range(3):
+            assert configuration.call_remoteckan('package_show', {'id': 'lala'}) == {'id': 'lala'}
+        assert time.time() - start < 5
+        configuration.setup_ratelimiter()
+        configuration.setup_transport()
+        with pytest.raises(ConfigurationError):
+            configuration.transport()
@@ -0,0 +1,21 @@
+# -*- coding: UTF-8 -*-
+"""Checkpoint Tests"""
+from os.path import join, exists
+
+from hdx.utilities.checkpoint import Checkpoint
+
+
+class TestCheckpoint:
+    def test_checkpoint(self, tmpdir):
+        path = join(str(tmpdir), 'checkpoint.json')
+        checkpoint = Checkpoint(path)
+        assert checkpoint.get('metadata_modified') is None
+        assert checkpoint.get('metadata_modified', 'lala') == 'lala'
+        assert not exists(path)
+        checkpoint.set('metadata_modified', '2016-03-29T17:33:22.912275')
+        assert exists(path)
+        assert not exists('%s.tmp' % path)
+        checkpoint.set('count', 3)
+        checkpoint = Checkpoint(path)
+        assert checkpoint.get('metadata_modified') == '2016-03-29T17:33:22.912275'
+        assert checkpoint.get('count') == 3
@@ -1,9 +1,14 @@
 # -*- coding: UTF-8 -*-
 """Dictionary Tests"""
+import copy
+import json
+import pickle
+
 import pytest
 
 from hdx.utilities.dictandlist import merge_dictionaries, dict_diff, dict_of_lists_add, list_distribute_contents, \
-    list_distribute_contents_simple
+    list_distribute_contents_simple, merge_would_change, merge_changed_keys, merge_two_dictionaries, \
+    intern_values, FrozenDict, FrozenList
 
 
 class TestDictAndList:
@@ -26,6 +31,78 @@ class TestDictAndList:
         assert result == {1: 1, 2: 6, 3: 3, 4: ['a', 'b', 'c', 'd', 'e'], 6: 9}
 
 
+    def test_merge_two_dictionaries_copy_branches(self):
+        d2 = {1: 2, 3: ['d', 'e'], 4: {'a': ['x']}, 5: {'b': 'c'}}
+        d1 = {1: 1, 3: ['a'], 4: {'a': 1}}
+        result = merge_two_dictionaries(d1, d2)
+        assert result[3] is d2[3]
+        assert result[5] is d2[5]
+        d1 = {1: 1, 3: ['a'], 4: {'a': 1}}
+        result = merge_two_dictionaries(d1, d2, copy_branches=True)
+        assert result == {1: 2, 3: ['d', 'e'], 4: {'a': ['x']}, 5: {'b': 'c'}}
+        assert result[3] is not d2[3]
+        assert result[4]['a'] is not d2[4]['a']
+        assert result[5] is not d2[5]
+        result[3].append('f')
+        result[5]['b'] = 'g'
+        assert d2 == {1: 2, 3: ['d', 'e'], 4: {'a': ['x']}, 5: {'b': 'c'}}
+
+    def test_merge_would_change(self):
+        d1 = {1: 1, 2: 'b', 3: None, 4: {'a': 1, 'b': ['c', 'd']}}
+        assert merge_would_change(d1, {}) is False
+        assert merge_would_change(d1, {1: 1, 4: {'b': ['c', 'd']}}) is False
+        assert merge_would_change(d1, {3: None, 4: {'a': 1}}) is False
+        assert merge_would_change(d1, {1: 2}) is True
+        assert merge_would_change(d1, {3: 'x'}) is True
+        assert merge_would_change(d1, {5: 1}) is True
+        assert merge_would_change(d1, {4: {'b': ['c']}}) is True
+        assert merge_would_change(d1, {4: {'b': []}}, merge_lists=True) is False
+        assert merge_would_change(d1, {4: {'b': ['c']}}, merge_lists=True) is True
+        assert merge_would_change(d1, {4: {'b': 'c'}}) is True
+        assert d1 == {1: 1, 2: 'b', 3: None, 4: {'a': 1, 'b': ['c', 'd']}}
+
+    def test_merge_changed_keys(self):
+        d1 = {1: 1, 2: 'b', 3: None, 4: {'a': 1, 'b': ['c', 'd']}}
+        assert merge_changed_keys(d1, {}) == list()
+        assert merge_changed_keys(d1, {1: 1, 4: {'b': ['c', 'd']}}) == list()
+        assert sorted(merge_changed_keys(d1, {1: 2, 2: 'b', 4: {'a': 2}, 5: 1})) == [1, 4, 5]
+
+    def test_intern_values(self):
+        table = dict()
+        d1 = intern_values(json.loads('{"a": "xyz", "b": {"c": 1, "d": "e"}, "f": [{"g": true}]}'), table)
+        d2 = intern_values(json.loads('{"a": "xyz", "b": {"c": 1, "d": "e"}, "f": [{"g": 1}]}'), table)
+        assert d1 == {'a': 'xyz', 'b': {'c': 1, 'd': 'e'}, 'f': [{'g': True}]}
+        assert d1['a'] is d2['a']
+        assert d1['b'] is d2['b']
+        assert d1['f'] is not d2['f']
+        assert d1['f'][0] is not d2['f'][0]
+        assert d2['f'][0]['g'] == 1
+        assert type(d2['f'][0]['g']) is int
+        assert intern_values(3) == 3
+        d3 = intern_values(json.loads('{"a": "xyz", "b": {"c": 1, "d": "e"}, "f": [{"g": true}]}'), table, frozen=True)
+        assert d3 == d1
+        assert isinstance(d3, FrozenDict)
+        assert isinstance(d3['f'], FrozenList)
+        assert d3['b'] is not d1['b']
+        assert d3['b'] is intern_values({'c': 1, 'd': 'e'}, table, frozen=True)
+        with pytest.raises(TypeError):
+            d3['a'] = 'abc'
+        with pytest.raises(TypeError):
+            d3['b'].update({'c': 2})
+        with pytest.raises(TypeError):
+            d3['f'].append(1)
+        with pytest.raises(TypeError):
+            d3['f'][0] = 1
+        d4 = copy.deepcopy(d3)
+        assert d4 == d3
+        assert type(d4) is dict
+        assert type(d4['f']) is list
+        d4['f'][0]['g'] = False
+        assert d3['f'][0]['g'] is True
+        d5 = pickle.loads(pickle.dumps(d3))
+        assert d5 == d3
+        assert isinstance(d5['f'], FrozenList)
+
     def test_dict_diff(self):
         d1 = {1: 1, 2: 2, 3: 3, 4: {'a': 1, 'b': 'c'}}
         d2 = {4: {'a': 1, 'b': 'c'}, 2: 2, 3: 3, 1: 1}
@@ -0,0 +1,43 @@
+# -*- coding: UTF-8 -*-
+"""Id Cache Tests"""
+from os.path import join, exists
+
+from hdx.utilities import idcache as idcache_module
+from hdx.utilities.idcache import IdCache
+
+
+class TestIdCache:
+    def test_idcache(self, tmpdir):
+        path = join(str(tmpdir), 'idcache.json')
+        idcache = IdCache(path)
+        assert idcache.get('dataset', 'lala') == (False, None)
+        idcache.set('dataset', 'lala', '1234')
+        idcache.set('dataset', 'haha', None)
+        idcache.set('organization', 'lala', '5678')
+        assert idcache.get('dataset', 'lala') == (True, '1234')
+        assert idcache.get('dataset', 'haha') == (True, None)
+        assert not exists(path)
+        idcache.save()
+        assert exists(path)
+        assert not exists('%s.tmp' % path)
+        idcache.remove('dataset', 'lala')
+        idcache.remove('dataset', 'notexist')
+        assert idcache.get('dataset', 'lala') == (False, None)
+        idcache = IdCache(path)
+        assert idcache.get('dataset', 'lala') == (True, '1234')
+        assert idcache.get('organization', 'lala') == (True, '5678')
+        idcache.clear()
+        assert idcache.get('dataset', 'haha') == (False, None)
+        idcache = IdCache()
+        idcache.set('dataset', 'lala', '1234')
+        idcache.save()
+        assert idcache.get('dataset', 'lala') == (True, '1234')
+
+    def test_save_at_exit(self, tmpdir):
+        path = join(str(tmpdir), 'idcache.json')
+        idcache = IdCache(path)
+        idcache.set('dataset', 'lala', '1234')
+        assert idcache in idcache_module._persisted_caches
+        assert IdCache() not in idcache_module._persisted_caches
+        idcache_module._save_persisted_caches()
+        assert IdCache(path).get('dataset', 'lala') == (True, '1234')
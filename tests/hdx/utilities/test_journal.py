@@ -0,0 +1,149 @@
+# -*- coding: UTF-8 -*-
+"""Journal Tests"""
+from os.path import join, exists
+
+import pytest
+
+from hdx.utilities.journal import Journal, JournalError
+
+
+class MockConfiguration(object):
+    def __init__(self):
+        self.calls = list()
+        self.data = list()
+
+    def call_remoteckan(self, action, data, files=None):
+        if data.get('name') == 'fail':
+            raise ValueError('Failed')
+        self.calls.append((action, data['name'], files is not None))
+        self.data.append(data)
+        if action == 'resource_create':
+            result = dict(data)
+            result['id'] = 'new%s' % data['name']
+            return result
+        return data
+
+
+class TestJournal:
+    def test_journal(self, tmpdir):
+        path = join(str(tmpdir), 'journal.jsonl')
+        uploadpath = join(str(tmpdir), 'upload.csv')
+        with open(uploadpath, 'w') as f:
+            f.write('a,b\n1,2\n')
+        journal = Journal(path)
+        assert journal.read() == list()
+        journal.append('package_create', {'name': 'new'}, 'name')
+        journal.append('package_update', {'id': '1', 'name': 'a', 'title': 'A1'}, 'id')
+        journal.append('package_update', {'id': '2', 'name': 'b'}, 'id')
+        journal.append('package_update', {'id': '1', 'name': 'a', 'title': 'A2'}, 'id')
+        journal.append('resource_update', {'id': '3', 'name': 'c'}, 'id', uploadpath)
+        journal.append('package_update', {'id': '4', 'name': 'fail'}, 'id')
+        entries = journal.read()
+        assert len(entries) == 6
+        assert entries[4]['file_to_upload'] == uploadpath
+        coalesced = Journal.coalesce(entries)
+        assert [(x['action'], x['identifier']) for x in coalesced] == [
+            ('package_create', 'new'), ('package_update', '2'), ('package_update', '1'), ('resource_update', '3'),
+            ('package_update', '4')]
+        assert coalesced[2]['data']['title'] == 'A2'
+        batches = Journal.get_batches(entries)
+        assert [[x['identifier'] for x in batch] for batch in batches] == [['new'], ['1', '2'], ['1'], ['3'], ['4']]
+        configuration = MockConfiguration()
+        failures = journal.replay(configuration, workers=2)
+        assert configuration.calls == [('package_create', 'new', False), ('package_update', 'b', False),
+                                       ('package_update', 'a', False), ('resource_update', 'c', True)]
+        assert len(failures) == 1
+        assert failures[0][0]['identifier'] == '4'
+        assert str(failures[0][1]) == 'Failed'
+        entries = journal.read()
+        assert len(entries) == 1
+        assert entries[0]['identifier'] == '4'
+        journal.clear()
+        assert not exists(path)
+        assert journal.replay(configuration) == list()
+
+    def test_coalesce(self, tmpdir):
+        path = join(str(tmpdir), 'journal.jsonl')
+        journal = Journal(path)
+        journal.append('package_update', {'id': '1', 'name': 'a', 'title': 'A1'}, 'id')
+        journal.append('package_update', {'id': '1', 'name': 'a'}, 'id')
+        journal.append('package_update', {'id': '2', 'name': 'b', 'notes': 'B1'}, 'id')
+        journal.append('resource_create', {'package_id': '2', 'name': 'r'}, 'name')
+        journal.append('package_update', {'id': '2', 'name': 'b', 'notes': 'B2', 'resources': list()}, 'id')
+        coalesced = Journal.coalesce(journal.read())
+        assert [(x['action'], x['identifier']) for x in coalesced] == [
+            ('package_update', '1'), ('package_update', '1'), ('package_update', '2'), ('resource_create', 'r'),
+            ('package_update', '2')]
+        data = {'id': '1', 'name': 'a', 'title': 'A0', 'notes': 'N'}
+        assert journal.apply_pending(data, ['package_update']) == {'id': '1', 'name': 'a', 'title': 'A1',
+                                                                  'notes': 'N'}
+        configuration = MockConfiguration()
+        assert journal.replay(configuration) == list()
+        assert configuration.calls[3] == ('resource_create', 'r', False)
+        assert configuration.calls[4] == ('package_update', 'b', False)
+        assert configuration.data[4]['resources'] == [{'package_id': '2', 'name': 'r', 'id': 'newr'}]
+        journal.append('package_update', {'id': '2', 'name': 'b', 'resources': list()}, 'id')
+        replayed = list()
+        configuration.call_remoteckan = lambda action, data, files=None: replayed.append(data)
+        journal.replay(configuration)
+        assert replayed == [{'id': '2', 'name': 'b', 'resources': list()}]
+
+    def test_replay_in_order(self, tmpdir):
+        path = join(str(tmpdir), 'journal.jsonl')
+        journal = Journal(path)
+        journal.append('package_update', {'id': '1', 'name': 'fail', 'title': 'A1'}, 'id')
+        journal.append('resource_update', {'id': '3', 'name': 'c', 'package_id': '1'}, 'id')
+        journal.append('package_update', {'id': '2', 'name': 'b'}, 'id')
+        journal.append('package_update', {'id': '1', 'name': 'a'}, 'id')
+        configuration = MockConfiguration()
+        failures = journal.replay(configuration)
+        assert configuration.calls == [('package_update', 'b', False)]
+        assert [(x['action'], x['identifier']) for x, _ in failures] == [
+            ('package_update', '1'), ('resource_update', '3'), ('package_update', '1')]
+        assert isinstance(failures[1][1], JournalError)
+        assert len(journal.read()) == 3
+
+    def test_apply_pending(self, tmpdir, monkeypatch):
+        path = join(str(tmpdir), 'journal.jsonl')
+        journal = Journal(path)
+        journal.append('package_update', {'id': '1', 'name': 'a', 'title': 'A1'}, 'id')
+        journal.append('resource_update', {'id': '3', 'name': 'c', 'format': 'csv'}, 'id')
+        journal.append('package_patch', {'name': 'a', 'notes': 'N1'}, 'name')
+        reads = list()
+        read = journal._read
+        monkeypatch.setattr(journal, '_read', lambda: reads.append(1) or read())
+        data = {'id': '1', 'name': 'a', 'title': 'A0', 'resources': [{'id': '3', 'name': 'c'}, {'id': '4'}]}
+        journal.apply_pending(data, ['package_update', 'package_patch'], 'resources', ['resource_update'])
+        assert data == {'id': '1', 'name': 'a', 'title': 'A1', 'notes': 'N1',
+                        'resources': [{'id': '3', 'name': 'c', 'format': 'csv'}, {'id': '4'}]}
+        journal.apply_pending({'id': '3'}, ['resource_update'])
+        assert len(reads) == 1
+        journal.append('resource_update', {'id': '4', 'name': 'd', 'format': 'xlsx'}, 'id')
+        assert journal.apply_pending({'id': '4'}, ['resource_update']) == {'id': '4', 'name': 'd', 'format': 'xlsx'}
+        assert len(reads) == 2
+
+    def test_replay_interrupted(self, tmpdir):
+        path = join(str(tmpdir), 'journal.jsonl')
+        journal = Journal(path)
+        journal.append('resource_create', {'package_id': '2', 'name': 'r'}, 'name')
+        journal.append('package_update', {'id': '2', 'name': 'b', 'resources': list()}, 'id')
+        journal.append('package_update', {'id': '1', 'name': 'a'}, 'id')
+        configuration = MockConfiguration()
+        clear = journal.clear
+
+        def interrupt(entries=None):  # process dies after first batch is sent
+            clear(entries)
+            raise KeyboardInterrupt
+
+        journal.clear = interrupt
+        with pytest.raises(KeyboardInterrupt):
+            journal.replay(configuration, workers=1)
+        journal.clear = clear
+        assert configuration.calls == [('resource_create', 'r', False)]
+        entries = journal.read()
+        assert [(x['action'], x['identifier']) for x in entries] == [('package_update', '2'), ('package_update', '1')]
+        assert entries[0]['data']['resources'] == [{'package_id': '2', 'name': 'r', 'id': 'newr'}]
+        configuration = MockConfiguration()
+        assert journal.replay(configuration) == list()
+        assert configuration.calls == [('package_update', 'b', False), ('package_update', 'a', False)]
+        assert not exists(path)
@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+"""Multipart Encoder Tests"""
+from io import BytesIO
+
+import pytest
+
+from hdx.utilities.multipart import MultipartEncoder, get_file_size
+
+
+class TestMultipart:
+    expected_body = b'--XYZ\r\nContent-Disposition: form-data; name="id"\r\n\r\nTEST1\r\n' \
+                    b'--XYZ\r\nContent-Disposition: form-data; name="name"\r\n\r\nMyResource1\r\n' \
+                    b'--XYZ\r\nContent-Disposition: form-data; name="upload"; filename="upload"\r\n' \
+                    b'Content-Type: application/octet-stream\r\n\r\n0123456789\r\n--XYZ--\r\n'
+
+    def test_get_file_size(self):
+        file = BytesIO(b'0123456789')
+        file.read(3)
+        assert get_file_size(file) == 7
+        assert file.tell() == 3
+
+    def test_multipart(self):
+        progress = list()
+        file = BytesIO(b'0123456789')
+        body = MultipartEncoder({b'name': b'MyResource1', 'id': 'TEST1'}, [('upload', file)],
+                                callback=lambda *args: progress.append(args), boundary='XYZ')
+        assert body.content_type == 'multipart/form-data; boundary=XYZ'
+        assert len(body) == len(TestMultipart.expected_body)
+        chunks = list()
+        while True:
+            chunk = body.read(7)
+            if not chunk:
+                break
+            assert len(chunk) <= 7
+            chunks.append(chunk)
+        assert b''.join(chunks) == TestMultipart.expected_body
+        assert [x[0] for x in progress] == list(range(7, len(body), 7)) + [len(body)]
+        assert all(x[1] == len(body) for x in progress)
+        assert all(x[2] >= 0 for x in progress)
+
+        file = BytesIO(b'0123456789')
+        body = MultipartEncoder({b'name': b'MyResource1', 'id': 'TEST1'}, [('upload', file)], chunk_size=16,
+                                boundary='XYZ')
+        chunks = list(body)
+        assert max(len(x) for x in chunks) == 16
+        assert b''.join(chunks) == TestMultipart.expected_body
+
+        body = MultipartEncoder(dict(), [('upload', BytesIO())], boundary='XYZ')
+        assert body.read() == b'--XYZ\r\nContent-Disposition: form-data; name="upload"; filename="upload"\r\n' \
+                              b'Content-Type: application/octet-stream\r\n\r\n\r\n--XYZ--\r\n'
+
+        file = BytesIO(b'0123456789')
+        body = MultipartEncoder(dict(), [('upload', file)], boundary='XYZ')
+        file.truncate(5)
+        with pytest.raises(IOError):
+            body.read()
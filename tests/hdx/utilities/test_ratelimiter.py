@@ -0,0 +1,28 @@
+# -*- coding: UTF-8 -*-
+"""Rate Limiter Tests"""
+import time
+from multiprocessing.pool import ThreadPool
+
+import pytest
+
+from hdx.utilities.ratelimiter import RateLimiter
+
+
+class TestRateLimiter:
+    def test_ratelimiter(self):
+        with pytest.raises(ValueError):
+            RateLimiter(0)
+        ratelimiter = RateLimiter(20)
+        assert ratelimiter.wait() == 0
+        start = time.time()
+        pool = ThreadPool(4)
+        pool.map(lambda x: ratelimiter.wait(), range(8))
+        pool.close()
+        pool.join()
+        assert time.time() - start >= 0.35
+
+    def test_reserve(self):
+        ratelimiter = RateLimiter(10)
+        assert ratelimiter.reserve() == 0
+        assert 0.09 <= ratelimiter.reserve() <= 0.1
+        assert 0.19 <= ratelimiter.reserve() <= 0.2
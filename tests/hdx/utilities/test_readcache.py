@@ -0,0 +1,45 @@
+# -*- coding: UTF-8 -*-
+"""Read Cache Tests"""
+import time
+
+from hdx.utilities.readcache import ReadCache
+
+
+class TestReadCache:
+    def test_readcache(self):
+        readcache = ReadCache(max_size=2)
+        assert readcache.get('package_show', 'lala') == (False, None)
+        readcache.set('package_show', 'lala', {'id': '1234'})
+        readcache.set('package_show', 'lala', {'id': '1234', 'x': 1}, 'params')
+        assert readcache.get('package_show', 'lala') == (True, {'id': '1234'})
+        assert readcache.get('package_show', 'lala', 'params') == (True, {'id': '1234', 'x': 1})
+        readcache.get('package_show', 'lala')
+        readcache.set('organization_show', 'haha', {'id': '5678'})
+        assert readcache.get('package_show', 'lala', 'params') == (False, None)
+        assert readcache.get('package_show', 'lala') == (True, {'id': '1234'})
+        assert readcache.stats() == {'hits': 4, 'misses': 2, 'evictions': 1, 'size': 2}
+        assert readcache.index == {'lala': {('package_show', 'lala', '')}, '1234': {('package_show', 'lala', '')},
+                                   'haha': {('organization_show', 'haha', '')},
+                                   '5678': {('organization_show', 'haha', '')}}
+        readcache.invalidate(['lala', 'notexist'])
+        assert sorted(readcache.index.keys()) == ['5678', 'haha']
+        assert readcache.get('package_show', 'lala') == (False, None)
+        assert readcache.get('organization_show', 'haha') == (True, {'id': '5678'})
+        readcache.clear()
+        assert readcache.index == dict()
+        assert readcache.get('organization_show', 'haha') == (False, None)
+        readcache.set('package_show', 'name1', {'id': '1234', 'name': 'name1', 'resources': [{'id': '5678'}]})
+        readcache.set('package_show', 'name2', {'id': '9012', 'name': 'name2'})
+        readcache.invalidate(['1234'])
+        assert readcache.get('package_show', 'name1') == (False, None)
+        readcache.set('package_show', 'name1', {'id': '1234', 'name': 'name1', 'resources': [{'id': '5678'}]})
+        readcache.invalidate(['5678'])
+        assert readcache.get('package_show', 'name1') == (False, None)
+        assert readcache.get('package_show', 'name2') == (True, {'id': '9012', 'name': 'name2'})
+        assert sorted(readcache.index.keys()) == ['9012', 'name2']
+        readcache = ReadCache(ttl=0.01)
+        readcache.set('package_show', 'lala', {'id': '1234'})
+        time.sleep(0.02)
+        assert readcache.get('package_show', 'lala') == (False, None)
+        assert readcache.stats()['size'] == 0
+        assert readcache.index == dict()
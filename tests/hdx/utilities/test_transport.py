@@ -0,0 +1,63 @@
+# -*- coding: UTF-8 -*-
+"""Transport Tests"""
+import time
+from os.path import join
+
+import pytest
+from ckanapi.errors import NotFound, ValidationError, CKANAPIError
+
+from hdx.utilities.transport import RecordingTransport, ReplayingTransport, CassetteError
+
+
+class TestTransport:
+    def test_transport(self, tmpdir):
+        path = join(str(tmpdir), 'cassette.json.gz')
+        counts = {'package_show': 0}
+
+        def send(action, data_dict, **kwargs):
+            if data_dict['id'] == 'notexist':
+                raise NotFound('Not found')
+            if data_dict['id'] == 'invalid':
+                raise ValidationError({'name': ['Missing value']})
+            if data_dict['id'] == 'timeout':
+                raise IOError(object(), 'Timed out')
+            if data_dict['id'] == 'unserialisable':
+                return {'id': data_dict['id'], 'date': object()}
+            counts[action] += 1
+            time.sleep(0.01)
+            return {'id': data_dict['id'], 'count': counts[action]}
+
+        with RecordingTransport(path) as transport:
+            result = transport.call_action(send, 'package_show', {'id': 'lala'})
+            assert result == {'id': 'lala', 'count': 1}
+            result['count'] = 10
+            assert transport.call_action(send, 'package_show', {'id': 'lala'}, files=None) == {'id': 'lala', 'count': 2}
+            with pytest.raises(NotFound):
+                transport.call_action(send, 'package_show', {'id': 'notexist'})
+            with pytest.raises(ValidationError):
+                transport.call_action(send, 'package_show', {'id': 'invalid'})
+            with pytest.raises(IOError):
+                transport.call_action(send, 'package_show', {'id': 'timeout'})
+            transport.call_action(send, 'package_show', {'id': 'unserialisable'})
+
+        transport = ReplayingTransport(path)
+        assert transport.call_action(None, 'package_show', {'id': 'lala'}) == {'id': 'lala', 'count': 1}
+        assert transport.call_action(None, 'package_show', {'id': 'lala'}) == {'id': 'lala', 'count': 2}
+        assert transport.call_action(None, 'package_show', {'id': 'lala'}) == {'id': 'lala', 'count': 2}
+        with pytest.raises(NotFound):
+            transport.call_action(None, 'package_show', {'id': 'notexist'})
+        with pytest.raises(ValidationError) as e:
+            transport.call_action(None, 'package_show', {'id': 'invalid'})
+        assert e.value.error_dict == {'name': ['Missing value']}
+        with pytest.raises(CKANAPIError) as e:
+            transport.call_action(None, 'package_show', {'id': 'timeout'})
+        assert 'Timed out' in str(e.value)
+        assert transport.call_action(None, 'package_show', {'id': 'unserialisable'})['date'].startswith('<object')
+        with pytest.raises(CassetteError):
+            transport.call_action(None, 'package_show', {'id': 'haha'})
+
+        for latency in (0.02, lambda: 0.02, 'recorded'):
+            transport = ReplayingTransport(path, latency=latency)
+            start = time.time()
+            transport.call_action(None, 'package_show', {'id': 'lala'})
+            assert time.time() - start >= 0.01